@@ -0,0 +1,190 @@
+"""
+Time the hot paths of pygitops against a generated repository, and write the results as JSON.
+
+Run from the root of the repository, e.g.:
+
+    python -m benchmarks.run_benchmarks --file-count 10000 --output results.json
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+
+from git import Actor, Git, Repo
+
+import pygitops
+from benchmarks.synthetic_repo import RepoShape, file_path, generate_bare_repo
+from pygitops.operations import (
+    feature_branch,
+    get_default_branch,
+    get_updated_repo,
+    stage_commit_push_changes,
+)
+
+RESULTS_FORMAT_VERSION = 1
+
+_ACTOR = Actor("pygitops-benchmark", "benchmark@example.com")
+_BRANCH = "main"
+
+
+def run_benchmarks(
+    shape: RepoShape, work_dir: Path, repeat: int = 5, many_files: int = 10_000
+) -> dict:
+    """
+    Time every benchmark against a repository of the given shape.
+
+    :param shape: Shape of the generated remote repository.
+    :param work_dir: Empty directory holding the remote and every clone.
+    :param repeat: Number of times each benchmark is timed.
+    :param many_files: Number of files staged by the many files staging benchmark.
+    :return: The results, ready to be serialized as JSON.
+    """
+    remote_path = work_dir / "remote.git"
+    generate_bare_repo(remote_path, shape, branch=_BRANCH)
+    remote_url = str(remote_path)
+    clone_dir = work_dir / "warm-clone"
+    repo = get_updated_repo(remote_url, clone_dir)
+
+    # each benchmark is set up for a run, named uniquely, and returns the operation to time
+    def cold_clone(run_name: str) -> Callable[[], object]:
+        cold_dir = work_dir / run_name
+        return lambda: get_updated_repo(remote_url, cold_dir)
+
+    def warm_update(run_name: str) -> Callable[[], object]:
+        return lambda: get_updated_repo(remote_url, clone_dir)
+
+    def default_branch(run_name: str) -> Callable[[], object]:
+        return lambda: get_default_branch(repo)
+
+    def feature_branch_round_trip(run_name: str) -> Callable[[], object]:
+        def _round_trip() -> None:
+            with feature_branch(repo, run_name):
+                pass
+
+        return _round_trip
+
+    def stage_commit_push(file_count: int) -> Callable[[str], Callable[[], object]]:
+        def _setup(run_name: str) -> Callable[[], object]:
+            workdir_path = Path(repo.working_dir)
+            for index in range(file_count):
+                path = workdir_path / run_name / file_path(index)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(f"{run_name} {index}\n")
+            # runs on the feature branch named after the run
+            return lambda: stage_commit_push_changes(
+                repo, run_name, _ACTOR, f"Benchmark {run_name}"
+            )
+
+        return _setup
+
+    benchmarks: list[tuple[str, Callable[[str], Callable[[], object]], bool]] = [
+        ("get_updated_repo_cold", cold_clone, False),
+        ("get_updated_repo_warm", warm_update, False),
+        ("get_default_branch", default_branch, False),
+        ("feature_branch_round_trip", feature_branch_round_trip, False),
+        ("stage_commit_push_changes_1_file", stage_commit_push(1), True),
+        (
+            f"stage_commit_push_changes_{many_files}_files",
+            stage_commit_push(many_files),
+            True,
+        ),
+    ]
+
+    results = []
+    for name, setup, on_feature_branch in benchmarks:
+        timings = []
+        for run in range(repeat):
+            run_name = f"benchmark-{name}-{run}".replace("_", "-")
+            with _feature_branch_if(repo, run_name, on_feature_branch):
+                # only the operation is timed, not the setup it needs
+                operation = setup(run_name)
+                started = time.perf_counter()
+                operation()
+                timings.append(time.perf_counter() - started)
+        results.append(
+            {
+                "name": name,
+                "runs_seconds": timings,
+                "min_seconds": min(timings),
+                "median_seconds": statistics.median(timings),
+                "max_seconds": max(timings),
+            }
+        )
+        print(
+            f"{name}: median {statistics.median(timings):.4f}s over {repeat} runs",
+            file=sys.stderr,
+        )
+
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "pygitops_version": pygitops.__version__,
+        "git_version": ".".join(str(part) for part in Git().version_info),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "shape": asdict(shape),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+@contextmanager
+def _feature_branch_if(repo: Repo, branch_name: str, enabled: bool) -> Iterator[None]:
+    if not enabled:
+        yield
+        return
+    with feature_branch(repo, branch_name):
+        yield
+
+
+def main(argv: list[str] | None = None) -> None:
+    defaults = RepoShape()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file-count", type=int, default=defaults.file_count)
+    parser.add_argument("--history-depth", type=int, default=defaults.history_depth)
+    parser.add_argument("--branch-count", type=int, default=defaults.branch_count)
+    parser.add_argument("--tag-count", type=int, default=defaults.tag_count)
+    parser.add_argument("--blob-size", type=int, default=defaults.blob_size)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--many-files", type=int, default=10_000)
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        help="Directory for the generated repositories, a temporary directory by default.",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="File to write the results to, stdout by default."
+    )
+    args = parser.parse_args(argv)
+
+    shape = RepoShape(
+        file_count=args.file_count,
+        history_depth=args.history_depth,
+        branch_count=args.branch_count,
+        tag_count=args.tag_count,
+        blob_size=args.blob_size,
+    )
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="pygitops-benchmark-"))
+    try:
+        results = run_benchmarks(shape, work_dir, args.repeat, args.many_files)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir)
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
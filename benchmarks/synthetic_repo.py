@@ -0,0 +1,101 @@
+"""Generate bare repositories of a configurable shape with `git fast-import`, to benchmark pygitops against."""
+
+import random
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from git import Repo
+
+_AUTHOR = "pygitops-benchmark <benchmark@example.com>"
+# fixed timestamps and seed, so that every generated repository of a shape is identical
+_EPOCH = 1_600_000_000
+_SEED = 0
+# files per directory, so that no tree grows unrealistically wide
+_FILES_PER_DIR = 100
+
+
+@dataclass(frozen=True)
+class RepoShape:
+    """
+    Shape of a generated repository.
+
+    :attr file_count: Number of files in the tip of the default branch.
+    :attr history_depth: Number of commits on the default branch, each after the first changing a single file.
+    :attr branch_count: Number of branches besides the default branch, spread over the history.
+    :attr tag_count: Number of tags, spread over the history.
+    :attr blob_size: Size of each file, in bytes.
+    """
+
+    file_count: int = 1000
+    history_depth: int = 100
+    branch_count: int = 10
+    tag_count: int = 10
+    blob_size: int = 1024
+
+
+def file_path(index: int) -> str:
+    """Path of the file with the given index in a generated repository."""
+    return f"dir-{index // _FILES_PER_DIR:05d}/file-{index:07d}.txt"
+
+
+def generate_bare_repo(path: Path, shape: RepoShape, branch: str = "main") -> Repo:
+    """
+    Create a bare repository of the given shape, streaming its whole history through a single `git fast-import`.
+
+    :param path: Directory of the new repository.
+    :param shape: Shape of the repository.
+    :param branch: Name of the default branch.
+    :return: The new repository.
+    """
+    repo = Repo.init(path, bare=True, initial_branch=branch)
+    with tempfile.TemporaryFile() as stream:
+        _write_fast_import_stream(stream, shape, branch)
+        stream.seek(0)
+        repo.git.fast_import("--quiet", istream=stream)
+    return repo
+
+
+def _write_fast_import_stream(stream: IO[bytes], shape: RepoShape, branch: str) -> None:
+    rng = random.Random(_SEED)  # noqa: S311
+    history_depth = max(shape.history_depth, 1)
+
+    for commit in range(1, history_depth + 1):
+        stream.write(f"commit refs/heads/{branch}\nmark :{commit}\n".encode())
+        stream.write(f"committer {_AUTHOR} {_EPOCH + commit} +0000\n".encode())
+        _write_data(stream, f"Commit {commit}".encode())
+        if commit > 1:
+            stream.write(f"from :{commit - 1}\n".encode())
+            changed: range | list[int] = (
+                [rng.randrange(shape.file_count)] if shape.file_count else []
+            )
+        else:
+            changed = range(shape.file_count)
+        for index in changed:
+            stream.write(f"M 100644 inline {file_path(index)}\n".encode())
+            _write_data(stream, _blob(rng, shape.blob_size))
+        stream.write(b"\n")
+
+    for index in range(shape.branch_count):
+        mark = history_depth - index * history_depth // max(shape.branch_count, 1)
+        stream.write(f"reset refs/heads/branch-{index}\nfrom :{mark}\n\n".encode())
+    for index in range(shape.tag_count):
+        mark = 1 + index * history_depth // max(shape.tag_count, 1)
+        stream.write(f"reset refs/tags/v{index}\nfrom :{mark}\n\n".encode())
+
+
+def _blob(rng: random.Random, size: int) -> bytes:
+    if size <= 0:
+        return b""
+    # a printable line, so that diffs and deltas behave as they do for source code
+    return (
+        rng.randbytes(size // 2).hex()[: size - 1].encode().ljust(size - 1, b"0")
+        + b"\n"
+    )
+
+
+def _write_data(stream: IO[bytes], data: bytes) -> None:
+    stream.write(f"data {len(data)}\n".encode())
+    stream.write(data)
+    stream.write(b"\n")
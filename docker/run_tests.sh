@@ -38,15 +38,15 @@ pytest tests --cov-report html
 echo "Running ruff..."
 if [ -z "${RUFF_FIX}" ]; then
     # ruff check: linter - finds code quality issues (unused imports, bugs, security issues)
-    ruff check pygitops tests
+    ruff check pygitops tests benchmarks
     # ruff format: formatter - ensures consistent code style (indentation, quotes, line length)
-    ruff format --check pygitops tests
+    ruff format --check pygitops tests benchmarks
 else
     # ruff check --fix: auto-fix linting issues where possible
-    ruff check --fix pygitops tests
+    ruff check --fix pygitops tests benchmarks
     # ruff format: auto-format code style
-    ruff format pygitops tests
+    ruff format pygitops tests benchmarks
 fi
 
 echo "Running mypy..."
-mypy pygitops
+mypy pygitops benchmarks
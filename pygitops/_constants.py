@@ -3,3 +3,53 @@ GIT_BRANCH_MAIN = "main"
 
 GITHUB_PUBLIC_DOMAIN_NAME = "github.com"
 KNOWN_DEFAULT_BRANCHES = (GIT_BRANCH_MASTER, GIT_BRANCH_MAIN)
+
+DEFAULT_LOCKFILE_DIR = "lockfiles"
+
+DEFAULT_BRANCH_CACHE_TTL_SECONDS = 300
+
+# history is deepened by this many commits at a time when a shallow clone needs more of it
+SHALLOW_DEEPEN_COMMITS = 50
+SHALLOW_DEEPEN_MAX_ATTEMPTS = 5
+
+DEFAULT_MIRROR_REFRESH_INTERVAL_SECONDS = 60
+
+DEFAULT_SYNC_MAX_WORKERS = 8
+
+# a campaign fetches and pushes this many repositories at a time, while transforming others
+DEFAULT_CAMPAIGN_NETWORK_WORKERS = 8
+DEFAULT_CAMPAIGN_TRANSFORM_WORKERS = 4
+
+# querying a remote tip is a single round trip and barely uses the local machine, so many can run at once
+DEFAULT_SCAN_MAX_WORKERS = 32
+DEFAULT_WATCH_MIN_INTERVAL_SECONDS = 30
+DEFAULT_WATCH_MAX_INTERVAL_SECONDS = 900
+DEFAULT_WATCH_BACKOFF_FACTOR = 2.0
+
+DEFAULT_WORKTREE_POOL_SIZE = 4
+
+# a transfer slower than the configured throughput for this long is aborted
+DEFAULT_STALL_SECONDS = 30
+
+# a push rejected because a concurrent writer moved the remote branch is rebased and retried with capped exponential backoff
+DEFAULT_PUSH_RETRY_MAX_ATTEMPTS = 5
+DEFAULT_PUSH_RETRY_INITIAL_DELAY_SECONDS = 0.5
+DEFAULT_PUSH_RETRY_MAX_DELAY_SECONDS = 8.0
+DEFAULT_PUSH_RETRY_BACKOFF_FACTOR = 2.0
+
+# seconds between two runs of each maintenance task on a clone, after the schedule of git's own incremental maintenance strategy,
+# with the full repack of gc deferred to once a week
+DEFAULT_MAINTENANCE_INTERVALS_SECONDS = {
+    "prefetch": 3600,
+    "commit-graph": 3600,
+    "loose-objects": 86400,
+    "incremental-repack": 86400,
+    "multi-pack-index": 86400,
+    "gc": 604800,
+}
+# a clone in use when its maintenance is due is tried again after this long
+DEFAULT_MAINTENANCE_RETRY_SECONDS = 60
+
+DEFAULT_REPO_POOL_SIZE = 64
+# GitPython keeps up to two `git cat-file` processes per repository, and pygitops one more for its `GitChannel`
+DEFAULT_REPO_POOL_MAX_HELPER_PROCESSES = 32
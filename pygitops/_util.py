@@ -1,21 +1,69 @@
 import logging
 import os
-from collections.abc import Iterator
-from contextlib import contextmanager
+import shlex
+import tempfile
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager, suppress
+from io import BytesIO
 from os import PathLike
 from pathlib import Path
+from typing import IO
+from urllib.parse import quote
 
 from filelock import FileLock, Timeout
-from git import PushInfo, Repo
+from git import (
+    Actor,
+    Blob,
+    Commit,
+    Git,
+    GitCommandError,
+    PushInfo,
+    Reference,
+    Repo,
+    SymbolicReference,
+)
+from git.config import GitConfigParser
 from git.exc import InvalidGitRepositoryError
-
-from pygitops.exceptions import PyGitOpsError, PyGitOpsWorkingDirError
+from gitdb import IStream
+
+from pygitops._constants import (
+    DEFAULT_LOCKFILE_DIR,
+    SHALLOW_DEEPEN_COMMITS,
+    SHALLOW_DEEPEN_MAX_ATTEMPTS,
+)
+from pygitops.deadlines import _check_deadline, _lock_timeout, _network_call
+from pygitops.exceptions import (
+    PyGitOpsError,
+    PyGitOpsValueError,
+    PyGitOpsWorkingDirError,
+)
+from pygitops.git_channel import GitChannel
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.session import RemoteSession
 
 _logger = logging.getLogger(__name__)
-_lockfile_path = Path("lockfiles")
+_lockfile_path = Path(DEFAULT_LOCKFILE_DIR)
 
 FILELOCK_ACQUIRE_TIMEOUT_SECONDS = 10
 
+_REGULAR_FILE_MODE = "100644"
+_NULL_SHA = "0" * 40
+
+# number of space separated fields preceding the path in each kind of `git status --porcelain=v2` entry
+_PORCELAIN_V2_FIELD_COUNTS = {"1": 8, "2": 9, "u": 10}
+
+# options of every commit made by pygitops: like `git.IndexFile.commit`, the pre-commit and commit-msg hooks are run,
+# commits are not signed, and the message is kept verbatim
+COMMIT_OPTIONS = (
+    "--allow-empty",
+    "--quiet",
+    "--no-gpg-sign",
+    "--cleanup=verbatim",
+)
+
+# reasons git gives for rejecting a push of a branch that is behind the remote branch
+_OUTDATED_PUSH_REASONS = ("non-fast-forward", "fetch first")
+
 
 @contextmanager
 def lock_repo(repo: Repo) -> Iterator[None]:
@@ -26,11 +74,31 @@ def lock_repo(repo: Repo) -> Iterator[None]:
     """
 
     repo_name = os.path.basename(os.path.normpath(repo_working_dir(repo)))
-    lockfile_name = str(get_lockfile_path(repo_name))
+    with _lock(str(get_lockfile_path(repo_name)), repo):
+        yield
+
+
+@contextmanager
+def lock_repo_branch(repo: Repo, branch_name: str) -> Iterator[None]:
+    """
+    Lock a single branch of a given repo for use, leaving its other branches available.
+
+    :param repo: The repo owning the branch.
+    :param branch_name: The branch to lock on.
+    """
+
+    repo_name = os.path.basename(os.path.normpath(repo_working_dir(repo)))
+    # branch names may contain slashes, which cannot be part of a file name
+    branch_key = quote(branch_name, safe="")
+    with _lock(str(get_lockfile_path(f"{repo_name}_branch_{branch_key}")), repo):
+        yield
 
+
+@contextmanager
+def _lock(lockfile_name: str, repo: Repo) -> Iterator[None]:
     lock = FileLock(lockfile_name)
     try:
-        with lock.acquire(timeout=FILELOCK_ACQUIRE_TIMEOUT_SECONDS):
+        with lock.acquire(timeout=_lock_timeout(FILELOCK_ACQUIRE_TIMEOUT_SECONDS)):
             _logger.debug(
                 f"Successfully acquired lock: {lockfile_name} for repo: {repo}"
             )
@@ -38,22 +106,44 @@ def lock_repo(repo: Repo) -> Iterator[None]:
             yield
             _logger.debug(f"About to release lock: {lockfile_name} for repo: {repo}")
     except Timeout as err:
+        _check_deadline(f"waiting for the lockfile: {lockfile_name}")
         raise PyGitOpsError(
             f"The timeout of {FILELOCK_ACQUIRE_TIMEOUT_SECONDS} seconds was exceeded when attempting to acquire the lockfile: {lockfile_name}"
         ) from err
 
 
-def checkout_pull_branch(repo: Repo, branch: str, force: bool = False) -> None:
+def checkout_pull_branch(
+    repo: Repo,
+    branch: str,
+    force: bool = False,
+    session: RemoteSession | None = None,
+    remote_sha: str | None = None,
+) -> bool:
     """
     Pull changes from the specified branch of a repo.
 
     Will fail if the branch does not exist on the remote
+
+    :param session: Optional remote session, reusing its fetched state instead of fetching again.
+    :param remote_sha: Optional SHA of the tip of the branch on the remote, e.g. from `query_remote_tip`.
+        When the branch is checked out and already at this commit, nothing is fetched, checked out, or pulled.
+    :return: True if the branch was already current and left untouched.
     """
 
     origin = repo.remotes.origin
 
+    if remote_sha is not None and is_current(repo, branch, remote_sha, force=force):
+        _logger.debug(
+            f"[Pull Branch] Already current with the remote for repo: {repo}, branch: {branch}"
+        )
+        return True
+
     # `origin.refs` might be out of date, this makes local checkout of repo aware of remote branches
-    origin.fetch()
+    if session is None:
+        with _network_call(f"fetching repo: {repo}") as network_kwargs:
+            origin.fetch(**network_kwargs)
+    else:
+        session.fetch(repo, [branch])
 
     if branch not in repo.heads:
         # handle case where provided branch name isnt a known remote branch
@@ -84,11 +174,562 @@ def checkout_pull_branch(repo: Repo, branch: str, force: bool = False) -> None:
             f"[Pull Branch] Removed untracked files for repo: {repo}, branch: {branch}"
         )
 
+    # a shallow clone might not hold enough history to merge the remote branch
+    if is_shallow_repo(repo):
+        deepen_until_merge_base(repo, f"{origin.name}/{branch}")
+
     # pull the changes from the remote branch
-    origin.pull(branch)
+    if session is None:
+        with _network_call(
+            f"pulling branch: {branch} of repo: {repo}"
+        ) as network_kwargs:
+            origin.pull(branch, **network_kwargs)
+    else:
+        session.pull(repo, branch)
     _logger.debug(
         f"[Pull Branch] Pull of changes successful for repo: {repo}, branch: {branch}"
     )
+    return False
+
+
+def query_remote_tip(repo: Repo, branch: str) -> str | None:
+    """
+    Ask the origin remote of a repository for the commit at the tip of a branch, without fetching anything.
+
+    :param repo: Repository whose origin remote is of interest.
+    :param branch: Name of the branch on the remote.
+    :return: The SHA of the tip, or None if the branch does not exist on the remote.
+    """
+    with _network_call(f"querying the tip of repo: {repo}") as network_kwargs:
+        output = str(
+            repo.git.ls_remote(
+                repo.remotes.origin.name, f"refs/heads/{branch}", **network_kwargs
+            )
+        )
+    for line in output.splitlines():
+        sha, _, ref = line.partition("\t")
+        if ref == f"refs/heads/{branch}":
+            return sha
+    return None
+
+
+def is_current(repo: Repo, branch: str, remote_sha: str, force: bool = False) -> bool:
+    """
+    Determine if a branch is checked out, and both it and its remote-tracking ref are at the tip of the remote branch.
+
+    :param repo: The repo to inspect.
+    :param branch: Name of the branch.
+    :param remote_sha: SHA of the tip of the branch on the remote.
+    :param force: Also require a working tree without changes, as a forced update would discard them.
+    :return: True if updating the branch from the remote would leave the repo unchanged.
+    """
+    if repo.head.is_detached or repo.head.ref.name != branch:
+        return False
+
+    # reads the ref files alone, rather than starting git for a clone that is likely left as it is
+    local_sha, tracking_sha = (
+        _ref_sha(repo, ref)
+        for ref in (
+            f"refs/heads/{branch}",
+            f"refs/remotes/{repo.remotes.origin.name}/{branch}",
+        )
+    )
+    if local_sha != remote_sha or tracking_sha != remote_sha:
+        return False
+
+    return not force or not repo.is_dirty(untracked_files=True)
+
+
+def _ref_sha(repo: Repo, ref: str) -> str | None:
+    try:
+        return SymbolicReference.dereference_recursive(repo, ref)
+    except ValueError:
+        return None
+
+
+def remote_head_ref(repo: Repo) -> str:
+    """
+    Read the ref the HEAD symbolic ref of the origin remote points at, without running git.
+
+    :param repo: The repo to inspect.
+    :raises PyGitOpsError: The origin remote has no HEAD symbolic ref.
+    :return: Full name of the ref, e.g. `refs/remotes/origin/main`.
+    """
+    symbolic_ref_head = f"refs/remotes/{repo.remotes.origin.name}/HEAD"
+    try:
+        return SymbolicReference(repo, symbolic_ref_head).reference.path
+    except (TypeError, ValueError) as e:
+        raise PyGitOpsError(
+            f"Unable to read the symbolic ref {symbolic_ref_head} of repo: {repo}: {e}"
+        ) from e
+
+
+def set_remote_head(repo: Repo, branch: str) -> None:
+    """
+    Point the HEAD symbolic ref of the origin remote at one of its branches, as `git remote set-head` does, without running git.
+
+    :param repo: The repo to update.
+    :param branch: Name of the default branch of the origin remote.
+    """
+    remote_name = repo.remotes.origin.name
+    SymbolicReference(repo, f"refs/remotes/{remote_name}/HEAD").set_reference(
+        Reference(repo, f"refs/remotes/{remote_name}/{branch}")
+    )
+
+
+def check_clone_options(repo_url: str, kwargs: dict) -> list[str]:
+    """
+    Check that a clone is safe, as `Repo.clone_from` does, for clones made by running `git clone` directly.
+
+    The options only `Repo.clone_from` understands, `multi_options`, `allow_unsafe_protocols` and `allow_unsafe_options`,
+    are removed from `kwargs`, which can then be passed to `git clone`.
+
+    :param repo_url: URL of the repository to clone.
+    :param kwargs: Arguments of the clone, as passed to `Repo.clone_from`.
+    :raises UnsafeProtocolError: The URL uses a protocol that may run arbitrary commands, and it was not allowed.
+    :raises UnsafeOptionError: An option may run arbitrary commands, and it was not allowed.
+    :return: The options given by `multi_options`, split as `Repo.clone_from` splits them.
+    """
+    multi_options = shlex.split(" ".join(kwargs.pop("multi_options", None) or []))
+    if not kwargs.pop("allow_unsafe_protocols", False):
+        Git.check_unsafe_protocols(repo_url)
+    if not kwargs.pop("allow_unsafe_options", False):
+        for options in (Git().transform_kwargs(**kwargs), multi_options):
+            Git.check_unsafe_options(
+                options=options, unsafe_options=Repo.unsafe_git_clone_options
+            )
+    return multi_options
+
+
+def clone_repo_with_timeout(
+    repo_url: str, clone_dir: PathLike | str, kill_after_timeout: float, **kwargs
+) -> Repo:
+    """
+    Clone a repository, killing `git clone` if it is not done in time.
+
+    `Repo.clone_from` runs git in the background without a timeout, so the clone is run in the foreground instead.
+
+    :param repo_url: URL of the repository to clone.
+    :param clone_dir: The empty directory to clone repository content to.
+    :param kill_after_timeout: Number of seconds the clone may take.
+    :param kwargs: Additional arguments passed to `git clone`, including `multi_options`, `allow_unsafe_protocols`
+        and `allow_unsafe_options`, which are honoured as `Repo.clone_from` does.
+    :raises UnsafeProtocolError: The URL uses a protocol that may run arbitrary commands, and it was not allowed.
+    :raises UnsafeOptionError: An option may run arbitrary commands, and it was not allowed.
+    :return: The cloned repository.
+    """
+    multi_options = check_clone_options(repo_url, kwargs)
+    Git().clone(
+        *multi_options,
+        "--",
+        repo_url,
+        os.fspath(clone_dir),
+        kill_after_timeout=kill_after_timeout,
+        **kwargs,
+    )
+    return Repo(clone_dir)
+
+
+def is_shallow_repo(repo: Repo) -> bool:
+    """
+    Determine if a repository is a shallow clone.
+
+    :param repo: The repo to inspect.
+    :return: True if the history of the repo is truncated.
+    """
+    # git records the boundary commits of a shallow clone in this file, and removes it once the history is complete
+    return os.path.exists(os.path.join(repo.common_dir, "shallow"))
+
+
+def deepen_until_merge_base(repo: Repo, rev: str) -> None:
+    """
+    Deepen the history of a shallow clone until `HEAD` and `rev` share a merge base.
+
+    History is deepened a few commits at a time, falling back to fetching the complete history when that is not enough.
+
+    :param repo: The shallow repo to deepen.
+    :param rev: The revision that will be merged into `HEAD`.
+    """
+    origin = repo.remotes.origin
+    deepen_by = SHALLOW_DEEPEN_COMMITS
+    for _ in range(SHALLOW_DEEPEN_MAX_ATTEMPTS):
+        if _has_merge_base(repo, "HEAD", rev):
+            return
+        _logger.debug(
+            f"[Shallow] Deepening history of repo: {repo} by {deepen_by} commits to find a merge base with {rev}"
+        )
+        with _network_call(f"deepening repo: {repo}") as network_kwargs:
+            repo.git.fetch(f"--deepen={deepen_by}", origin.name, **network_kwargs)
+        deepen_by *= 2
+
+    if not _has_merge_base(repo, "HEAD", rev):
+        _logger.debug(f"[Shallow] Fetching complete history of repo: {repo}")
+        with _network_call(f"deepening repo: {repo}") as network_kwargs:
+            repo.git.fetch("--unshallow", origin.name, **network_kwargs)
+
+
+def _has_merge_base(repo: Repo, rev: str, other_rev: str) -> bool:
+    try:
+        repo.git.merge_base(rev, other_rev)
+    except GitCommandError:
+        return False
+    return True
+
+
+def changed_paths(repo: Repo) -> list[Path]:
+    """
+    Find the paths whose working tree state differs from the index, in a single `git status` pass.
+
+    Untracked files are listed individually, and changes that are already staged are not listed.
+
+    :param repo: The repo to inspect.
+    :return: Paths of the changed files, relative to the working tree.
+    """
+    status = repo.git.status("--porcelain=v2", "-z", "--untracked-files=all")
+    return [Path(path) for path in parse_porcelain_v2_changes(status)]
+
+
+def parse_porcelain_v2_changes(output: str) -> list[str]:
+    """
+    Parse the output of `git status --porcelain=v2 -z` into the paths changed in the working tree.
+
+    :param output: Output of the status command.
+    :return: Paths of untracked files, and of entries whose working tree state differs from the index.
+    """
+    entries = output.split("\0")
+    paths = []
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if not entry:
+            continue
+        kind = entry[0]
+        if kind == "?":
+            paths.append(entry[2:])
+            continue
+        if kind not in "12u":
+            # ignored files, and headers when requested
+            continue
+        # the path is the last field, after a fixed number of space separated fields
+        fields = entry.split(" ", _PORCELAIN_V2_FIELD_COUNTS[kind])
+        if kind == "2":
+            # renames and copies are followed by their source path
+            index += 1
+        if fields[1][1] != ".":
+            paths.append(fields[-1])
+    return paths
+
+
+def stage_paths(
+    repo: Repo,
+    paths: Iterable[PathLike | str],
+    env: dict[str, str] | None = None,
+) -> None:
+    """
+    Stage additions, modifications and deletions of the given paths in a single `git add` call.
+
+    Paths are streamed to git rather than passed as arguments, so any number of them can be staged.
+    They are matched literally, and staged even when ignored, as if each of them had been given to `git.IndexFile.add`.
+
+    :param repo: The repo to stage the paths in.
+    :param paths: Files and directories to stage, relative to the working tree.
+    :param env: Optional environment variables for git, e.g. `GIT_INDEX_FILE` to stage into another index.
+    """
+    with _pathspec_file(paths) as pathspec_file:
+        repo.git(literal_pathspecs=True).add(
+            *stage_options(repo), istream=pathspec_file, env=env
+        )
+
+
+def stage_options(repo: Repo) -> list[str]:
+    """
+    Options of the `git add` staging paths in a repo, shared by the synchronous and asyncio operations.
+
+    Git is expected to run with `--literal-pathspecs`, and to read NUL separated paths from its standard input.
+
+    :param repo: The repo the paths are staged in.
+    :return: The options to pass to `git add`.
+    """
+    # in a sparse checkout, paths outside of the sparse set are only staged when asked for explicitly
+    sparse_options = ["--sparse"] if is_sparse_checkout(repo) else []
+    return [
+        "--all",
+        "--force",
+        *sparse_options,
+        "--pathspec-from-file=-",
+        "--pathspec-file-nul",
+    ]
+
+
+def set_sparse_paths(repo: Repo, paths: Iterable[PathLike | str]) -> None:
+    """
+    Restrict the working tree of a repo to the given directories, with a cone mode sparse checkout.
+
+    Files at the root of the repo are always checked out, and the sparse set is kept by later checkouts, resets and pulls.
+
+    :param repo: The repo to restrict.
+    :param paths: Directories to check out, relative to the root of the repo.
+    """
+    with tempfile.TemporaryFile() as paths_file:
+        for path in paths:
+            paths_file.write(os.fsencode(Path(path).as_posix()) + b"\n")
+        paths_file.seek(0)
+        repo.git.sparse_checkout("set", "--cone", "--stdin", istream=paths_file)
+    _logger.debug(f"Set the sparse checkout paths of repo: {repo}")
+
+
+def is_sparse_checkout(repo: Repo) -> bool:
+    """
+    Determine if only part of the working tree of a repo is checked out.
+
+    :param repo: The repo to inspect.
+    :return: True if the repo uses a sparse checkout.
+    """
+    # `git sparse-checkout` writes to the config of the worktree, which takes precedence, once `extensions.worktreeConfig` is set
+    worktree_config_path = os.path.join(repo.git_dir, "config.worktree")
+    if os.path.exists(worktree_config_path):
+        with GitConfigParser(worktree_config_path, read_only=True) as config:
+            if config.has_option("core", "sparseCheckout"):
+                return config.get_value("core", "sparseCheckout") is True
+    with repo.config_reader() as config:
+        return config.get_value("core", "sparseCheckout", False) is True
+
+
+def discard_changes(repo: Repo, rev: str) -> None:
+    """
+    Make the index and the working tree of a repo match the given revision, touching only the paths that differ from it.
+
+    Unlike `git reset --hard` followed by `git clean -xdf`, unchanged files are not rewritten and ignored files are kept,
+    while the working tree is still left without any change to commit.
+
+    :param repo: The repo to discard the changes of.
+    :param rev: The revision to restore the changed paths from.
+    """
+    tracked = {
+        *_nul_separated(repo.git.diff("--name-only", "-z", "--no-renames", rev)),
+        *_nul_separated(
+            repo.git.diff("--cached", "--name-only", "-z", "--no-renames", rev)
+        ),
+    }
+    untracked = set(
+        _nul_separated(repo.git.ls_files("--others", "--exclude-standard", "-z"))
+    )
+
+    if tracked:
+        with _pathspec_file(tracked) as pathspec_file:
+            repo.git(literal_pathspecs=True).restore(
+                f"--source={rev}",
+                "--staged",
+                "--worktree",
+                "--pathspec-from-file=-",
+                "--pathspec-file-nul",
+                istream=pathspec_file,
+            )
+
+    workdir_path = Path(repo_working_dir(repo))
+    for path in untracked - tracked:
+        (workdir_path / path).unlink()
+        # remove the directories emptied along the way, as `git clean -d` would
+        parent = (workdir_path / path).parent
+        while parent != workdir_path and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+    _logger.debug(
+        f"Restored {len(tracked)} changed and removed {len(untracked - tracked)} untracked paths of repo: {repo}"
+    )
+
+
+@contextmanager
+def _pathspec_file(paths: Iterable[PathLike | str]) -> Iterator[IO[bytes]]:
+    # stream pathspecs to git on stdin, as there may be more than fit in its arguments
+    with tempfile.TemporaryFile() as pathspec_file:
+        for path in paths:
+            pathspec_file.write(os.fsencode(path) + b"\0")
+        pathspec_file.seek(0)
+        yield pathspec_file
+
+
+def _nul_separated(output: str) -> list[str]:
+    return [entry for entry in output.split("\0") if entry]
+
+
+def commit_index(repo: Repo, commit_message: str, actor: Actor) -> Commit:
+    """
+    Commit the index of a repo, authored and committed by the given actor.
+
+    Unlike `git.IndexFile.commit`, no message file is written to the git directory shared by the worktrees of a repo,
+    so worktrees of one repo can commit concurrently.
+
+    :param repo: The repo to commit to.
+    :param commit_message: Text to be used as the commit message, verbatim.
+    :param actor: The actor with which to perform the commit operation.
+    :raises PyGitOpsError: There was an error committing.
+    :return: The new commit.
+    """
+    with tempfile.TemporaryFile() as message_file:
+        message_file.write(commit_message.encode())
+        message_file.seek(0)
+        try:
+            repo.git.commit(
+                *COMMIT_OPTIONS,
+                "--file=-",
+                istream=message_file,
+                env=_actor_env(actor),
+            )
+        except GitCommandError as err:
+            raise PyGitOpsError(f"Unable to commit to repo: {repo}: {err}") from err
+    return repo.head.commit
+
+
+def commit_paths(
+    repo: Repo,
+    paths: Iterable[PathLike | str],
+    base: str,
+    commit_message: str,
+    actor: Actor,
+) -> Commit:
+    """
+    Commit the working tree state of the given paths on top of a base revision, without touching the index, `HEAD` or any branch.
+
+    The paths are staged into a temporary index holding the tree of `base`,
+    so commits on top of any number of bases can be made from the changes in one working tree.
+
+    :param repo: The repo to commit to.
+    :param paths: Files and directories to commit, relative to the working tree.
+    :param base: The revision the new commit is based on.
+    :param commit_message: Text to be used as the commit message, verbatim.
+    :param actor: The actor with which to perform the commit operation.
+    :return: The new commit, not referenced by any branch.
+    """
+    base_sha = resolve_commit(repo, base)
+    # git writes a lockfile next to the index, so the temporary index gets a directory of its own
+    with tempfile.TemporaryDirectory() as index_dir:
+        index_env = {"GIT_INDEX_FILE": os.path.join(index_dir, "index")}
+        repo.git.read_tree(base_sha, env=index_env)
+        stage_paths(repo, paths, env=index_env)
+        tree_sha = repo.git.write_tree(env=index_env)
+
+    return commit_tree(repo, tree_sha, base_sha, commit_message, actor)
+
+
+def resolve_commit(repo: Repo, rev: str) -> str:
+    """
+    Resolve a revision to the SHA of the commit it names, through the long-lived git channel of the repo.
+
+    :param repo: The repo to resolve the revision in.
+    :param rev: The revision to resolve.
+    :raises PyGitOpsValueError: The revision does not name a commit.
+    :return: SHA of the commit.
+    """
+    sha = GitChannel.for_repo(repo).resolve(f"{rev}^{{commit}}")
+    if sha is None:
+        raise PyGitOpsValueError(f"The revision {rev} does not name a commit")
+    return sha
+
+
+def write_files_tree(repo: Repo, base: str, files: Mapping[str, bytes | None]) -> str:
+    """
+    Write the tree of a base revision with the given files replaced, straight into the object database.
+
+    Blobs are written without spawning git, and the tree is built in a temporary index, so the working tree is never read or written.
+
+    :param repo: The repo to write the objects to.
+    :param base: The revision whose tree the files are applied to.
+    :param files: Contents of the files to write, keyed by path relative to the root of the repo, or None to delete a file.
+    :return: SHA of the new tree.
+    """
+    with tempfile.TemporaryDirectory() as index_dir:
+        index_env = {"GIT_INDEX_FILE": os.path.join(index_dir, "index")}
+        repo.git.read_tree(base, env=index_env)
+
+        # files keep their mode, e.g. when executable, new files are regular files
+        listed = repo.git(literal_pathspecs=True).ls_tree(
+            "-z", "--full-tree", base, "--", *files
+        )
+        modes = {}
+        for entry in _nul_separated(listed):
+            metadata, path = entry.split("\t", 1)
+            modes[path] = metadata.split(" ", 1)[0]
+
+        with tempfile.TemporaryFile() as index_info_file:
+            for path, content in files.items():
+                if content is None:
+                    # a zero mode removes the entry from the index
+                    mode, sha = "0", _NULL_SHA
+                else:
+                    mode = modes.get(path, _REGULAR_FILE_MODE)
+                    sha = repo.odb.store(
+                        IStream(Blob.type, len(content), BytesIO(content))
+                    ).hexsha.decode()
+                index_info_file.write(os.fsencode(f"{mode} {sha}\t{path}") + b"\0")
+            index_info_file.seek(0)
+            repo.git.update_index(
+                "-z", "--index-info", istream=index_info_file, env=index_env
+            )
+
+        return repo.git.write_tree(env=index_env)
+
+
+def commit_tree(
+    repo: Repo, tree_sha: str, parent_sha: str, commit_message: str, actor: Actor
+) -> Commit:
+    """
+    Write a commit of a tree to the object database, without updating any ref.
+
+    :param repo: The repo to commit to.
+    :param tree_sha: SHA of the committed tree.
+    :param parent_sha: SHA of the parent of the commit.
+    :param commit_message: Text to be used as the commit message, verbatim.
+    :param actor: The actor with which to perform the commit operation.
+    :return: The new commit.
+    """
+    with tempfile.TemporaryFile() as message_file:
+        message_file.write(commit_message.encode())
+        message_file.seek(0)
+        commit_sha = repo.git.commit_tree(
+            tree_sha,
+            "-p",
+            parent_sha,
+            "-F",
+            "-",
+            istream=message_file,
+            env=_actor_env(actor),
+        )
+    return repo.commit(commit_sha)
+
+
+def _actor_env(actor: Actor) -> dict[str, str]:
+    return {
+        "GIT_AUTHOR_NAME": actor.name or "",
+        "GIT_AUTHOR_EMAIL": actor.email or "",
+        **_committer_env(actor),
+    }
+
+
+def _committer_env(actor: Actor) -> dict[str, str]:
+    return {
+        "GIT_COMMITTER_NAME": actor.name or "",
+        "GIT_COMMITTER_EMAIL": actor.email or "",
+    }
+
+
+def config_matches(repo: Repo, options: Iterable[tuple[str, str, str]]) -> bool:
+    """
+    Determine if the configuration of a repository already holds the given values, before writing them.
+
+    Writing the configuration takes its lockfile, so options that are set by every operation are only written when they differ.
+
+    :param repo: The repo whose own configuration is read.
+    :param options: Section, option, and expected value, in the lowercase form git writes booleans and numbers in.
+    :return: True if every option is set to its value.
+    """
+    reader = repo.config_reader(config_level="repository")
+    return all(
+        str(reader.get_value(section, option, "")).lower() == value
+        for section, option, value in options
+    )
 
 
 def get_lockfile_path(repo_name: str) -> Path:
@@ -99,6 +740,18 @@ def get_lockfile_path(repo_name: str) -> Path:
     return _lockfile_path / f"{repo_name}_lock_file.lock"
 
 
+def get_clone_lockfile_path(clone_dir: PathLike | str) -> Path:
+    """
+    Get a lockfile to lock a clone directory, the same one however the directory is given.
+
+    The lockfile is named after the absolute path of the directory, so it is created next to the directory,
+    rather than in the default lockfile directory.
+    """
+
+    # a relative path, or one through a symlink, must not lock another file than the absolute path of the same directory
+    return get_lockfile_path(os.path.realpath(clone_dir))
+
+
 def push_error_present(push_info: PushInfo) -> bool:
     """
     Given an instance of `git.remote.PushInfo`, determine if error is present.
@@ -111,6 +764,59 @@ def push_error_present(push_info: PushInfo) -> bool:
     return bool(push_info.flags & push_info.ERROR)
 
 
+def push_rejected_as_outdated(push_info: PushInfo) -> bool:
+    """
+    Given an instance of `git.remote.PushInfo`, determine if the push was rejected because the remote branch has commits the local branch lacks.
+
+    These rejections are reported by git as non-fast-forward, or as needing a fetch first,
+    and typically mean that another writer pushed to the same branch first.
+
+    :param push_info: The result of pushing a branch.
+    :return: True if rebasing onto the remote branch and pushing again may succeed.
+    """
+    return bool(push_info.flags & push_info.REJECTED) and any(
+        reason in push_info.summary for reason in _OUTDATED_PUSH_REASONS
+    )
+
+
+def rebase_onto_remote_branch(repo: Repo, branch: str, actor: Actor) -> None:
+    """
+    Fetch a single branch from origin, and rebase the checked out branch onto its tip.
+
+    Uncommitted changes are stashed for the duration of the rebase, and restored afterwards.
+
+    :param repo: The repo whose checked out branch is rebased.
+    :param branch: The branch of origin to rebase onto.
+    :param actor: The actor committing the rebased commits, which keep their original author.
+    :raises PyGitOpsError: The branch could not be fetched, or the local commits conflict with the ones on origin.
+    """
+    origin = repo.remotes.origin
+    try:
+        with _network_call(
+            f"fetching branch: {branch} of repo: {repo}"
+        ) as network_kwargs:
+            origin.fetch(
+                f"+refs/heads/{branch}:refs/remotes/{origin.name}/{branch}",
+                **network_kwargs,
+            )
+    except GitCommandError as err:
+        raise PyGitOpsError(
+            f"Error fetching branch {branch} of repo: {repo}: {_scrub_github_auth(str(err))}"
+        ) from err
+
+    try:
+        repo.git.rebase(
+            "--autostash", f"{origin.name}/{branch}", env=_committer_env(actor)
+        )
+    except GitCommandError as err:
+        # the rebase may have failed before it started, leaving nothing to abort
+        with suppress(GitCommandError):
+            repo.git.rebase("--abort")
+        raise PyGitOpsError(
+            f"Unable to rebase onto branch {branch} of origin of repo: {repo}: {err}"
+        ) from err
+
+
 def is_git_repo(path: Path) -> bool:
     """
     Determine if a given path is a valid git repository.
@@ -119,8 +825,9 @@ def is_git_repo(path: Path) -> bool:
     :return: True if the contents of a directory at given path contains a valid git repository
     """
     try:
-        _ = Repo(path).git_dir
-        return True
+        # close the handle right away, rather than leaving its resources to the garbage collector
+        with Repo(path):
+            return True
     except InvalidGitRepositoryError:
         return False
 
@@ -0,0 +1,437 @@
+"""
+Asyncio variants of the operations in `pygitops.operations`.
+
+Git runs in asyncio subprocesses and repository locks are awaited, so none of these operations block the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from typing import TypeVar
+
+from filelock import FileLock, Timeout
+from git import Actor, Git, Repo
+
+from pygitops import _util
+from pygitops._util import COMMIT_OPTIONS as _COMMIT_OPTIONS
+from pygitops._util import check_clone_options as _check_clone_options
+from pygitops._util import get_clone_lockfile_path as _get_clone_lockfile_path
+from pygitops._util import get_lockfile_path as _get_lockfile_path
+from pygitops._util import is_git_repo as _is_git_repo
+from pygitops._util import (
+    parse_porcelain_v2_changes as _parse_porcelain_v2_changes,
+)
+from pygitops._util import remote_head_ref as _remote_head_ref
+from pygitops._util import repo_working_dir as _repo_working_dir
+from pygitops._util import stage_options as _stage_options
+from pygitops.exceptions import (
+    PyGitOpsError,
+    PyGitOpsStagedItemsError,
+    PyGitOpsTimeoutError,
+)
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.types import PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+_LOCK_POLL_INTERVAL_SECONDS = 0.05
+
+T = TypeVar("T")
+
+
+class _GitFailedError(PyGitOpsError):
+    """A git subprocess exited with a non-zero status."""
+
+
+async def stage_commit_push_changes(
+    repo: Repo,
+    branch_name: str,
+    actor: Actor,
+    commit_message: str,
+    items_to_stage: list[Path] | None = None,
+    kwargs_to_push: dict | None = None,
+    timeout: float | None = None,
+) -> None:
+    """
+    Asyncio variant of `pygitops.operations.stage_commit_push_changes`.
+
+    :param repo: Repository object.
+    :param branch_name: Feature branch from which changes will be committed and pushed.
+    :param actor: The Github actor with which to perform the commit operation.
+    :param commit_message: Text to be used as the commit message.
+    :param items_to_stage: List of files and directories that will be staged for commit, will be inferred if parameter not provided.
+        Please use an empty list to signal that there are intentionally no items to stage, and items_to_stage should not be inferred.
+    :param kwargs_to_push: dictionary of arguments to pass to the push operation
+    :param timeout: Optional number of seconds the operation may take, git is killed once they have passed.
+    :raises PyGitOpsStagedItemsError: Items to stage are not present or could not be determined.
+    :raises PyGitOpsTimeoutError: The timeout passed before the push was done.
+    :raises PyGitOpsError: There was an error staging, committing, or pushing code.
+    """
+    await _with_timeout(
+        _stage_commit_push_changes(
+            repo, branch_name, actor, commit_message, items_to_stage, kwargs_to_push
+        ),
+        timeout,
+        f"pushing branch: {branch_name} of repo: {repo}",
+    )
+
+
+async def _stage_commit_push_changes(
+    repo: Repo,
+    branch_name: str,
+    actor: Actor,
+    commit_message: str,
+    items_to_stage: list[Path] | None,
+    kwargs_to_push: dict | None,
+) -> None:
+    workdir = _repo_working_dir(repo)
+
+    # We will determine items_to_stage if the parameter was not provided.
+    if items_to_stage is None:
+        status = await _git(
+            workdir, "status", "--porcelain=v2", "-z", "--untracked-files=all"
+        )
+        items_to_stage = [Path(path) for path in _parse_porcelain_v2_changes(status)]
+
+        if not items_to_stage:
+            raise PyGitOpsStagedItemsError(
+                "There are no items to stage, cannot perform commit operation"
+            )
+
+    # stage and commit changes using the provided actor.
+    if items_to_stage:
+        await _git(
+            workdir,
+            "--literal-pathspecs",
+            "add",
+            *_stage_options(repo),
+            stdin="\0".join(str(item) for item in items_to_stage),
+        )
+    await _git(
+        workdir,
+        "commit",
+        *_COMMIT_OPTIONS,
+        "--file=-",
+        stdin=commit_message,
+        env={
+            "GIT_AUTHOR_NAME": actor.name or "",
+            "GIT_AUTHOR_EMAIL": actor.email or "",
+            "GIT_COMMITTER_NAME": actor.name or "",
+            "GIT_COMMITTER_EMAIL": actor.email or "",
+        },
+    )
+    _logger.debug(f"Successfully made commit to repository: {repo}")
+
+    # push changes to the remote branch
+    push_options = Git().transform_kwargs(
+        split_single_char_options=True, **(kwargs_to_push or {})
+    )
+    try:
+        await _git(workdir, "push", "--porcelain", *push_options, "origin", branch_name)
+    except _GitFailedError as e:
+        raise PyGitOpsError(
+            f"Unable to push to branch {branch_name} of new repo: {repo}"
+        ) from e
+
+    _logger.debug(f"Issued commit to remote branch: {branch_name}")
+
+
+@asynccontextmanager
+async def feature_branch(
+    repo: Repo, branch_name: str, timeout: float | None = None
+) -> AsyncIterator[None]:
+    """
+    Asyncio variant of `pygitops.operations.feature_branch`.
+
+    *** Assumes default branch is checked out, otherwise raises PyGitOpsError ***
+
+    :param repo: Repository object
+    :param branch_name: str object indicating the branch we would like to checkout
+    :param timeout: Optional number of seconds checking out the feature branch may take, including the wait for the lock,
+        and separately the number of seconds moving back to the default branch may take. Git is killed once they have passed.
+    :raises PyGitOpsTimeoutError: The timeout passed before the feature branch was checked out or left.
+    :raises PyGitOpsError: There was an error performing the feature branch operation.
+    """
+    async with AsyncExitStack() as stack:
+        default_branch = await _with_timeout(
+            _enter_feature_branch(stack, repo, branch_name),
+            timeout,
+            f"checking out feature branch: {branch_name} of repo: {repo}",
+        )
+        try:
+            yield
+        finally:
+            await _with_timeout(
+                _leave_feature_branch(repo, default_branch),
+                timeout,
+                f"moving back to the default branch of repo: {repo}",
+            )
+
+
+async def _enter_feature_branch(
+    stack: AsyncExitStack, repo: Repo, branch_name: str
+) -> str:
+    workdir = _repo_working_dir(repo)
+    default_branch = await get_default_branch(repo)
+
+    untracked_files = (
+        await _git(workdir, "ls-files", "--others", "--exclude-standard")
+    ).splitlines()
+    if untracked_files:
+        raise PyGitOpsError(
+            f"We cannot checkout a feature branch when there are unstaged changes in your current branch: {untracked_files}"
+        )
+
+    active_branch = await _git(workdir, "symbolic-ref", "--short", "HEAD")
+    if active_branch != default_branch:
+        raise PyGitOpsError(
+            f"We can only checkout feature branches originating from the default branch: {default_branch}. Current branch is: {active_branch}"
+        )
+
+    # the lock is held by the caller's stack, until the feature branch has been left
+    await stack.enter_async_context(lock_repo(repo))
+    await _git(workdir, "fetch", "origin")
+
+    # Handle the case where the remote is a bare repository with no commit history.
+    # When there is no commit history, there is no default branch
+    if await _ref_exists(workdir, f"refs/remotes/origin/{default_branch}"):
+        await _checkout_pull_branch(workdir, default_branch)
+
+    if branch_name != default_branch:
+        await _git(workdir, "checkout", "-b", branch_name)
+    return default_branch
+
+
+async def _leave_feature_branch(repo: Repo, default_branch: str) -> None:
+    workdir = _repo_working_dir(repo)
+    # clean up the feature branch
+    await _git(workdir, "clean", "-xdf")
+    await _git(workdir, "reset", "--hard")
+    await _git(workdir, "checkout", default_branch)
+    _logger.debug(
+        f"Successfully moved back to {default_branch} branch for repository: {repo} after using feature branch"
+    )
+
+
+async def get_updated_repo(
+    repo_url: str, clone_dir: PathOrStr, timeout: float | None = None, **kwargs
+) -> Repo:
+    """
+    Asyncio variant of `pygitops.operations.get_updated_repo`.
+
+    :param repo_url: URL of the Github repository to be cloned.
+    :param clone_dir: The empty directory to clone repository content to.
+    :param timeout: Optional number of seconds the operation may take, including the wait for the lock on the clone.
+        Git is killed once they have passed.
+    :raises PyGitOpsTimeoutError: The timeout passed before the repository was cloned or updated.
+    :raises PyGitOpsError: There was an error cloning the repository.
+    """
+    return await _with_timeout(
+        _get_updated_repo(repo_url, clone_dir, **kwargs),
+        timeout,
+        f"cloning or updating repo: {_scrub_github_auth(repo_url)}",
+    )
+
+
+async def _get_updated_repo(repo_url: str, clone_dir: PathOrStr, **kwargs) -> Repo:
+    clone_dir = Path(clone_dir)
+    clone_dir.mkdir(parents=True, exist_ok=True)
+
+    # Lock the following operation such that only one process will attempt to clone the repo at a time.
+    async with _acquire(FileLock(str(_get_clone_lockfile_path(clone_dir))), None):
+        try:
+            if _is_git_repo(clone_dir):
+                # Sync the remote URL in case the repo was transferred
+                if await _git(clone_dir, "remote", "get-url", "origin") != repo_url:
+                    await _git(clone_dir, "remote", "set-url", "origin", repo_url)
+                branch = kwargs.get("branch")
+                if not branch:
+                    with Repo(clone_dir) as repo:
+                        branch = await get_default_branch(repo)
+                force = kwargs.get("force") or False
+                await _checkout_pull_branch(clone_dir, branch, force=force)
+                return Repo(clone_dir)
+
+            kwargs.pop("force", None)
+            multi_options = _check_clone_options(repo_url, kwargs)
+            clone_options = Git().transform_kwargs(
+                split_single_char_options=True, **kwargs
+            )
+            await _git(
+                clone_dir,
+                "clone",
+                *multi_options,
+                *clone_options,
+                "--",
+                repo_url,
+                str(clone_dir),
+            )
+            return Repo(clone_dir)
+        except _GitFailedError as e:
+            raise PyGitOpsError(
+                f"Error cloning or updating repo {_scrub_github_auth(repo_url)} into destination path {clone_dir}: {e}"
+            ) from e
+
+
+async def get_default_branch(repo: Repo, timeout: float | None = None) -> str:
+    """
+    Asyncio variant of `pygitops.operations.get_default_branch`.
+
+    :param repo: git.Repo instance.
+    :param timeout: Optional number of seconds the operation may take, git is killed once they have passed.
+    :raises PyGitOpsTimeoutError: The timeout passed before the default branch was determined.
+    :return: string representing name of default branch.
+    """
+    return await _with_timeout(
+        _get_default_branch(repo),
+        timeout,
+        f"querying the default branch of repo: {repo}",
+    )
+
+
+async def _get_default_branch(repo: Repo) -> str:
+    workdir = _repo_working_dir(repo)
+    git_ref_regex = r"refs\/remotes\/origin\/([\w*\-\.]+)"
+    symbolic_ref_head = "refs/remotes/origin/HEAD"
+
+    await _git(workdir, "fetch", "origin")
+    await _git(workdir, "remote", "set-head", "-a", "origin")
+    # reading the symbolic ref is a small file read, rather than another git process
+    default_ref = _remote_head_ref(repo)
+
+    match = re.match(git_ref_regex, default_ref)
+    if not match:
+        raise PyGitOpsError(
+            f"None of the symbolic refs using {symbolic_ref_head} matched the regex: {git_ref_regex}"
+        )
+    return match.group(1)
+
+
+@asynccontextmanager
+async def lock_repo(repo: Repo, timeout: float | None = None) -> AsyncIterator[None]:
+    """
+    Awaitable variant of the repository lock held by `feature_branch`.
+
+    Uses the same lockfile as the synchronous operations, so both kinds of operation exclude each other.
+
+    :param repo: The repo to lock on.
+    :param timeout: Seconds to wait for the lock, defaults to the timeout of the synchronous lock.
+    :raises PyGitOpsError: The lock could not be acquired in time.
+    """
+    repo_name = os.path.basename(os.path.normpath(_repo_working_dir(repo)))
+    lockfile_name = str(_get_lockfile_path(repo_name))
+    if timeout is None:
+        timeout = _util.FILELOCK_ACQUIRE_TIMEOUT_SECONDS
+
+    async with _acquire(FileLock(lockfile_name), timeout):
+        yield
+
+
+@asynccontextmanager
+async def _acquire(lock: FileLock, timeout: float | None) -> AsyncIterator[None]:
+    # poll instead of blocking the event loop while another process or task holds the lock
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while True:
+        try:
+            lock.acquire(timeout=0)
+            break
+        except Timeout as err:
+            if deadline is not None and loop.time() >= deadline:
+                raise PyGitOpsError(
+                    f"The timeout of {timeout} seconds was exceeded when attempting to acquire the lockfile: {lock.lock_file}"
+                ) from err
+            await asyncio.sleep(_LOCK_POLL_INTERVAL_SECONDS)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+async def _with_timeout(
+    awaitable: Awaitable[T], timeout: float | None, description: str
+) -> T:
+    if timeout is None:
+        return await awaitable
+    try:
+        # cancels the operation once the timeout passes, killing the git process it waits for, see `_git`
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError as err:
+        raise PyGitOpsTimeoutError(
+            f"The timeout of {timeout} seconds was exceeded {description}"
+        ) from err
+
+
+async def _checkout_pull_branch(
+    workdir: str | os.PathLike, branch: str, force: bool = False
+) -> None:
+    await _git(workdir, "fetch", "origin")
+
+    if not await _ref_exists(workdir, f"refs/heads/{branch}"):
+        # handle case where provided branch name isnt a known remote branch
+        if not await _ref_exists(workdir, f"refs/remotes/origin/{branch}"):
+            raise PyGitOpsError(
+                f"The provided branch {branch} does not exist on the remote origin"
+            )
+        await _git(workdir, "branch", "--track", branch, f"origin/{branch}")
+
+    await _git(workdir, "checkout", *(["--force"] if force else []), branch)
+    if force:
+        await _git(workdir, "clean", "-df")
+
+    await _git(workdir, "pull", "origin", branch)
+
+
+async def _ref_exists(workdir: str | os.PathLike, ref: str) -> bool:
+    try:
+        await _git(workdir, "show-ref", "--verify", "--quiet", ref)
+    except _GitFailedError:
+        return False
+    return True
+
+
+async def _git(
+    workdir: str | os.PathLike,
+    *args: str,
+    stdin: str | None = None,
+    env: dict[str, str] | None = None,
+) -> str:
+    process = await asyncio.create_subprocess_exec(
+        Git.GIT_PYTHON_GIT_EXECUTABLE or "git",
+        *args,
+        cwd=workdir,
+        stdin=asyncio.subprocess.PIPE
+        if stdin is not None
+        else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=_git_env(env),
+    )
+    try:
+        stdout, stderr = await process.communicate(
+            stdin.encode() if stdin is not None else None
+        )
+    except BaseException:
+        # the task was cancelled, e.g. by a timeout: git must not outlive it
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise _GitFailedError(
+            _scrub_github_auth(
+                f"git {args[0]} exited with status {process.returncode}: {stderr.decode(errors='replace').strip()}"
+            )
+        )
+    # only trailing newlines are insignificant, porcelain output may start with a space
+    return stdout.decode(errors="replace").rstrip("\n")
+
+
+def _git_env(env: dict[str, str] | None) -> dict[str, str] | None:
+    if env is None:
+        return None
+    return {**os.environ, **env}
@@ -0,0 +1,265 @@
+"""Run a change over many repositories, overlapping the network work of some with the transforms of others."""
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+
+from git import Actor, Repo
+from git.exc import InvalidGitRepositoryError, NoSuchPathError
+
+from pygitops._constants import (
+    DEFAULT_CAMPAIGN_NETWORK_WORKERS,
+    DEFAULT_CAMPAIGN_TRANSFORM_WORKERS,
+)
+from pygitops._util import changed_paths as _changed_paths
+from pygitops._util import lock_repo as _lock_repo
+from pygitops._util import repo_working_dir as _repo_working_dir
+from pygitops.deadlines import _with_current_deadline
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.git_channel import GitChannel
+from pygitops.locking import RepoLocker
+from pygitops.operations import (
+    feature_branch,
+    get_updated_repo,
+    stage_commit_push_changes,
+)
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.session import RemoteSession
+from pygitops.types import (
+    CampaignResult,
+    CampaignStatus,
+    PathOrStr,
+    PushRetry,
+    RepoHandle,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def run_campaign(
+    items: Iterable[tuple[str, PathOrStr, dict]],
+    transform: Callable[[RepoHandle], object],
+    branch_name: str,
+    actor: Actor,
+    commit_message: str,
+    checkpoint_path: PathOrStr | None = None,
+    network_workers: int = DEFAULT_CAMPAIGN_NETWORK_WORKERS,
+    transform_workers: int = DEFAULT_CAMPAIGN_TRANSFORM_WORKERS,
+    transform_executor: Executor | None = None,
+    push_retry: PushRetry | None = None,
+) -> list[CampaignResult]:
+    """
+    Make the same change on a feature branch of many repositories, and push it.
+
+    Each repository goes through a pipeline of `get_updated_repo`, `feature_branch`, `transform`, and `stage_commit_push_changes`.
+    Updating, branching and pushing are bounded by `network_workers`, and transforms by `transform_workers`,
+    so repositories are fetched and pushed while others are being transformed, rather than one repository at a time.
+    A failure in one repository does not stop the others.
+
+    The transform is called with a picklable `RepoHandle`, so CPU bound transforms can run in a `ProcessPoolExecutor`
+    passed as `transform_executor`, in which case the transform must be picklable as well, e.g. a function defined at module level.
+    Whatever the transform changes in the working tree is committed, and repositories it leaves unchanged are not pushed.
+
+    With `checkpoint_path`, each completed repository is recorded in a checkpoint file as soon as it completes,
+    and repositories recorded for the same branch are skipped, so an interrupted campaign resumes where it stopped.
+    A feature branch an interrupted campaign left behind in a clone is deleted, along with uncommitted changes on it,
+    before the repository is branched again.
+
+    :param items: Tuples of repo URL, clone directory, and keyword arguments for `get_updated_repo`.
+        The `session`, `default_branch_cache`, `repo_locker` and `timeout` among them are also used by `feature_branch`,
+        and the `timeout` by `stage_commit_push_changes`, each step getting the whole timeout.
+    :param transform: Callable changing the working tree of the clone referenced by a handle.
+    :param branch_name: Feature branch the change is made on, the same for every repository.
+    :param actor: The Github actor with which to perform the commit operations.
+    :param commit_message: Text to be used as the commit message.
+    :param checkpoint_path: Optional file recording the completed repositories, created if it does not exist.
+    :param network_workers: Maximum number of repositories updated, branched or pushed at the same time.
+    :param transform_workers: Maximum number of transforms run at the same time,
+        which should match the number of workers of `transform_executor` when it is given.
+    :param transform_executor: Optional executor running the transforms, a thread pool of `transform_workers` is used if not provided.
+    :param push_retry: Optional policy retrying pushes rejected as non-fast-forward, see `stage_commit_push_changes`.
+    :raises PyGitOpsValueError: A number of workers is smaller than 1, or a clone directory is listed twice.
+    :return: One result per item, in the order the items were provided.
+    """
+    items = list(items)
+    if network_workers < 1 or transform_workers < 1:
+        raise PyGitOpsValueError(
+            f"The number of workers must be at least 1, got: {network_workers}, {transform_workers}"
+        )
+    clone_dirs = [_checkpoint_clone_dir(clone_dir) for _, clone_dir, _ in items]
+    if len(set(clone_dirs)) != len(clone_dirs):
+        raise PyGitOpsValueError(
+            "Each clone directory can only be part of a campaign once"
+        )
+
+    checkpoint = _Checkpoint(
+        None if checkpoint_path is None else Path(checkpoint_path), branch_name
+    )
+    # held by the steps talking to remotes, so that they do not hold up transforms and the other way around
+    network_slots = threading.BoundedSemaphore(network_workers)
+
+    with ExitStack() as stack:
+        transforms = transform_executor or stack.enter_context(
+            ThreadPoolExecutor(max_workers=transform_workers)
+        )
+        # every repository in flight is driven by a thread of its own, waiting either for a network slot or its transform
+        pipeline = stack.enter_context(
+            ThreadPoolExecutor(max_workers=network_workers + transform_workers)
+        )
+
+        def _run(item: tuple[str, PathOrStr, dict]) -> CampaignResult:
+            repo_url, clone_dir, kwargs = item
+            clean_repo_url = _scrub_github_auth(repo_url)
+            result = CampaignResult(
+                repo_url=repo_url,
+                clone_dir=Path(clone_dir),
+                status=CampaignStatus.SKIPPED,
+            )
+            if checkpoint.completed(clean_repo_url, clone_dir):
+                _logger.debug(f"[Campaign] Skipping completed repo: {clean_repo_url}")
+                return result
+
+            kwargs = dict(kwargs)
+            # the feature branch reuses the fetch made while updating the clone
+            session = kwargs.setdefault("session", RemoteSession())
+            try:
+                _discard_interrupted_branch(
+                    Path(clone_dir), branch_name, kwargs.get("repo_locker")
+                )
+                with network_slots:
+                    repo = get_updated_repo(repo_url, clone_dir, **kwargs)
+                try:
+                    with ExitStack() as branch_stack:
+                        with network_slots:
+                            branch_stack.enter_context(
+                                feature_branch(
+                                    repo,
+                                    branch_name,
+                                    session=session,
+                                    default_branch_cache=kwargs.get(
+                                        "default_branch_cache"
+                                    ),
+                                    repo_locker=kwargs.get("repo_locker"),
+                                    timeout=kwargs.get("timeout"),
+                                )
+                            )
+                        handle = RepoHandle(
+                            repo_url=clean_repo_url,
+                            clone_dir=Path(_repo_working_dir(repo)),
+                            branch_name=branch_name,
+                        )
+                        transforms.submit(transform, handle).result()
+
+                        changed = _changed_paths(repo)
+                        if changed:
+                            with network_slots:
+                                result.push_retries = stage_commit_push_changes(
+                                    repo,
+                                    branch_name,
+                                    actor,
+                                    commit_message,
+                                    items_to_stage=changed,
+                                    timeout=kwargs.get("timeout"),
+                                    push_retry=push_retry,
+                                )
+                            result.status = CampaignStatus.PUSHED
+                        else:
+                            result.status = CampaignStatus.UNCHANGED
+                finally:
+                    if kwargs.get("repo_pool") is None:
+                        GitChannel.release(repo)
+                        repo.close()
+            except Exception as e:
+                _logger.debug(
+                    f"Failed to run campaign on repo: {clean_repo_url} in path: {clone_dir}: {_scrub_github_auth(str(e))}"
+                )
+                result.status = CampaignStatus.FAILED
+                result.error = e
+                return result
+
+            checkpoint.record(clean_repo_url, clone_dir, result.status)
+            return result
+
+        return list(pipeline.map(_with_current_deadline(_run), items))
+
+
+def _discard_interrupted_branch(
+    clone_dir: Path, branch_name: str, repo_locker: RepoLocker | None
+) -> None:
+    # a campaign cut short while working on this clone left its feature branch, and maybe the changes of its transform, behind
+    try:
+        repo = Repo(clone_dir)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return
+    with repo:
+        if branch_name not in repo.heads:
+            return
+        with _lock_repo(repo) if repo_locker is None else repo_locker.lock(repo):
+            if not repo.head.is_detached and repo.active_branch.name == branch_name:
+                # discard the changes as `feature_branch` does when its context is exited, leaving HEAD at the same commit
+                repo.git.clean("-xdf")
+                repo.git.reset("--hard")
+                repo.git.checkout("--detach")
+            repo.delete_head(branch_name, force=True)
+        _logger.debug(
+            f"[Campaign] Deleted feature branch: {branch_name} left behind in repo: {repo}"
+        )
+
+
+class _Checkpoint:
+    # completed repositories of a campaign, appended to a JSON lines file as they complete
+
+    def __init__(self, path: Path | None, branch_name: str) -> None:
+        self._path = path
+        self._branch_name = branch_name
+        self._lock = threading.Lock()
+        self._completed: set[tuple[str, str]] = set()
+        if path is None or not path.exists():
+            return
+
+        content = path.read_text()
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # the last record may have been cut short by a crash
+                continue
+            if record.get("branch_name") == branch_name:
+                self._completed.add((record["repo_url"], record["clone_dir"]))
+        if content and not content.endswith("\n"):
+            # keep the records appended by this run apart from a record cut short
+            with path.open("a") as checkpoint_file:
+                checkpoint_file.write("\n")
+
+    def completed(self, clean_repo_url: str, clone_dir: PathOrStr) -> bool:
+        return (clean_repo_url, _checkpoint_clone_dir(clone_dir)) in self._completed
+
+    def record(
+        self, clean_repo_url: str, clone_dir: PathOrStr, status: CampaignStatus
+    ) -> None:
+        if self._path is None:
+            return
+        line = json.dumps(
+            {
+                "repo_url": clean_repo_url,
+                "clone_dir": _checkpoint_clone_dir(clone_dir),
+                "branch_name": self._branch_name,
+                "status": status.value,
+            }
+        )
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with self._path.open("a") as checkpoint_file:
+                checkpoint_file.write(f"{line}\n")
+                checkpoint_file.flush()
+                # a record reported as completed must survive a crash of the process or the machine
+                os.fsync(checkpoint_file.fileno())
+
+
+def _checkpoint_clone_dir(clone_dir: PathOrStr) -> str:
+    return os.path.abspath(Path(clone_dir).expanduser())
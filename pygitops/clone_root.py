@@ -0,0 +1,254 @@
+"""Keep clones under a directory within a disk budget, evicting the least recently used ones."""
+
+import logging
+import os
+import shutil
+import stat
+import threading
+from collections.abc import Iterable
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+
+from git import Repo
+from git.exc import GitError
+
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.fast_status import stop_fsmonitor
+from pygitops.git_channel import GitChannel
+from pygitops.locking import RepoLocker, _try_lock_clone
+from pygitops.types import CloneRootStats, PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+# modified each time a clone is used, holding the number of bytes the clone took when it was last measured
+_ACCESS_MARKER = "pygitops_last_access"
+
+
+class CloneRoot:
+    """
+    Directory of clones kept within a byte budget, evicting the least recently used clones once the budget is exceeded.
+
+    Pass a `CloneRoot` to `get_updated_repo` to record each use of a clone, and to evict other clones when the root has grown over budget.
+    Every directory directly within the root is treated as a clone. The last access and size of a clone are kept in a marker file
+    within its git directory, so they are shared by every process using the root, and the size is measured again each time a clone changes.
+
+    A clone is only evicted while its locks can be taken without waiting: the lock `get_updated_repo` takes on the clone directory,
+    and the lock `feature_branch` takes on the repository, or the exclusive lock of `repo_locker` when one is used instead.
+    A clone in use is therefore never removed, and is left for a later eviction.
+
+    :param root: Directory holding the clones, created if it does not exist.
+    :param max_bytes: Number of bytes the clones may take on disk altogether.
+    :param repo_locker: Optional locker used by `get_updated_repo` and `feature_branch` for these clones.
+    :raises PyGitOpsValueError: The budget is not positive.
+    :attr evictions: Number of clones evicted through this instance.
+    :attr evicted_bytes: Number of bytes freed by those evictions.
+    """
+
+    def __init__(
+        self,
+        root: PathOrStr,
+        max_bytes: int,
+        repo_locker: RepoLocker | None = None,
+    ) -> None:
+        if max_bytes < 1:
+            raise PyGitOpsValueError(
+                f"The budget of a clone root must be positive, got: {max_bytes}"
+            )
+        self.root = Path(root).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.repo_locker = repo_locker
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._lock = threading.Lock()
+
+    def clone_dir(self, name: str) -> Path:
+        """
+        Get the directory of a clone within the root, to pass as the `clone_dir` of `get_updated_repo`.
+
+        :param name: Name of the clone directory.
+        :raises PyGitOpsValueError: The name is not a single, visible, path component.
+        :return: The clone directory, which may not exist yet.
+        """
+        if not name or name.startswith(".") or Path(name).name != name:
+            raise PyGitOpsValueError(f"Invalid clone directory name: {name}")
+        return self.root / name
+
+    def touch(self, clone_dir: PathOrStr, measure: bool = True) -> None:
+        """
+        Record the use of a clone, now.
+
+        :param clone_dir: Directory of the clone, directly within the root.
+        :param measure: Measure the size of the clone again, rather than keeping the size measured last time.
+            A clone that was never measured is always measured.
+        :raises PyGitOpsValueError: The clone directory is not directly within the root.
+        """
+        clone_dir = self._within_root(clone_dir)
+        marker = _access_marker(clone_dir)
+        if marker is None:
+            return
+        if measure or not marker.exists():
+            marker.write_text(str(_disk_usage(clone_dir)))
+        else:
+            os.utime(marker)
+
+    def stats(self) -> CloneRootStats:
+        """
+        Get the occupancy of the root.
+
+        :return: The number of clones and the bytes they take, against the budget, and the evictions made through this instance.
+        """
+        clones = self._clones()
+        return CloneRootStats(
+            clones=len(clones),
+            used_bytes=sum(clone.size for clone in clones),
+            max_bytes=self.max_bytes,
+            evictions=self.evictions,
+            evicted_bytes=self.evicted_bytes,
+        )
+
+    def enforce(self, keep: Iterable[PathOrStr] = ()) -> list[Path]:
+        """
+        Evict the least recently used clones until the root is within budget, skipping the clones in use.
+
+        :param keep: Clone directories not to evict, e.g. the ones the caller is about to use.
+        :return: The evicted clone directories, least recently used first.
+        """
+        keep_names = {Path(clone_dir).name for clone_dir in keep}
+        with self._lock:
+            clones = self._clones()
+            used_bytes = sum(clone.size for clone in clones)
+            evicted = []
+            for clone in sorted(clones, key=lambda clone: clone.last_access):
+                if used_bytes <= self.max_bytes:
+                    break
+                if clone.path.name in keep_names or not self._evict(clone):
+                    continue
+                used_bytes -= clone.size
+                evicted.append(clone.path)
+            if used_bytes > self.max_bytes:
+                _logger.debug(
+                    f"[Clone Root] Still {used_bytes - self.max_bytes} bytes over budget, every other clone is in use: {self.root}"
+                )
+            return evicted
+
+    def evict(self, clone_dir: PathOrStr) -> bool:
+        """
+        Remove a clone from the root, unless it is in use.
+
+        :param clone_dir: Directory of the clone, directly within the root.
+        :raises PyGitOpsValueError: The clone directory is not directly within the root.
+        :return: True if the clone was removed.
+        """
+        clone_dir = self._within_root(clone_dir)
+        with self._lock:
+            clone = self._clone(clone_dir)
+            return clone is not None and self._evict(clone)
+
+    def _evict(self, clone: "_Clone") -> bool:
+        # must be called while holding the instance lock
+        with _try_lock_clone(
+            clone.path, _origin_url(clone.path), self.repo_locker
+        ) as locked:
+            if not locked:
+                _logger.debug(f"[Clone Root] Not evicting clone in use: {clone.path}")
+                return False
+            current = self._clone(clone.path)
+            if current is None or current.last_access != clone.last_access:
+                # removed, or used, by another process since it was chosen
+                return False
+            _logger.debug(f"[Clone Root] Evicting clone: {clone.path}")
+            stop_fsmonitor(clone.path)
+            GitChannel.release(clone.path / ".git")
+            shutil.rmtree(clone.path)
+        self.evictions += 1
+        self.evicted_bytes += clone.size
+        return True
+
+    def contains(self, clone_dir: PathOrStr) -> bool:
+        """
+        Determine if a clone directory is directly within the root.
+
+        :param clone_dir: Directory of a clone, which may not exist yet.
+        :return: True if the clone directory is managed by this root.
+        """
+        return Path(clone_dir).expanduser().resolve().parent == self.root.resolve()
+
+    def _within_root(self, clone_dir: PathOrStr) -> Path:
+        clone_dir = Path(clone_dir).expanduser()
+        if not self.contains(clone_dir):
+            raise PyGitOpsValueError(
+                f"The clone directory {clone_dir} is not directly within the clone root: {self.root}"
+            )
+        return self.root / clone_dir.name
+
+    def _clones(self) -> list["_Clone"]:
+        clones = []
+        for entry in os.scandir(self.root):
+            if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                continue
+            clone = self._clone(Path(entry.path))
+            if clone is not None:
+                clones.append(clone)
+        return clones
+
+    @staticmethod
+    def _clone(clone_dir: Path) -> "_Clone | None":
+        marker = _access_marker(clone_dir)
+        if marker is not None:
+            # the marker may not exist yet, or be in the middle of being written by another process
+            with suppress(FileNotFoundError, ValueError):
+                return _Clone(
+                    clone_dir, marker.stat().st_mtime, int(marker.read_text())
+                )
+        try:
+            # a clone that was never touched, or not made by git, is as old as its directory, and measured each time
+            return _Clone(clone_dir, clone_dir.stat().st_mtime, _disk_usage(clone_dir))
+        except FileNotFoundError:
+            return None
+
+
+@dataclass(frozen=True)
+class _Clone:
+    path: Path
+    last_access: float
+    size: int
+
+
+def _access_marker(clone_dir: Path) -> Path | None:
+    git_dir = clone_dir / ".git"
+    return git_dir / _ACCESS_MARKER if git_dir.is_dir() else None
+
+
+def _origin_url(clone_dir: Path) -> str:
+    try:
+        with Repo(clone_dir) as repo:
+            return repo.remotes.origin.url
+    except (GitError, AttributeError, ValueError):
+        return ""
+
+
+def _disk_usage(path: Path) -> int:
+    # bytes allocated on disk, counting files hard linked within the tree once
+    total = 0
+    seen = set()
+    pending = [str(path)]
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        for entry in entries:
+            try:
+                entry_stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.S_ISDIR(entry_stat.st_mode):
+                pending.append(entry.path)
+            if (entry_stat.st_dev, entry_stat.st_ino) in seen:
+                continue
+            seen.add((entry_stat.st_dev, entry_stat.st_ino))
+            blocks = getattr(entry_stat, "st_blocks", None)
+            total += entry_stat.st_size if blocks is None else blocks * 512
+    return total
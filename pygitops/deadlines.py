@@ -0,0 +1,201 @@
+"""Bound how long pygitops operations may spend talking to remotes and waiting for locks."""
+
+import contextvars
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from git import GitCommandError
+
+from pygitops._constants import DEFAULT_STALL_SECONDS
+from pygitops.exceptions import PyGitOpsTimeoutError, PyGitOpsValueError
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_current_deadline: contextvars.ContextVar["Deadline | None"] = contextvars.ContextVar(
+    "pygitops_deadline", default=None
+)
+
+# reported by curl once a transfer stays below `GIT_HTTP_LOW_SPEED_LIMIT` for `GIT_HTTP_LOW_SPEED_TIME` seconds
+_STALLED_TRANSFER_MESSAGE = "Operation too slow"
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """
+    Point in time by which the git operations of a context must be done, see `deadline`.
+
+    :attr expires_at: Value of `time.monotonic()` at which the deadline passes, or None for no time limit.
+    :attr min_bytes_per_second: Optional throughput below which a transfer over HTTP(S) is considered stalled.
+    :attr stall_seconds: Number of seconds a transfer may stay below `min_bytes_per_second` before it is aborted.
+    """
+
+    expires_at: float | None = None
+    min_bytes_per_second: int | None = None
+    stall_seconds: float = DEFAULT_STALL_SECONDS
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def remaining(self) -> float | None:
+        """
+        Get the time left until the deadline passes.
+
+        :raises PyGitOpsTimeoutError: The deadline has passed.
+        :return: The number of seconds left, or None if there is no time limit.
+        """
+        if self.expires_at is None:
+            return None
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise PyGitOpsTimeoutError("The deadline of the operation has passed")
+        return remaining
+
+
+@contextmanager
+def deadline(
+    seconds: float | None = None,
+    *,
+    min_bytes_per_second: int | None = None,
+    stall_seconds: float = DEFAULT_STALL_SECONDS,
+) -> Iterator[Deadline | None]:
+    """
+    Bound every pygitops operation run within the context.
+
+    Once the deadline passes, a git command talking to a remote is killed, a lock is no longer waited for,
+    and `PyGitOpsTimeoutError` is raised, releasing every lock held by the operations on its way out.
+    Commands that only touch the local repository, such as the cleanup of `feature_branch`, run to completion.
+    Deadlines nest, and an inner deadline cannot extend an outer one.
+
+    :param seconds: Optional number of seconds the context may take, unlimited if not provided.
+    :param min_bytes_per_second: Optional throughput below which a fetch, push, or clone over HTTP(S) is considered stalled.
+    :param stall_seconds: Number of seconds a transfer may stay below `min_bytes_per_second` before it is aborted.
+    :raises PyGitOpsValueError: The number of seconds is not positive.
+    :return: The deadline in effect within the context, or None if there is none.
+    """
+    if (seconds is not None and seconds <= 0) or stall_seconds <= 0:
+        raise PyGitOpsValueError(
+            f"A deadline must be positive, got: {seconds} seconds, stall after {stall_seconds} seconds"
+        )
+
+    outer = _current_deadline.get()
+    if seconds is None and min_bytes_per_second is None:
+        yield outer
+        return
+
+    expires_at = None if seconds is None else time.monotonic() + seconds
+    if outer is not None and outer.expires_at is not None:
+        expires_at = (
+            outer.expires_at
+            if expires_at is None
+            else min(expires_at, outer.expires_at)
+        )
+    if min_bytes_per_second is None and outer is not None:
+        min_bytes_per_second = outer.min_bytes_per_second
+        stall_seconds = outer.stall_seconds
+
+    current = Deadline(expires_at, min_bytes_per_second, stall_seconds)
+    token = _current_deadline.set(current)
+    try:
+        yield current
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Deadline | None:
+    """
+    Get the deadline in effect, see `deadline`.
+
+    :return: The deadline, or None if no deadline is in effect.
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def _network_call(description: str) -> Iterator[dict[str, Any]]:
+    # yields the keyword arguments bounding a git command that talks to a remote, empty when no deadline is in effect
+    current = _current_deadline.get()
+    if current is None:
+        yield {}
+        return
+
+    kwargs: dict[str, Any] = {}
+    remaining = current.remaining()
+    if remaining is not None:
+        # GitPython kills the command, and the processes it started directly, once the time is up
+        kwargs["kill_after_timeout"] = remaining
+    if current.min_bytes_per_second is not None:
+        kwargs["env"] = {
+            "GIT_HTTP_LOW_SPEED_LIMIT": str(current.min_bytes_per_second),
+            "GIT_HTTP_LOW_SPEED_TIME": str(max(round(current.stall_seconds), 1)),
+        }
+
+    try:
+        yield kwargs
+    except (GitCommandError, RuntimeError) as err:
+        if current.expired:
+            raise PyGitOpsTimeoutError(
+                f"The deadline of the operation passed while {description}"
+            ) from err
+        if _STALLED_TRANSFER_MESSAGE in str(err):
+            raise PyGitOpsTimeoutError(
+                f"The transfer stalled below {current.min_bytes_per_second} bytes per second while {description}"
+            ) from err
+        raise
+
+
+@contextmanager
+def _without_deadline() -> Iterator[None]:
+    # for cleanup that must run to completion, even once the deadline has passed
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def _check_deadline(description: str) -> None:
+    # raises if the deadline in effect has passed, e.g. after giving up on waiting for a lock
+    current = _current_deadline.get()
+    if current is not None and current.expired:
+        raise PyGitOpsTimeoutError(
+            f"The deadline of the operation passed while {description}"
+        )
+
+
+def _sleep(seconds: float) -> None:
+    # sleeps no longer than the deadline in effect, raising once it has passed
+    current = _current_deadline.get()
+    remaining = None if current is None else current.remaining()
+    if remaining is not None and remaining <= seconds:
+        time.sleep(remaining)
+        raise PyGitOpsTimeoutError(
+            "The deadline of the operation passed while waiting to retry"
+        )
+    time.sleep(seconds)
+
+
+def _with_current_deadline(function: Callable[[T], R]) -> Callable[[T], R]:
+    # thread pool workers do not inherit the context of the thread submitting work to them
+    current = _current_deadline.get()
+
+    def _run(arg: T) -> R:
+        token = _current_deadline.set(current)
+        try:
+            return function(arg)
+        finally:
+            _current_deadline.reset(token)
+
+    return _run
+
+
+def _lock_timeout(timeout: float) -> float:
+    # the time to wait for a lock, shortened to the deadline in effect
+    current = _current_deadline.get()
+    remaining = None if current is None else current.remaining()
+    return timeout if remaining is None else min(timeout, remaining)
@@ -0,0 +1,220 @@
+"""Cache the default branch of remote repositories."""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+from git import Git, Repo
+
+from pygitops._constants import DEFAULT_BRANCH_CACHE_TTL_SECONDS
+from pygitops.deadlines import _network_call
+from pygitops.exceptions import PyGitOpsError
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.types import PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+_SYMREF_HEAD_REGEX = re.compile(r"^ref: refs/heads/(\S+)\tHEAD$", re.MULTILINE)
+_HEAD_SHA_REGEX = re.compile(r"^([0-9a-f]{40,64})\tHEAD$", re.MULTILINE)
+
+
+class DefaultBranchCache:
+    """
+    Cache of default branch names, keyed by remote URL.
+
+    A cache miss is resolved with a single `git ls-remote --symref` query against the remote,
+    rather than the fetch followed by `git remote set-head -a` performed by `get_default_branch`.
+    Resolved names are kept in memory and, when `cache_dir` is provided, on disk so that they can be shared between processes.
+
+    Credentials embedded in a remote URL are not part of the cache key, and are never written to disk.
+
+    :param ttl_seconds: Number of seconds a resolved default branch stays valid.
+    :param cache_dir: Optional directory used to persist resolved default branches.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_BRANCH_CACHE_TTL_SECONDS,
+        cache_dir: PathOrStr | None = None,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._entries: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, repo_url: str) -> str | None:
+        """
+        Get the cached default branch of a remote.
+
+        :param repo_url: URL of the remote repository.
+        :return: Name of the default branch, or None if it is not cached or has expired.
+        """
+        key = _cache_key(repo_url)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._read_from_disk(key)
+            if entry is not None:
+                with self._lock:
+                    self._entries[key] = entry
+
+        if entry is None:
+            return None
+
+        default_branch, resolved_at = entry
+        if time.time() - resolved_at > self.ttl_seconds:
+            return None
+        return default_branch
+
+    def set(self, repo_url: str, default_branch: str) -> None:
+        """
+        Store the default branch of a remote.
+
+        :param repo_url: URL of the remote repository.
+        :param default_branch: Name of the default branch.
+        """
+        key = _cache_key(repo_url)
+        entry = (default_branch, time.time())
+        with self._lock:
+            self._entries[key] = entry
+        self._write_to_disk(key, entry)
+
+    def invalidate(self, repo_url: str | None = None) -> None:
+        """
+        Forget cached default branches.
+
+        :param repo_url: URL of the remote to forget, every remote is forgotten if not provided.
+        """
+        if repo_url is None:
+            with self._lock:
+                self._entries.clear()
+            if self.cache_dir is not None and self.cache_dir.exists():
+                for path in self.cache_dir.glob("*.json"):
+                    path.unlink(missing_ok=True)
+            return
+
+        key = _cache_key(repo_url)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_dir is not None:
+            (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
+
+    def resolve(self, repo: Repo) -> str:
+        """
+        Get the default branch of the origin remote of a repository, querying the remote on a cache miss.
+
+        :param repo: Repository whose origin remote is of interest.
+        :raises PyGitOpsError: The remote did not report a HEAD symbolic ref.
+        :return: Name of the default branch.
+        """
+        repo_url = repo.remotes.origin.url
+        default_branch = self.get(repo_url)
+        if default_branch is not None:
+            _logger.debug(
+                f"[Default Branch Cache] Cache hit for repo: {repo}, default branch: {default_branch}"
+            )
+            return default_branch
+
+        default_branch = query_default_branch(repo)
+        self.set(repo_url, default_branch)
+        return default_branch
+
+    def _read_from_disk(self, key: str) -> tuple[str, float] | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            data = json.loads((self.cache_dir / f"{key}.json").read_text())
+            return data["default_branch"], float(data["resolved_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_to_disk(self, key: str, entry: tuple[str, float]) -> None:
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        default_branch, resolved_at = entry
+        # write to a temporary file first, so that concurrent readers never observe a partial entry
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump(
+                {"default_branch": default_branch, "resolved_at": resolved_at},
+                tmp_file,
+            )
+        os.replace(tmp_name, self.cache_dir / f"{key}.json")
+
+
+def query_default_branch(repo: Repo) -> str:
+    """
+    Ask the origin remote of a repository for its default branch, in a single round trip.
+
+    :param repo: Repository whose origin remote is of interest.
+    :raises PyGitOpsError: The remote did not report a HEAD symbolic ref.
+    :return: Name of the default branch.
+    """
+    with _network_call(
+        f"querying the default branch of repo: {repo}"
+    ) as network_kwargs:
+        output = str(
+            repo.git.ls_remote(
+                "--symref", repo.remotes.origin.name, "HEAD", **network_kwargs
+            )
+        )
+
+    match = _SYMREF_HEAD_REGEX.search(output)
+    if not match:
+        raise PyGitOpsError(
+            f"The origin remote of repo: {repo} did not report a HEAD symbolic ref"
+        )
+    return match.group(1)
+
+
+def query_remote_head(repo: Repo) -> tuple[str, str]:
+    """
+    Ask the origin remote of a repository for its default branch and the commit at its tip, in a single round trip.
+
+    :param repo: Repository whose origin remote is of interest.
+    :raises PyGitOpsError: The remote did not report a HEAD symbolic ref.
+    :return: Name of the default branch, and the SHA of its tip.
+    """
+    head = ls_remote_head(repo.git, repo.remotes.origin.name)
+    if head is None:
+        raise PyGitOpsError(
+            f"The origin remote of repo: {repo} did not report a HEAD symbolic ref"
+        )
+    return head
+
+
+def ls_remote_head(
+    git: Git, remote: str, env: Mapping[str, str] | None = None
+) -> tuple[str, str] | None:
+    """
+    Ask a remote for its default branch and the commit at its tip with `git ls-remote --symref`.
+
+    :param git: Git command wrapper to run the query with, e.g. `Git()` for a remote given by URL.
+    :param remote: Name or URL of the remote.
+    :param env: Optional environment variables to run git with.
+    :return: Name of the default branch, and the SHA of its tip, or None if the remote did not report a HEAD symbolic ref.
+    """
+    with _network_call(
+        f"querying the default branch of remote: {_scrub_github_auth(remote)}"
+    ) as network_kwargs:
+        if env is not None:
+            network_kwargs["env"] = {**env, **network_kwargs.get("env", {})}
+        output = str(git.ls_remote("--symref", remote, "HEAD", **network_kwargs))
+
+    match = _SYMREF_HEAD_REGEX.search(output)
+    sha_match = _HEAD_SHA_REGEX.search(output)
+    if not match or not sha_match:
+        return None
+    return match.group(1), sha_match.group(1)
+
+
+def _cache_key(repo_url: str) -> str:
+    return hashlib.sha256(_scrub_github_auth(repo_url).encode()).hexdigest()
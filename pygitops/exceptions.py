@@ -10,5 +10,13 @@ class PyGitOpsStagedItemsError(PyGitOpsError):
     """There were no items to stage for commit."""
 
 
+class PyGitOpsRefUpdateError(PyGitOpsError):
+    """A ref could not be updated, because it was changed concurrently."""
+
+
+class PyGitOpsTimeoutError(PyGitOpsError):
+    """The deadline of an operation passed, or a transfer stalled, before the operation was done."""
+
+
 class PyGitOpsWorkingDirError(PyGitOpsError):
     """There was an error with the filesystem, namely `git.Repo.working_dir` is unexpectedly None."""
@@ -0,0 +1,123 @@
+"""Keep `git status` fast on large working trees, with the untracked cache, a split index, and the builtin fsmonitor daemon."""
+
+import functools
+import logging
+from collections.abc import Iterable
+from contextlib import suppress
+from pathlib import Path
+
+from git import Git, GitCommandError, Repo
+
+from pygitops._util import config_matches as _config_matches
+from pygitops._util import repo_working_dir as _repo_working_dir
+from pygitops.types import PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+# `git status` skips directories whose mtime did not change since they were last listed, and rewrites only the changed index entries
+_FAST_STATUS_CONFIG = (
+    ("core", "untrackedCache", "true"),
+    ("core", "splitIndex", "true"),
+)
+# builds of git with a builtin fsmonitor for the platform list this among their features
+_FSMONITOR_FEATURE = "feature: fsmonitor--daemon"
+
+
+@functools.cache
+def fsmonitor_supported() -> bool:
+    """
+    Determine if the git in use has a builtin fsmonitor daemon for this platform.
+
+    :return: True if `git fsmonitor--daemon` can watch working trees.
+    """
+    try:
+        build_options = Git().version("--build-options")
+    except GitCommandError:
+        return False
+    return _FSMONITOR_FEATURE in build_options.splitlines()
+
+
+def enable_fast_status(repo: Repo, fsmonitor: bool = True) -> bool:
+    """
+    Configure a clone so that `git status` does not walk its whole working tree on every call.
+
+    The untracked cache lets status skip the directories that did not change since they were last listed,
+    and the split index keeps each index write to the changed entries. Where git supports it, the builtin fsmonitor daemon
+    is also started, so that status only looks at the paths changed since its previous call. Elsewhere, or if the daemon
+    cannot watch the working tree, e.g. on a network filesystem, the clone is left without it.
+
+    These are kept in the configuration of the clone, and benefit every status taken on it, such as the untracked files
+    checked by `feature_branch` and the changes inferred by `stage_commit_push_changes`.
+
+    :param repo: The clone to configure.
+    :param fsmonitor: Whether to use the fsmonitor daemon where it is supported.
+    :return: True if the fsmonitor daemon watches the working tree.
+    """
+    if not _config_matches(repo, _FAST_STATUS_CONFIG):
+        with repo.config_writer() as config:
+            for section, option, value in _FAST_STATUS_CONFIG:
+                config.set_value(section, option, value)
+        # add both to the index right away, rather than on the next command writing it
+        repo.git.update_index("--untracked-cache", "--split-index")
+
+    if not (fsmonitor and fsmonitor_supported()):
+        return False
+    try:
+        if not _fsmonitor_running(repo.git):
+            # `fsmonitor__daemon` runs `git fsmonitor--daemon`, which returns once the daemon it spawns is watching
+            repo.git.fsmonitor__daemon("start")
+    except GitCommandError as err:
+        _logger.debug(f"[Fast Status] fsmonitor cannot watch repo: {repo}: {err}")
+        _unset_config(repo, (("core", "fsmonitor"),))
+        return False
+    if not _config_matches(repo, (("core", "fsmonitor", "true"),)):
+        with repo.config_writer() as config:
+            config.set_value("core", "fsmonitor", "true")
+    return True
+
+
+def disable_fast_status(repo: Repo) -> None:
+    """
+    Stop the fsmonitor daemon of a clone, and remove the configuration made by `enable_fast_status`.
+
+    :param repo: The clone to restore.
+    """
+    stop_fsmonitor(Path(_repo_working_dir(repo)))
+    _unset_config(
+        repo,
+        [("core", "fsmonitor")]
+        + [(section, option) for section, option, _ in _FAST_STATUS_CONFIG],
+    )
+    repo.git.update_index("--no-untracked-cache", "--no-split-index")
+
+
+def stop_fsmonitor(working_dir: PathOrStr) -> None:
+    """
+    Stop the fsmonitor daemon watching a working tree, if one is running.
+
+    The daemon outlives the processes using the clone, so it is stopped before the working tree is removed.
+
+    :param working_dir: The working tree, of a clone or a worktree.
+    """
+    if not fsmonitor_supported():
+        return
+    git = Git(working_dir)
+    with suppress(GitCommandError):
+        if _fsmonitor_running(git):
+            git.fsmonitor__daemon("stop")
+
+
+def _fsmonitor_running(git: Git) -> bool:
+    # `status` fails when no daemon is watching the working tree
+    try:
+        git.fsmonitor__daemon("status")
+    except GitCommandError:
+        return False
+    return True
+
+
+def _unset_config(repo: Repo, options: Iterable[tuple[str, str]]) -> None:
+    with repo.config_writer() as config:
+        for section, option in options:
+            if config.has_option(section, option):
+                config.remove_option(section, option)
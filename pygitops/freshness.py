@@ -0,0 +1,251 @@
+"""Find out which clones are behind their remotes by querying remote tips, without fetching anything."""
+
+import logging
+import threading
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+
+from git import Git, GitCommandError, Repo, SymbolicReference
+from git.exc import InvalidGitRepositoryError, NoSuchPathError
+
+from pygitops._constants import (
+    DEFAULT_SCAN_MAX_WORKERS,
+    DEFAULT_WATCH_BACKOFF_FACTOR,
+    DEFAULT_WATCH_MAX_INTERVAL_SECONDS,
+    DEFAULT_WATCH_MIN_INTERVAL_SECONDS,
+)
+from pygitops.deadlines import _with_current_deadline
+from pygitops.default_branch_cache import ls_remote_head
+from pygitops.exceptions import PyGitOpsError, PyGitOpsValueError
+from pygitops.locking import RepoLocker
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.types import FreshnessResult, PathOrStr, RemoteChange
+
+_logger = logging.getLogger(__name__)
+
+# a remote asking for credentials fails the query, rather than blocking a worker on a prompt
+_LS_REMOTE_ENV = {"GIT_TERMINAL_PROMPT": "0"}
+
+
+def query_default_branch_tip(repo_url: str) -> tuple[str, str]:
+    """
+    Ask a remote for its default branch and the commit at its tip, in a single round trip and without a local clone.
+
+    :param repo_url: URL of the remote repository.
+    :raises PyGitOpsError: The remote could not be queried, or did not report a HEAD symbolic ref.
+    :return: Name of the default branch, and the SHA of its tip.
+    """
+    try:
+        head = ls_remote_head(Git(), repo_url, env=_LS_REMOTE_ENV)
+    except GitCommandError as e:
+        raise PyGitOpsError(
+            f"Error querying the tip of repo {_scrub_github_auth(repo_url)}: {_scrub_github_auth(str(e))}"
+        ) from e
+    if head is None:
+        raise PyGitOpsError(
+            f"The remote {_scrub_github_auth(repo_url)} did not report a HEAD symbolic ref"
+        )
+    return head
+
+
+def scan_freshness(
+    items: Iterable[tuple[str, PathOrStr]],
+    max_workers: int = DEFAULT_SCAN_MAX_WORKERS,
+    repo_locker: RepoLocker | None = None,
+) -> list[FreshnessResult]:
+    """
+    Compare the tip of the default branch of many remotes with the same branch of their local clones, concurrently.
+
+    Each remote is asked for its tip with a single `git ls-remote --symref` query, and nothing is fetched,
+    so only the clones reported as stale need to be updated with `get_updated_repo`.
+    A failure to query one remote does not stop the others from being scanned.
+
+    :param items: Tuples of repo URL, and the directory the repository is cloned to.
+    :param max_workers: Maximum number of remotes queried at the same time.
+    :param repo_locker: Optional locker, whose `read_mode` lock on a clone is held while its branch is read,
+        so that a clone is not read halfway through an update. A clone whose lock is not acquired in time is reported with an error.
+    :return: One result per item, in the order the items were provided.
+    """
+
+    def _scan(item: tuple[str, PathOrStr]) -> FreshnessResult:
+        repo_url, clone_dir = item
+        result = FreshnessResult(repo_url=repo_url, clone_dir=Path(clone_dir))
+        try:
+            result.default_branch, result.remote_sha = query_default_branch_tip(
+                repo_url
+            )
+        except PyGitOpsError as e:
+            _logger.debug(f"Failed to scan repo: {_scrub_github_auth(repo_url)}: {e}")
+            result.error = e
+            return result
+        try:
+            with (
+                nullcontext()
+                if repo_locker is None
+                else repo_locker.lock_clone(
+                    result.clone_dir, repo_url, mode=repo_locker.read_mode
+                )
+            ):
+                result.local_sha = _local_branch_sha(
+                    result.clone_dir, result.default_branch
+                )
+        except PyGitOpsError as e:
+            _logger.debug(f"Failed to lock clone: {result.clone_dir}: {e}")
+            result.error = e
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_with_current_deadline(_scan), items))
+
+
+class RemoteWatcher:
+    """
+    Watch the default branch of many remotes, reporting each time one of them moves.
+
+    Every remote is polled on its own schedule. The interval of a remote starts at `min_interval_seconds`,
+    grows by `backoff_factor` each time a poll finds nothing new, up to `max_interval_seconds`,
+    and drops back to `min_interval_seconds` once the remote changes, so busy remotes are polled often and quiet ones rarely.
+    A remote that cannot be queried is backed off as if it had not changed.
+
+    :param repo_urls: URLs of the remote repositories to watch.
+    :param known_tips: Optional SHA of the default branch of each remote, as last seen e.g. by `scan_freshness`.
+        A remote found at another commit on its first poll is reported as changed, while the first poll of other remotes only records their tip.
+    :param min_interval_seconds: Shortest time between two polls of a remote.
+    :param max_interval_seconds: Longest time between two polls of a remote.
+    :param backoff_factor: Factor the interval of a remote grows by after each poll finding nothing new.
+    :param max_workers: Maximum number of remotes queried at the same time.
+    :raises PyGitOpsValueError: The intervals or backoff factor are invalid.
+    """
+
+    def __init__(
+        self,
+        repo_urls: Iterable[str],
+        *,
+        known_tips: Mapping[str, str] | None = None,
+        min_interval_seconds: float = DEFAULT_WATCH_MIN_INTERVAL_SECONDS,
+        max_interval_seconds: float = DEFAULT_WATCH_MAX_INTERVAL_SECONDS,
+        backoff_factor: float = DEFAULT_WATCH_BACKOFF_FACTOR,
+        max_workers: int = DEFAULT_SCAN_MAX_WORKERS,
+    ) -> None:
+        if min_interval_seconds <= 0 or max_interval_seconds < min_interval_seconds:
+            raise PyGitOpsValueError(
+                f"Expected 0 < min_interval_seconds <= max_interval_seconds, got: {min_interval_seconds}, {max_interval_seconds}"
+            )
+        if backoff_factor < 1:
+            raise PyGitOpsValueError(
+                f"The backoff factor must be at least 1, got: {backoff_factor}"
+            )
+
+        self.min_interval_seconds = min_interval_seconds
+        self.max_interval_seconds = max_interval_seconds
+        self.backoff_factor = backoff_factor
+        self.max_workers = max_workers
+        known_tips = known_tips or {}
+        now = time.monotonic()
+        self._remotes = {
+            repo_url: _WatchedRemote(
+                sha=known_tips.get(repo_url),
+                interval=min_interval_seconds,
+                next_poll=now,
+            )
+            for repo_url in repo_urls
+        }
+
+    def interval(self, repo_url: str) -> float:
+        """
+        Get the current time between two polls of a remote.
+
+        :param repo_url: URL of a watched remote.
+        :return: The interval, in seconds.
+        """
+        return self._remotes[repo_url].interval
+
+    def poll(self) -> list[RemoteChange]:
+        """
+        Query every remote that is due, and reschedule it according to whether it changed.
+
+        :return: The remotes whose default branch moved since they were last polled.
+        """
+        now = time.monotonic()
+        due = [
+            repo_url
+            for repo_url, remote in self._remotes.items()
+            if remote.next_poll <= now
+        ]
+        if not due:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            tips = list(executor.map(_with_current_deadline(self._query), due))
+
+        changes = []
+        now = time.monotonic()
+        for repo_url, tip in zip(due, tips, strict=True):
+            remote = self._remotes[repo_url]
+            if tip is not None and remote.sha is not None and tip[1] != remote.sha:
+                changes.append(
+                    RemoteChange(
+                        repo_url=repo_url,
+                        default_branch=tip[0],
+                        previous_sha=remote.sha,
+                        sha=tip[1],
+                    )
+                )
+                remote.interval = self.min_interval_seconds
+            elif remote.sha is not None or tip is None:
+                remote.interval = min(
+                    remote.interval * self.backoff_factor, self.max_interval_seconds
+                )
+            if tip is not None:
+                remote.sha = tip[1]
+            remote.next_poll = now + remote.interval
+        return changes
+
+    def watch(self, stop: threading.Event | None = None) -> Iterator[RemoteChange]:
+        """
+        Poll the remotes as they become due, yielding each change as it is found.
+
+        :param stop: Optional event ending the watch once it is set, checked between polls.
+        :return: An endless iterator of changes, unless `stop` is provided.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            yield from self.poll()
+            next_poll = min(
+                (remote.next_poll for remote in self._remotes.values()), default=None
+            )
+            if next_poll is None:
+                return
+            stop.wait(max(next_poll - time.monotonic(), 0))
+
+    def _query(self, repo_url: str) -> tuple[str, str] | None:
+        try:
+            return query_default_branch_tip(repo_url)
+        except PyGitOpsError as e:
+            _logger.debug(f"Failed to poll repo: {_scrub_github_auth(repo_url)}: {e}")
+            return None
+
+
+@dataclass
+class _WatchedRemote:
+    sha: str | None
+    interval: float
+    next_poll: float
+
+
+def _local_branch_sha(clone_dir: Path, branch: str) -> str | None:
+    try:
+        repo = Repo(clone_dir)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return None
+    try:
+        # reads the ref files alone, without spawning git
+        return SymbolicReference.dereference_recursive(repo, f"refs/heads/{branch}")
+    except ValueError:
+        return None
+    finally:
+        repo.close()
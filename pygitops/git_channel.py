@@ -0,0 +1,237 @@
+"""Answer object and ref queries through a long-lived git process, rather than spawning git for each query."""
+
+import logging
+import os
+import threading
+import weakref
+from collections.abc import Iterable
+from contextlib import suppress
+from subprocess import PIPE
+from typing import IO
+
+from git import Git, GitCommandError, Repo
+
+from pygitops.exceptions import PyGitOpsError, PyGitOpsValueError
+from pygitops.types import PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+# queries written ahead of reading their answers, few enough that the answers fit in the pipe buffer
+_PIPELINE_DEPTH = 256
+_BATCH_CHECK_FORMAT = "%(objectname) %(objecttype)"
+
+# channels shared by the repo objects of each git directory, keyed on the canonical path of the git directory
+_channels: "dict[str, GitChannel]" = {}
+# reentrant, as repo objects may be garbage collected, and forgotten by their channel, while it is held
+_channels_lock = threading.RLock()
+
+
+class GitChannel:
+    """
+    Long-lived `git cat-file --batch-check` process of one repository, resolving revisions without spawning git for each of them.
+
+    Revisions are resolved against the current state of the repository, so refs and objects written after the channel was started are seen.
+    The process is started again if it exited, or if the repository it was started in was removed and created again at the same path.
+    A channel is safe to share between threads. Use `GitChannel.for_repo` to share one channel between every operation on a repository.
+
+    :param repo: The repository to query. Only a weak reference to it is kept.
+    """
+
+    def __init__(self, repo: Repo) -> None:
+        self.git_dir = _channel_key(repo)
+        self._repo = weakref.ref(repo)
+        # the process runs in the working tree, as GitPython's own processes do
+        self._working_dir = repo.working_dir or repo.git_dir
+        self._process: Git.AutoInterrupt | None = None
+        self._identity: tuple[tuple[int, int], ...] | None = None
+        self._users: dict[int, weakref.finalize] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def repo(self) -> Repo | None:
+        """The repository the channel was created for, or None once it was garbage collected."""
+        return self._repo()
+
+    @classmethod
+    def for_repo(cls, repo: Repo) -> "GitChannel":
+        """
+        Get the channel shared by every repo object of a git directory, starting it if needed.
+
+        The channel is closed, and forgotten, once every repo object that used it is garbage collected, or when it is released.
+
+        :param repo: The repository to query.
+        """
+        key = _channel_key(repo)
+        with _channels_lock:
+            channel = _channels.get(key)
+            if channel is None:
+                channel = _channels[key] = cls(repo)
+            if id(repo) not in channel._users:
+                channel._users[id(repo)] = weakref.finalize(
+                    repo, _forget_user, key, channel, id(repo)
+                )
+        return channel
+
+    @classmethod
+    def shared(cls, repo: Repo) -> "GitChannel | None":
+        """
+        Get the channel shared by every operation on a repository, without starting one.
+
+        :param repo: The repository to query.
+        :return: The shared channel, or None if no operation used one yet.
+        """
+        with _channels_lock:
+            return _channels.get(_channel_key(repo))
+
+    @classmethod
+    def release(cls, repo: "Repo | PathOrStr") -> None:
+        """
+        Stop the channel shared by every operation on a repository, if any, and forget it.
+
+        Call it before a repository is removed, or once it is closed.
+
+        :param repo: The repository whose channel should be stopped, or the path of its git directory.
+        """
+        key = _channel_key(repo)
+        with _channels_lock:
+            channel = _channels.pop(key, None)
+            if channel is not None:
+                for user in channel._users.values():
+                    user.detach()
+                channel._users.clear()
+        if channel is not None:
+            channel.close()
+
+    @property
+    def running(self) -> bool:
+        """Whether the git process of this channel is running."""
+        return self._process is not None
+
+    def resolve(self, rev: str) -> str | None:
+        """
+        Resolve a revision to the SHA of the object it names.
+
+        :param rev: Any revision understood by `git rev-parse`, e.g. `refs/heads/main` or `HEAD^{tree}`.
+        :raises PyGitOpsValueError: The revision contains a line break.
+        :raises PyGitOpsError: The git process exited unexpectedly.
+        :return: The SHA, or None if the revision does not name an object.
+        """
+        return self.resolve_many([rev])[0]
+
+    def resolve_many(self, revs: Iterable[str]) -> list[str | None]:
+        """
+        Resolve many revisions, pipelining the queries rather than waiting for each answer in turn.
+
+        :param revs: Revisions understood by `git rev-parse`.
+        :raises PyGitOpsValueError: A revision contains a line break.
+        :raises PyGitOpsError: The git process exited unexpectedly.
+        :return: The SHA each revision names, or None for revisions that do not name an object, in order.
+        """
+        revs = list(revs)
+        for rev in revs:
+            if "\n" in rev or "\r" in rev:
+                raise PyGitOpsValueError(f"Cannot resolve revision: {rev!r}")
+
+        shas: list[str | None] = []
+        with self._lock:
+            for start in range(0, len(revs), _PIPELINE_DEPTH):
+                shas.extend(self._query(revs[start : start + _PIPELINE_DEPTH]))
+        return shas
+
+    def close(self) -> None:
+        """Stop the git process, a later query starts a new one."""
+        with self._lock:
+            self._stop()
+
+    def __enter__(self) -> "GitChannel":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _query(self, revs: list[str]) -> list[str | None]:
+        # must be called while holding the channel lock
+        stdin, stdout = self._pipes()
+        try:
+            stdin.write("".join(f"{rev}\n" for rev in revs).encode())
+            stdin.flush()
+            answers = [stdout.readline().decode() for _ in revs]
+        except OSError as err:
+            self._stop()
+            raise PyGitOpsError(
+                f"The git channel of repo: {self.git_dir} exited unexpectedly"
+            ) from err
+        if not all(answers):
+            self._stop()
+            raise PyGitOpsError(
+                f"The git channel of repo: {self.git_dir} exited unexpectedly"
+            )
+
+        shas: list[str | None] = []
+        for answer in answers:
+            sha, _, kind = answer.rstrip("\n").rpartition(" ")
+            # unknown revisions are answered with `<rev> missing`, or `<rev> ambiguous`
+            shas.append(None if kind in ("missing", "ambiguous") else sha)
+        return shas
+
+    def _pipes(self) -> tuple[IO[bytes], IO[bytes]]:
+        if self._process is not None and not self._usable():
+            _logger.debug(f"Restarting stale git channel for repo: {self.git_dir}")
+            self._stop()
+        if self._process is None:
+            self._identity = _identity(self._working_dir, self.git_dir)
+            # the process is killed once this handle is garbage collected
+            self._process = Git(self._working_dir).cat_file(
+                f"--batch-check={_BATCH_CHECK_FORMAT}", istream=PIPE, as_process=True
+            )
+            _logger.debug(f"Started git channel for repo: {self.git_dir}")
+
+        proc = self._process.proc
+        if proc is None or proc.stdin is None or proc.stdout is None:
+            raise PyGitOpsError(
+                f"The git channel of repo: {self.git_dir} is not running"
+            )
+        return proc.stdin, proc.stdout
+
+    def _usable(self) -> bool:
+        # the process may have exited, or the repository may have been removed and created again at the same path,
+        # which a process started in the removed directory would never see
+        if self._process is None or self._process.proc is None:
+            return False
+        if self._process.proc.poll() is not None:
+            return False
+        return _identity(self._working_dir, self.git_dir) == self._identity
+
+    def _stop(self) -> None:
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        # git exits once it reads the end of its input, unless it already exited, or was killed
+        with suppress(OSError, GitCommandError):
+            if process.proc is not None and process.proc.stdin is not None:
+                process.proc.stdin.close()
+            process.wait()
+        _logger.debug(f"Stopped git channel for repo: {self.git_dir}")
+
+
+def _channel_key(repo: "Repo | PathOrStr") -> str:
+    git_dir = repo.git_dir if isinstance(repo, Repo) else repo
+    return os.path.realpath(git_dir)
+
+
+def _identity(*paths: "str | os.PathLike[str]") -> tuple[tuple[int, int], ...] | None:
+    # a directory created again at the same path is another inode, as the process keeps the removed one alive
+    try:
+        return tuple((stat.st_dev, stat.st_ino) for stat in map(os.stat, paths))
+    except OSError:
+        return None
+
+
+def _forget_user(key: str, channel: GitChannel, user: int) -> None:
+    # called once a repo object that used the channel is garbage collected
+    with _channels_lock:
+        channel._users.pop(user, None)
+        if channel._users or _channels.get(key) is not channel:
+            return
+        del _channels[key]
+    channel.close()
@@ -0,0 +1,342 @@
+"""Locks serializing work on local clones, with pluggable backends and shared or exclusive modes."""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from pathlib import Path
+from urllib.parse import quote
+
+from filelock import FileLock, Timeout
+from git import Repo
+
+from pygitops import _util
+from pygitops._constants import DEFAULT_LOCKFILE_DIR
+from pygitops.deadlines import _check_deadline, _lock_timeout
+from pygitops.exceptions import PyGitOpsError, PyGitOpsValueError
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.types import LockKey, LockMode, PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+# longest lock key used as is in a file name, longer keys are hashed
+_MAX_LOCKFILE_KEY_LENGTH = 200
+_SQLITE_POLL_INTERVAL_SECONDS = 0.05
+# how long registering and releasing holders waits for the database write lock, the default of sqlite3
+_SQLITE_BUSY_TIMEOUT_SECONDS = 5.0
+
+
+class LockBackend(ABC):
+    """Interface of the backends taking the locks handed out by `RepoLocker`."""
+
+    # whether `LockMode.SHARED` locks can be acquired
+    supports_shared_locks = False
+
+    @abstractmethod
+    def acquire(
+        self, key: str, mode: LockMode, timeout: float
+    ) -> AbstractContextManager[None]:
+        """
+        Hold the lock on `key` for the duration of the returned context.
+
+        :param key: Identifies the locked resource.
+        :param mode: Whether the lock may be shared with other shared holders.
+        :param timeout: Seconds to wait for the lock.
+        :raises PyGitOpsValueError: The backend does not support the mode.
+        :raises PyGitOpsError: The lock could not be acquired in time.
+        """
+
+
+class FileLockBackend(LockBackend):
+    """
+    Lock backend holding one `filelock.FileLock` per key.
+
+    Only exclusive locks are supported, as file locks do not portably support shared holders, see `SQLiteLockBackend`.
+    With the default directory and `LockKey.NAME` keys, it uses the same lockfiles as `feature_branch` does without a locker.
+
+    :param lock_dir: Directory holding the lockfiles.
+    """
+
+    def __init__(self, lock_dir: PathOrStr = DEFAULT_LOCKFILE_DIR) -> None:
+        self.lock_dir = Path(lock_dir)
+
+    def lockfile_path(self, key: str) -> Path:
+        """Path of the lockfile for the given key."""
+        name = quote(key, safe="")
+        if len(name) > _MAX_LOCKFILE_KEY_LENGTH:
+            name = hashlib.sha256(key.encode()).hexdigest()
+        return self.lock_dir / f"{name}_lock_file.lock"
+
+    @contextmanager
+    def acquire(self, key: str, mode: LockMode, timeout: float) -> Iterator[None]:
+        """
+        Hold the lockfile of `key` for the duration of the returned context.
+
+        :param key: Identifies the locked resource.
+        :param mode: Must be exclusive.
+        :param timeout: Seconds to wait for the lock.
+        :raises PyGitOpsValueError: A shared lock was requested.
+        :raises PyGitOpsError: The lock could not be acquired in time.
+        """
+        if mode != LockMode.EXCLUSIVE:
+            # taking it exclusively instead would make readers wait for each other, unbeknownst to them
+            raise PyGitOpsValueError(
+                f"Lockfiles cannot be shared, use a backend supporting shared locks to lock: {key}"
+            )
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        lockfile_name = str(self.lockfile_path(key))
+        try:
+            with FileLock(lockfile_name).acquire(timeout=timeout):
+                yield
+        except Timeout as err:
+            raise _timeout_error(timeout, lockfile_name) from err
+
+
+class SQLiteLockBackend(LockBackend):
+    """
+    Lock backend keeping track of lock holders in a SQLite database, supporting shared holders.
+
+    The database may be used by every process of one node, but not over a network filesystem.
+    Locks held by processes that have exited are released automatically.
+
+    :param database_path: Path of the database, created if it does not exist.
+    """
+
+    supports_shared_locks = True
+
+    def __init__(self, database_path: PathOrStr) -> None:
+        self.database_path = Path(database_path)
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pygitops_locks "
+                "(owner TEXT PRIMARY KEY, key TEXT NOT NULL, mode TEXT NOT NULL, pid INTEGER NOT NULL)"
+            )
+
+    @contextmanager
+    def acquire(self, key: str, mode: LockMode, timeout: float) -> Iterator[None]:
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while not self._try_acquire(key, mode, owner):
+            if time.monotonic() >= deadline:
+                raise _timeout_error(timeout, f"{self.database_path}:{key}")
+            time.sleep(_SQLITE_POLL_INTERVAL_SECONDS)
+        try:
+            yield
+        finally:
+            with self._connect() as connection:
+                connection.execute(
+                    "DELETE FROM pygitops_locks WHERE owner = ?", (owner,)
+                )
+
+    def _try_acquire(self, key: str, mode: LockMode, owner: str) -> bool:
+        try:
+            return self._register_holder(key, mode, owner)
+        except sqlite3.OperationalError as e:
+            # another process holds the database write lock, try again on the next poll
+            _logger.debug(f"Failed to check the holders of lock: {key}: {e}")
+            return False
+
+    def _register_holder(self, key: str, mode: LockMode, owner: str) -> bool:
+        # wait for the database write lock no longer than one poll, so that the timeout of the lock is kept
+        with self._connect(busy_timeout=_SQLITE_POLL_INTERVAL_SECONDS) as connection:
+            # take the database write lock, so that checking and registering holders is atomic
+            connection.execute("BEGIN IMMEDIATE")
+            holders = connection.execute(
+                "SELECT owner, mode, pid FROM pygitops_locks WHERE key = ?", (key,)
+            ).fetchall()
+            live_modes = []
+            for holder_owner, holder_mode, holder_pid in holders:
+                if _pid_exited(holder_pid):
+                    connection.execute(
+                        "DELETE FROM pygitops_locks WHERE owner = ?", (holder_owner,)
+                    )
+                    _logger.debug(
+                        f"Released lock: {key} held by exited process: {holder_pid}"
+                    )
+                else:
+                    live_modes.append(holder_mode)
+
+            if live_modes and (
+                mode == LockMode.EXCLUSIVE or LockMode.EXCLUSIVE.value in live_modes
+            ):
+                connection.execute("COMMIT")
+                return False
+
+            connection.execute(
+                "INSERT INTO pygitops_locks (owner, key, mode, pid) VALUES (?, ?, ?, ?)",
+                (owner, key, LockMode(mode).value, os.getpid()),
+            )
+            connection.execute("COMMIT")
+            return True
+
+    @contextmanager
+    def _connect(
+        self, busy_timeout: float = _SQLITE_BUSY_TIMEOUT_SECONDS
+    ) -> Iterator[sqlite3.Connection]:
+        # autocommit mode, transactions are begun explicitly
+        connection = sqlite3.connect(
+            self.database_path, timeout=busy_timeout, isolation_level=None
+        )
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+
+class RepoLocker:
+    """
+    Hands out locks on local clones, for `feature_branch` and `get_updated_repo` to use instead of their default lockfiles.
+
+    Operations changing a clone hold its exclusive lock. Work that only reads a clone may hold a shared lock instead,
+    with a backend supporting them, such as `SQLiteLockBackend`. The operations reading a clone, such as `scan_freshness`,
+    take the lock of `read_mode`.
+
+    :param backend: Backend taking the locks, defaults to lockfiles in the default directory.
+    :param key: What identifies a clone, see `LockKey`.
+    :param timeout: Seconds to wait for a lock, defaults to the 10 seconds `feature_branch` waits for its default lockfile.
+        Note that without a locker `get_updated_repo` waits for its lockfile for as long as it takes,
+        so passing a locker bounds that wait too.
+    """
+
+    def __init__(
+        self,
+        backend: LockBackend | None = None,
+        key: LockKey | str = LockKey.NAME,
+        timeout: float | None = None,
+    ) -> None:
+        self.backend = backend or FileLockBackend()
+        self.key = LockKey(key)
+        self.timeout = timeout
+
+    @property
+    def read_mode(self) -> LockMode:
+        """
+        Mode of the locks taken by operations that only read a clone.
+
+        Shared when the backend supports shared locks, and exclusive otherwise.
+        """
+        return (
+            LockMode.SHARED
+            if self.backend.supports_shared_locks
+            else LockMode.EXCLUSIVE
+        )
+
+    def lock(
+        self,
+        repo: Repo,
+        mode: LockMode | str = LockMode.EXCLUSIVE,
+        timeout: float | None = None,
+    ) -> AbstractContextManager[None]:
+        """
+        Lock a repo for the duration of the returned context.
+
+        :param repo: The repo to lock.
+        :param mode: Whether the lock may be shared with other shared holders.
+        :param timeout: Seconds to wait for the lock, overriding the timeout of the locker.
+        :raises PyGitOpsValueError: A shared lock was requested from a backend that does not support them.
+        :raises PyGitOpsError: The lock could not be acquired in time.
+        """
+        remote_url = repo.remotes.origin.url if self.key == LockKey.REMOTE_URL else ""
+        return self._acquire(
+            self._key(_util.repo_working_dir(repo), remote_url), mode, timeout
+        )
+
+    def lock_clone(
+        self,
+        clone_dir: PathOrStr,
+        repo_url: str,
+        mode: LockMode | str = LockMode.EXCLUSIVE,
+        timeout: float | None = None,
+    ) -> AbstractContextManager[None]:
+        """
+        Lock a clone that may not exist yet, identified by its directory and remote URL.
+
+        :param clone_dir: Directory of the clone.
+        :param repo_url: URL of the remote the clone is cloned from.
+        :param mode: Whether the lock may be shared with other shared holders.
+        :param timeout: Seconds to wait for the lock, overriding the timeout of the locker.
+        :raises PyGitOpsValueError: A shared lock was requested from a backend that does not support them.
+        :raises PyGitOpsError: The lock could not be acquired in time.
+        """
+        return self._acquire(self._key(clone_dir, repo_url), mode, timeout)
+
+    def _key(self, working_dir: PathOrStr | os.PathLike, remote_url: str) -> str:
+        if self.key == LockKey.PATH:
+            return os.path.realpath(working_dir)
+        if self.key == LockKey.REMOTE_URL:
+            # credentials and the optional `.git` suffix do not change which repository a URL refers to
+            return _scrub_github_auth(remote_url).rstrip("/").removesuffix(".git")
+        return os.path.basename(os.path.normpath(working_dir))
+
+    @contextmanager
+    def _acquire(
+        self, key: str, mode: LockMode | str, timeout: float | None
+    ) -> Iterator[None]:
+        mode = LockMode(mode)
+        if timeout is None:
+            timeout = (
+                self.timeout
+                if self.timeout is not None
+                else _util.FILELOCK_ACQUIRE_TIMEOUT_SECONDS
+            )
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(
+                    self.backend.acquire(key, mode, _lock_timeout(timeout))
+                )
+            except PyGitOpsError:
+                # the wait may have been cut short by the deadline in effect
+                _check_deadline(f"waiting for the {mode.value} lock: {key}")
+                raise
+            _logger.debug(f"Successfully acquired {mode.value} lock: {key}")
+            yield
+            _logger.debug(f"About to release {mode.value} lock: {key}")
+
+
+@contextmanager
+def _try_lock_clone(
+    clone_dir: Path, repo_url: str, repo_locker: RepoLocker | None
+) -> Iterator[bool]:
+    # takes, without waiting, the locks every operation changing the clone takes: the lock `get_updated_repo` takes
+    # on the clone directory and the lock `feature_branch` takes on the repo, or the exclusive lock of `repo_locker` instead
+    with ExitStack() as stack:
+        try:
+            if repo_locker is None:
+                for lockfile_path in (
+                    _util.get_clone_lockfile_path(clone_dir),
+                    _util.get_lockfile_path(Path(os.path.realpath(clone_dir)).name),
+                ):
+                    stack.enter_context(FileLock(str(lockfile_path)).acquire(timeout=0))
+            else:
+                stack.enter_context(
+                    repo_locker.lock_clone(clone_dir, repo_url, timeout=0)
+                )
+        except (Timeout, PyGitOpsError):
+            yield False
+            return
+        yield True
+
+
+def _timeout_error(timeout: float, lock_name: str) -> PyGitOpsError:
+    return PyGitOpsError(
+        f"The timeout of {timeout} seconds was exceeded when attempting to acquire the lockfile: {lock_name}"
+    )
+
+
+def _pid_exited(pid: int) -> bool:
+    if os.name != "posix":
+        # signalling a process to probe it is only harmless on POSIX
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
@@ -0,0 +1,255 @@
+"""Run git's maintenance tasks on clones on a schedule, instead of letting git start garbage collection on its own."""
+
+import logging
+import threading
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+from typing import Any
+
+from git import GitCommandError, Repo
+from git.exc import InvalidGitRepositoryError, NoSuchPathError
+
+from pygitops._constants import (
+    DEFAULT_MAINTENANCE_INTERVALS_SECONDS,
+    DEFAULT_MAINTENANCE_RETRY_SECONDS,
+)
+from pygitops._util import config_matches as _config_matches
+from pygitops._util import repo_working_dir as _repo_working_dir
+from pygitops.deadlines import _network_call
+from pygitops.exceptions import PyGitOpsError, PyGitOpsValueError
+from pygitops.locking import RepoLocker, _try_lock_clone
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.types import MaintenanceResult, MaintenanceTask, PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+# modified each time a task succeeds on a clone, followed by the name of the task
+_TASK_MARKER_PREFIX = "pygitops_maintenance_"
+
+# commands such as fetch, merge and commit run `git gc --auto`, or `git maintenance run --auto`, unless these are set
+_AUTO_GC_CONFIG = (("gc", "auto", "0"), ("maintenance", "auto", "false"))
+
+
+def disable_auto_gc(repo: Repo) -> None:
+    """
+    Keep git from starting garbage collection or maintenance on its own in a clone.
+
+    Once enough loose objects or packs accumulate, commands such as fetch, merge and commit otherwise repack the repository
+    before returning, holding up whichever operation ran them. The setting is kept in the configuration of the clone,
+    so that it applies to every later operation, and maintenance is left to a `MaintenanceScheduler`.
+
+    :param repo: The clone to configure.
+    """
+    if _config_matches(repo, _AUTO_GC_CONFIG):
+        return
+    with repo.config_writer() as config:
+        for section, option, value in _AUTO_GC_CONFIG:
+            config.set_value(section, option, value)
+
+
+class MaintenanceScheduler:
+    """
+    Run git's maintenance tasks on clones, each on its own schedule, while the clones are not in use.
+
+    A task is due on a clone once its interval has passed since it last succeeded there, or if it never ran there.
+    When a task last succeeded is kept within the git directory of the clone, so every process maintaining the same clones shares the schedule.
+
+    Maintenance never holds up other operations: it takes the locks every operation changing the clone takes without waiting,
+    see `CloneRoot`, and a clone in use is left for a later run. The clones it maintains have automatic gc turned off, see `disable_auto_gc`.
+
+    :param intervals: Seconds between two runs of each task, defaulting to hourly prefetches and commit-graphs,
+        daily repacks and multi-pack-indexes, and a weekly gc. Tasks left out are not run unless asked for.
+    :param repo_locker: Optional locker used by `get_updated_repo` and `feature_branch` for these clones.
+    :param retry_seconds: Time before maintaining a clone found in use again, the shortest wait between two rounds of `watch`.
+    :raises PyGitOpsValueError: A task is unknown, or an interval is not positive.
+    """
+
+    def __init__(
+        self,
+        intervals: Mapping[MaintenanceTask | str, float] | None = None,
+        *,
+        repo_locker: RepoLocker | None = None,
+        retry_seconds: float = DEFAULT_MAINTENANCE_RETRY_SECONDS,
+    ) -> None:
+        if intervals is None:
+            intervals = DEFAULT_MAINTENANCE_INTERVALS_SECONDS
+        self.intervals = {
+            _maintenance_task(task): float(seconds)
+            for task, seconds in intervals.items()
+        }
+        if any(seconds <= 0 for seconds in self.intervals.values()):
+            raise PyGitOpsValueError(
+                f"The interval of every maintenance task must be positive, got: {intervals}"
+            )
+        if retry_seconds <= 0:
+            raise PyGitOpsValueError(
+                f"The retry interval must be positive, got: {retry_seconds}"
+            )
+
+        self.repo_locker = repo_locker
+        self.retry_seconds = retry_seconds
+
+    def due(self, repo: Repo) -> list[MaintenanceTask]:
+        """
+        Get the tasks due on a clone.
+
+        :param repo: The clone.
+        :return: The due tasks, in the order they run.
+        """
+        now = time.time()
+        return [
+            task
+            for task in MaintenanceTask
+            if task in self.intervals and self._seconds_until_due(repo, task, now) <= 0
+        ]
+
+    def run(
+        self, repo: Repo, tasks: Iterable[MaintenanceTask | str] | None = None
+    ) -> list[MaintenanceResult]:
+        """
+        Run maintenance tasks on a clone, unless it is in use.
+
+        A task that fails does not stop the others, and stays due.
+
+        :param repo: The clone to maintain.
+        :param tasks: The tasks to run whether or not they are due, the due tasks if not provided.
+        :raises PyGitOpsValueError: A task is unknown.
+        :return: The result of each task that ran, none if the clone was in use.
+        """
+        return self._run(repo, Path(_repo_working_dir(repo)), tasks)
+
+    def poll(self, clone_dirs: Iterable[PathOrStr]) -> list[MaintenanceResult]:
+        """
+        Run the due tasks on every clone that is not in use, one clone at a time.
+
+        :param clone_dirs: Directories of the clones, as passed to `get_updated_repo`. Directories without a clone are skipped.
+        :return: The result of each task that ran.
+        """
+        results = []
+        for clone_dir in clone_dirs:
+            clone_dir = Path(clone_dir)
+            try:
+                repo = Repo(clone_dir)
+            except (InvalidGitRepositoryError, NoSuchPathError):
+                continue
+            with repo:
+                results.extend(self._run(repo, clone_dir, None))
+        return results
+
+    def watch(
+        self, clone_dirs: Iterable[PathOrStr], stop: threading.Event | None = None
+    ) -> Iterator[MaintenanceResult]:
+        """
+        Maintain clones as their tasks become due, yielding the result of each task that ran.
+
+        :param clone_dirs: Directories of the clones, as passed to `get_updated_repo`.
+        :param stop: Optional event ending the watch once it is set, checked between rounds.
+        :return: An endless iterator of results, unless `stop` is provided.
+        """
+        watched = [Path(clone_dir) for clone_dir in clone_dirs]
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            yield from self.poll(watched)
+            if not self.intervals:
+                return
+            stop.wait(self._seconds_until_next_due(watched))
+
+    def _run(
+        self,
+        repo: Repo,
+        clone_dir: Path,
+        tasks: Iterable[MaintenanceTask | str] | None,
+    ) -> list[MaintenanceResult]:
+        if tasks is None:
+            to_run = self.due(repo)
+        else:
+            requested = {_maintenance_task(task) for task in tasks}
+            to_run = [task for task in MaintenanceTask if task in requested]
+        if not to_run:
+            return []
+
+        origin_url = next(
+            (remote.url for remote in repo.remotes if remote.name == "origin"), ""
+        )
+        with _try_lock_clone(clone_dir, origin_url, self.repo_locker) as locked:
+            if not locked:
+                _logger.debug(
+                    f"[Maintenance] Not maintaining clone in use: {clone_dir}"
+                )
+                return []
+            disable_auto_gc(repo)
+            return [self._run_task(repo, clone_dir, task) for task in to_run]
+
+    @staticmethod
+    def _run_task(
+        repo: Repo, clone_dir: Path, task: MaintenanceTask
+    ) -> MaintenanceResult:
+        error: Exception | None = None
+        started = time.monotonic()
+        try:
+            if task == MaintenanceTask.MULTI_PACK_INDEX:
+                # not a task of `git maintenance`, which only writes it as part of incremental repacks
+                repo.git.multi_pack_index("write", "--no-progress")
+            else:
+                network_call: AbstractContextManager[dict[str, Any]] = (
+                    _network_call(f"prefetching remotes of repo: {repo}")
+                    if task == MaintenanceTask.PREFETCH
+                    else nullcontext({})
+                )
+                with network_call as network_kwargs:
+                    repo.git.maintenance(
+                        "run", "--quiet", f"--task={task.value}", **network_kwargs
+                    )
+        except GitCommandError as err:
+            error = PyGitOpsError(
+                f"Maintenance task {task.value} failed on repo: {repo}: {_scrub_github_auth(str(err))}"
+            )
+        seconds = time.monotonic() - started
+        _logger.debug(
+            f"[Maintenance] Task {task.value} {'failed' if error else 'succeeded'} in {seconds:.3f}s on clone: {clone_dir}"
+        )
+        if error is None:
+            _task_marker(repo, task).touch()
+        return MaintenanceResult(
+            clone_dir=clone_dir, task=task, seconds=seconds, error=error
+        )
+
+    def _seconds_until_due(
+        self, repo: Repo, task: MaintenanceTask, now: float
+    ) -> float:
+        try:
+            last_run = _task_marker(repo, task).stat().st_mtime
+        except FileNotFoundError:
+            return 0
+        return last_run + self.intervals[task] - now
+
+    def _seconds_until_next_due(self, clone_dirs: list[Path]) -> float:
+        # clones due now are in use, and are tried again after `retry_seconds`
+        seconds = None
+        now = time.time()
+        for clone_dir in clone_dirs:
+            try:
+                repo = Repo(clone_dir)
+            except (InvalidGitRepositoryError, NoSuchPathError):
+                continue
+            with repo:
+                for task in self.intervals:
+                    until_due = self._seconds_until_due(repo, task, now)
+                    seconds = until_due if seconds is None else min(seconds, until_due)
+        return max(seconds if seconds is not None else 0, self.retry_seconds)
+
+
+def _task_marker(repo: Repo, task: MaintenanceTask) -> Path:
+    # kept in the common git directory, shared by the worktrees of the clone
+    return Path(repo.common_dir) / f"{_TASK_MARKER_PREFIX}{task.value}"
+
+
+def _maintenance_task(task: MaintenanceTask | str) -> MaintenanceTask:
+    try:
+        return MaintenanceTask(task)
+    except ValueError as err:
+        raise PyGitOpsValueError(
+            f"Unsupported maintenance task: {task}, expected one of: {[t.value for t in MaintenanceTask]}"
+        ) from err
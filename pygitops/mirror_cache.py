@@ -0,0 +1,183 @@
+"""Share one local mirror of a remote between many clones."""
+
+import hashlib
+import logging
+import shutil
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from filelock import FileLock, Timeout
+from git import Repo
+
+from pygitops._constants import DEFAULT_MIRROR_REFRESH_INTERVAL_SECONDS
+from pygitops._util import clone_repo_with_timeout as _clone_repo_with_timeout
+from pygitops._util import is_git_repo as _is_git_repo
+from pygitops.deadlines import _check_deadline, _lock_timeout, _network_call
+from pygitops.default_branch_cache import query_default_branch
+from pygitops.exceptions import PyGitOpsError
+from pygitops.git_channel import GitChannel
+from pygitops.remote_git_utils import _scrub_github_auth
+from pygitops.types import PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+_MIRROR_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+_REFRESH_MARKER = "pygitops_last_refresh"
+
+
+class MirrorCache:
+    """
+    Local bare mirrors of remote repositories, shared by every clone of the same remote.
+
+    Only the mirror talks to the remote, at most once per `refresh_interval_seconds`.
+    Clones are created from, and updated against, the local mirror instead.
+
+    By default clones copy (or hardlink, when on the same filesystem) objects out of the mirror.
+    With `use_alternates`, clones borrow objects from the mirror via `.git/objects/info/alternates` instead,
+    which saves disk space but means a clone breaks if its mirror is deleted.
+    Unreachable objects are never pruned from mirrors used this way.
+
+    :param cache_dir: Directory holding the mirrors.
+    :param refresh_interval_seconds: Minimum number of seconds between two fetches of the same mirror.
+    :param use_alternates: Whether clones should borrow objects from the mirror rather than copy them.
+    """
+
+    def __init__(
+        self,
+        cache_dir: PathOrStr,
+        refresh_interval_seconds: float = DEFAULT_MIRROR_REFRESH_INTERVAL_SECONDS,
+        use_alternates: bool = False,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.use_alternates = use_alternates
+
+    def mirror_path(self, repo_url: str) -> Path:
+        """
+        Get the location of the mirror of a remote, whether or not it exists yet.
+
+        Credentials embedded in the remote URL do not affect the location.
+
+        :param repo_url: URL of the remote repository.
+        :return: Path of the bare mirror repository.
+        """
+        url_hash = hashlib.sha256(_scrub_github_auth(repo_url).encode()).hexdigest()
+        return self.cache_dir / f"{url_hash}.git"
+
+    def refresh(self, repo_url: str, force: bool = False) -> Repo:
+        """
+        Create the mirror of a remote, or fetch into it if it was last refreshed longer than `refresh_interval_seconds` ago.
+
+        :param repo_url: URL of the remote repository.
+        :param force: Fetch into an existing mirror regardless of when it was last refreshed.
+        :return: The bare mirror repository.
+        """
+        mirror_path = self.mirror_path(repo_url)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Lock the following operation such that only one process will attempt to update the mirror at a time.
+        with _mirror_lock(mirror_path):
+            if not (mirror_path.exists() and _is_git_repo(mirror_path)):
+                # discard the remains of a mirror whose creation was interrupted
+                GitChannel.release(mirror_path)
+                shutil.rmtree(mirror_path, ignore_errors=True)
+                _logger.debug(f"[Mirror] Creating mirror at: {mirror_path}")
+                with _network_call(
+                    f"creating mirror of repo: {_scrub_github_auth(repo_url)}"
+                ) as network_kwargs:
+                    if "kill_after_timeout" in network_kwargs:
+                        mirror = _clone_repo_with_timeout(
+                            repo_url, mirror_path, bare=True, **network_kwargs
+                        )
+                    else:
+                        mirror = Repo.clone_from(
+                            repo_url, mirror_path, bare=True, **network_kwargs
+                        )
+                with mirror.config_writer() as config:
+                    config.set_value('remote "origin"', "fetch", _MIRROR_REFSPECS[0])
+                    config.add_value('remote "origin"', "fetch", _MIRROR_REFSPECS[1])
+                    if self.use_alternates:
+                        # objects borrowed by clones may be unreachable from the mirror itself
+                        config.set_value("gc", "pruneExpire", "never")
+                self._mark_refreshed(mirror_path)
+                return mirror
+
+            mirror = Repo(mirror_path)
+            if mirror.remotes.origin.url != repo_url:
+                mirror.remotes.origin.set_url(repo_url)
+
+            if force or self._seconds_since_refresh(mirror_path) >= (
+                self.refresh_interval_seconds
+            ):
+                _logger.debug(f"[Mirror] Refreshing mirror at: {mirror_path}")
+                with _network_call(
+                    f"refreshing mirror: {mirror_path}"
+                ) as network_kwargs:
+                    mirror.git.fetch("--prune", "origin", **network_kwargs)
+                # `fetch` does not follow changes to the default branch of the remote
+                default_branch = query_default_branch(mirror)
+                mirror.git.symbolic_ref("HEAD", f"refs/heads/{default_branch}")
+                self._mark_refreshed(mirror_path)
+
+            return mirror
+
+    def clone(self, repo_url: str, clone_dir: PathOrStr, **kwargs) -> Repo:
+        """
+        Clone a remote into `clone_dir` out of its refreshed mirror, pointing the clone's origin back at the remote.
+
+        :param repo_url: URL of the remote repository.
+        :param clone_dir: The empty directory to clone repository content to.
+        :param kwargs: Additional arguments passed to `git clone`.
+        :return: The cloned repository.
+        """
+        mirror = self.refresh(repo_url)
+        if self.use_alternates:
+            kwargs.update(shared=True)
+        repo = Repo.clone_from(mirror.git_dir, clone_dir, **kwargs)
+        repo.remotes.origin.set_url(repo_url)
+        return repo
+
+    def update(self, repo: Repo, repo_url: str) -> str:
+        """
+        Update the origin remote-tracking refs of a clone out of its refreshed mirror, without contacting the remote.
+
+        :param repo: Repository whose origin is `repo_url`.
+        :param repo_url: URL of the remote repository.
+        :return: Name of the default branch of the remote, as recorded by the mirror.
+        """
+        mirror = self.refresh(repo_url)
+        origin_name = repo.remotes.origin.name
+        repo.git.fetch(
+            mirror.git_dir,
+            f"+refs/heads/*:refs/remotes/{origin_name}/*",
+            "+refs/tags/*:refs/tags/*",
+        )
+        return mirror.head.reference.name
+
+    @staticmethod
+    def _mark_refreshed(mirror_path: Path) -> None:
+        (mirror_path / _REFRESH_MARKER).touch()
+
+    @staticmethod
+    def _seconds_since_refresh(mirror_path: Path) -> float:
+        try:
+            return time.time() - (mirror_path / _REFRESH_MARKER).stat().st_mtime
+        except FileNotFoundError:
+            return float("inf")
+
+
+@contextmanager
+def _mirror_lock(mirror_path: Path) -> Iterator[None]:
+    lock_path = str(mirror_path.with_suffix(".lock"))
+    # wait for other processes refreshing the mirror for as long as it takes, unless a deadline is in effect
+    timeout = _lock_timeout(float("inf"))
+    try:
+        with FileLock(lock_path).acquire(
+            timeout=-1 if timeout == float("inf") else timeout
+        ):
+            yield
+    except Timeout as err:
+        _check_deadline(f"waiting for the lockfile: {lock_path}")
+        raise PyGitOpsError(f"Timed out waiting for the lockfile: {lock_path}") from err
@@ -1,21 +1,63 @@
 import logging
 import re
-from collections.abc import Iterator
-from contextlib import contextmanager
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, contextmanager, nullcontext
 from pathlib import Path
 
 from filelock import FileLock
-from git import Actor, GitError, Repo
+from git import Actor, Commit, GitCommandError, GitError, PushInfo, Repo
 
+from pygitops._constants import DEFAULT_SYNC_MAX_WORKERS
+from pygitops._util import changed_paths as _changed_paths
 from pygitops._util import checkout_pull_branch as _checkout_pull_branch
-from pygitops._util import get_lockfile_path as _get_lockfile_path
+from pygitops._util import clone_repo_with_timeout as _clone_repo_with_timeout
+from pygitops._util import commit_index as _commit_index
+from pygitops._util import commit_paths as _commit_paths
+from pygitops._util import commit_tree as _commit_tree
+from pygitops._util import discard_changes as _discard_changes
+from pygitops._util import get_clone_lockfile_path as _get_clone_lockfile_path
 from pygitops._util import is_git_repo as _is_git_repo
 from pygitops._util import lock_repo as _lock_repo
 from pygitops._util import push_error_present as _push_error_present
-from pygitops._util import repo_working_dir as _repo_working_dir
-from pygitops.exceptions import PyGitOpsError, PyGitOpsStagedItemsError
+from pygitops._util import push_rejected_as_outdated as _push_rejected_as_outdated
+from pygitops._util import query_remote_tip as _query_remote_tip
+from pygitops._util import rebase_onto_remote_branch as _rebase_onto_remote_branch
+from pygitops._util import remote_head_ref as _remote_head_ref
+from pygitops._util import resolve_commit as _resolve_commit
+from pygitops._util import set_remote_head as _set_remote_head
+from pygitops._util import set_sparse_paths as _set_sparse_paths
+from pygitops._util import stage_paths as _stage_paths
+from pygitops._util import write_files_tree as _write_files_tree
+from pygitops.clone_root import CloneRoot
+from pygitops.deadlines import _network_call, _sleep, _with_current_deadline
+from pygitops.deadlines import deadline as _deadline
+from pygitops.default_branch_cache import (
+    DefaultBranchCache,
+    query_default_branch,
+    query_remote_head,
+)
+from pygitops.exceptions import (
+    PyGitOpsError,
+    PyGitOpsRefUpdateError,
+    PyGitOpsStagedItemsError,
+    PyGitOpsValueError,
+)
+from pygitops.fast_status import enable_fast_status as _enable_fast_status
+from pygitops.locking import RepoLocker
+from pygitops.maintenance import disable_auto_gc as _disable_auto_gc
+from pygitops.mirror_cache import MirrorCache
 from pygitops.remote_git_utils import _scrub_github_auth
-from pygitops.types import PathOrStr
+from pygitops.repo_pool import RepoPool
+from pygitops.session import RemoteSession
+from pygitops.types import (
+    BranchCommit,
+    CloneFilter,
+    LockMode,
+    PathOrStr,
+    PushRetry,
+    SyncResult,
+)
 
 _logger = logging.getLogger(__name__)
 
@@ -27,11 +69,15 @@ def stage_commit_push_changes(
     commit_message: str,
     items_to_stage: list[Path] | None = None,
     kwargs_to_push: dict | None = None,
-) -> None:
+    timeout: float | None = None,
+    push_retry: PushRetry | None = None,
+) -> int:
     """
     Handles the logic of persisting filesystem changes to a local repository via a commit to a feature branch.
 
     This includes staging, committing, and pushing the local changes.
+    With `push_retry`, a push rejected because the remote branch moved, e.g. when many writers target the same branch,
+    is retried after fetching the branch and rebasing the commit onto its new tip, rather than failing right away.
 
     :param repo: Repository object.
     :param branch_name: Feature branch from which changes will be committed and pushed.
@@ -40,52 +86,229 @@ def stage_commit_push_changes(
     :param items_to_stage: List of files and directories that will be staged for commit, will be inferred if parameter not provided.
         Please use an empty list to signal that there are intentionally no items to stage, and items_to_stage should not be inferred.
     :param kwargs_to_push: dictionary of arguments to pass to the push operation
+    :param timeout: Optional number of seconds the operation may take, see `pygitops.deadlines.deadline`.
+    :param push_retry: Optional policy retrying pushes rejected as non-fast-forward. The branch must be checked out to use it.
     :raises PyGitOpsStagedItemsError: Items to stage are not present or could not be determined.
-    :raises PyGitOpsError: There was an error staging, committing, or pushing code.
+    :raises PyGitOpsTimeoutError: The deadline passed, or the push stalled, before the push was done.
+    :raises PyGitOpsValueError: A push retry policy was given, but the branch is not checked out.
+    :raises PyGitOpsError: There was an error staging, committing, or pushing code, or rebasing it when retrying.
+    :return: The number of times the push was retried.
     """
-    index = repo.index
-    workdir_path = Path(_repo_working_dir(repo))
-
-    # We will determine items_to_stage if the parameter was not provided.
-    if items_to_stage is None:
-        untracked_file_paths = [Path(f) for f in repo.untracked_files]
-        items_to_stage = untracked_file_paths + [
-            Path(f.a_path) for f in index.diff(None) if f.a_path is not None
-        ]
-
-        if not items_to_stage:
-            raise PyGitOpsStagedItemsError(
-                "There are no items to stage, cannot perform commit operation"
+    with _deadline(timeout):
+        if push_retry is not None and (
+            repo.head.is_detached or repo.active_branch.name != branch_name
+        ):
+            raise PyGitOpsValueError(
+                f"The branch {branch_name} must be checked out to retry pushing it"
             )
 
-    # stage and commit changes using the provided actor.
-    for item in items_to_stage:
-        full_path = workdir_path / item
-        index.add(str(item)) if full_path.exists() else index.remove(str(item), r=True)
-    commit = index.commit(commit_message, author=actor, committer=actor)
+        # We will determine items_to_stage if the parameter was not provided.
+        if items_to_stage is None:
+            items_to_stage = _changed_paths(repo)
 
-    _logger.debug(
-        f"Successfully made commit with stats: {commit.stats.files} to repository: {repo}"
-    )
+            if not items_to_stage:
+                raise PyGitOpsStagedItemsError(
+                    "There are no items to stage, cannot perform commit operation"
+                )
 
-    # push changes to the remote branch
-    origin = repo.remotes.origin
-    if not kwargs_to_push:
-        kwargs_to_push = {}
-    push_info = origin.push(branch_name, **kwargs_to_push or {})[0]
+        # stage and commit changes using the provided actor.
+        if items_to_stage:
+            _stage_paths(repo, items_to_stage)
+        commit = _commit_index(repo, commit_message, actor)
 
-    _logger.debug(
-        f"Issued commit to remote branch: {branch_name}, with resulting summary: {push_info.summary} and flags: {push_info.flags}. (see flag documentation: https://gitpython.readthedocs.io/en/stable/reference.html#git.remote.PushInfo)"
+        _logger.debug(
+            f"Successfully made commit with stats: {commit.stats.files} to repository: {repo}"
+        )
+
+        # push changes to the remote branch
+        origin = repo.remotes.origin
+        if not kwargs_to_push:
+            kwargs_to_push = {}
+        retries = 0
+        while True:
+            with _network_call(
+                f"pushing branch: {branch_name} of repo: {repo}"
+            ) as network_kwargs:
+                push_info = origin.push(
+                    branch_name, **kwargs_to_push or {}, **network_kwargs
+                )[0]
+
+            _logger.debug(
+                f"Issued commit to remote branch: {branch_name}, with resulting summary: {push_info.summary} and flags: {push_info.flags}. (see flag documentation: https://gitpython.readthedocs.io/en/stable/reference.html#git.remote.PushInfo)"
+            )
+
+            if not _push_error_present(push_info):
+                return retries
+            if push_retry is None or not _push_rejected_as_outdated(push_info):
+                raise PyGitOpsError(
+                    f"Unable to push to branch {branch_name} of new repo: {repo}"
+                )
+            if retries + 1 >= push_retry.max_attempts:
+                raise PyGitOpsError(
+                    f"Unable to push to branch {branch_name} of repo: {repo}, still rejected as outdated after {retries} retries"
+                )
+
+            retries += 1
+            delay = push_retry.delay(retries)
+            _logger.debug(
+                f"Push to branch: {branch_name} of repo: {repo} was rejected as outdated, rebasing and retrying in {delay:.2f} seconds, retry: {retries}"
+            )
+            _sleep(delay)
+            _rebase_onto_remote_branch(repo, branch_name, actor)
+
+
+def commit_push_branches(
+    repo: Repo,
+    branch_commits: Iterable[BranchCommit],
+    actor: Actor,
+    base: str = "HEAD",
+    atomic: bool = False,
+    kwargs_to_push: dict | None = None,
+    timeout: float | None = None,
+) -> dict[str, PushInfo]:
+    """
+    Commit changes in the working tree on many branches, and push every branch in a single push.
+
+    Each branch is created, or reset, to point at one commit on top of `base`, holding the working tree state of its paths.
+    Neither the working tree, the index, nor the checked out branch are changed,
+    so changes for every branch can be made at once, e.g. by a codemod, and split between branches afterwards.
+
+    :param repo: Repository object.
+    :param branch_commits: The commits to make, one per branch.
+    :param actor: The Github actor with which to perform the commit operations.
+    :param base: The revision every commit is based on, defaults to the checked out commit.
+    :param atomic: Push with `--atomic`, so that either every branch is updated on the remote or none is.
+    :param kwargs_to_push: dictionary of arguments to pass to the push operation
+    :param timeout: Optional number of seconds the operation may take, see `pygitops.deadlines.deadline`.
+    :raises PyGitOpsTimeoutError: The deadline passed, or the push stalled, before the push was done.
+    :raises PyGitOpsValueError: No commits were given, a branch was given twice, or a branch is checked out.
+    :return: The result of pushing each branch, keyed by branch name. Check `PushInfo.flags` for rejected or failed pushes.
+    """
+    with _deadline(timeout):
+        branch_commits = list(branch_commits)
+        if not branch_commits:
+            raise PyGitOpsValueError("There are no branches to commit to")
+
+        branch_names = [branch_commit.branch_name for branch_commit in branch_commits]
+        if len(set(branch_names)) != len(branch_names):
+            raise PyGitOpsValueError(
+                f"Each branch can only be committed to once, got branches: {branch_names}"
+            )
+        if not repo.head.is_detached and repo.active_branch.name in branch_names:
+            raise PyGitOpsValueError(
+                f"Cannot commit to the checked out branch: {repo.active_branch.name}"
+            )
+
+        for branch_commit in branch_commits:
+            commit = _commit_paths(
+                repo, branch_commit.paths, base, branch_commit.commit_message, actor
+            )
+            repo.create_head(branch_commit.branch_name, commit, force=True)
+            _logger.debug(
+                f"Successfully made commit: {commit.hexsha} on branch: {branch_commit.branch_name} of repository: {repo}"
+            )
+
+        refspecs = [f"refs/heads/{name}:refs/heads/{name}" for name in branch_names]
+        if atomic:
+            kwargs_to_push = {**(kwargs_to_push or {}), "atomic": True}
+        with _network_call(f"pushing branches of repo: {repo}") as network_kwargs:
+            push_infos = repo.remotes.origin.push(
+                refspecs, **kwargs_to_push or {}, **network_kwargs
+            )
+
+        results = {}
+        for push_info in push_infos:
+            branch_name = push_info.remote_ref_string.removeprefix("refs/heads/")
+            results[branch_name] = push_info
+            _logger.debug(
+                f"Issued commit to remote branch: {branch_name}, with resulting summary: {push_info.summary} and flags: {push_info.flags}"
+            )
+        return results
+
+
+def commit_files(
+    repo: Repo,
+    branch_name: str,
+    files: Mapping[PathOrStr, bytes | None],
+    actor: Actor,
+    commit_message: str,
+    base: str | None = None,
+) -> Commit:
+    """
+    Commit new contents of a few files to a branch, without checking the branch out or touching the working tree.
+
+    The blobs, tree and commit are written straight to the object database,
+    and the branch is moved to the new commit only if it has not changed since it was first read.
+    As neither the working tree nor the index are used, no lock on the repository is needed,
+    and many writers can commit to the same clone at once. Push the branch afterwards to publish the commit.
+
+    :param repo: Repository object.
+    :param branch_name: Branch to commit to, created if it does not exist.
+    :param files: New contents of the files, keyed by path relative to the root of the repository, or None to delete a file.
+    :param actor: The Github actor with which to perform the commit operation.
+    :param commit_message: Text to be used as the commit message.
+    :param base: The revision the commit is based on, defaults to the tip of the branch.
+        When given, the branch is reset to a commit on top of it.
+    :raises PyGitOpsValueError: The branch is checked out, the base does not name a commit, or neither the branch nor a base exist.
+    :raises PyGitOpsRefUpdateError: The branch was changed while the commit was being made.
+    :return: The new commit.
+    """
+    if not repo.head.is_detached and repo.active_branch.name == branch_name:
+        raise PyGitOpsValueError(
+            f"Cannot commit files to the checked out branch: {branch_name}"
+        )
+
+    ref = f"refs/heads/{branch_name}"
+    try:
+        # read from the ref itself, as the old value of the compare and swap must not be stale
+        old_sha: str | None = repo.git.rev_parse("--verify", "--quiet", ref)
+    except GitCommandError:
+        old_sha = None
+    if base is None:
+        if old_sha is None:
+            raise PyGitOpsValueError(
+                f"The branch {branch_name} does not exist, provide a base to create it from"
+            )
+        base = old_sha
+
+    base_sha = _resolve_commit(repo, base)
+    tree_sha = _write_files_tree(
+        repo,
+        base_sha,
+        {Path(path).as_posix(): content for path, content in files.items()},
     )
+    commit = _commit_tree(repo, tree_sha, base_sha, commit_message, actor)
 
-    if _push_error_present(push_info):
-        raise PyGitOpsError(
-            f"Unable to push to branch {branch_name} of new repo: {repo}"
+    try:
+        # compare and swap, an all zero old value requires that the branch does not exist yet
+        repo.git.update_ref(
+            "-m",
+            "pygitops: commit_files",
+            ref,
+            commit.hexsha,
+            old_sha or "0" * len(commit.hexsha),
         )
+    except GitCommandError as err:
+        raise PyGitOpsRefUpdateError(
+            f"The branch {branch_name} of repository: {repo} was changed while committing to it"
+        ) from err
+
+    _logger.debug(
+        f"Successfully made commit: {commit.hexsha} on branch: {branch_name} of repository: {repo}"
+    )
+    return commit
 
 
 @contextmanager
-def feature_branch(repo: Repo, branch_name: str) -> Iterator[None]:
+def feature_branch(
+    repo: Repo,
+    branch_name: str,
+    session: RemoteSession | None = None,
+    default_branch_cache: DefaultBranchCache | None = None,
+    targeted_cleanup: bool = False,
+    repo_locker: RepoLocker | None = None,
+    timeout: float | None = None,
+) -> Iterator[None]:
     """
     Checkout the desired feature branch.
 
@@ -100,71 +323,116 @@ def feature_branch(repo: Repo, branch_name: str) -> Iterator[None]:
 
     :param repo: Repository object
     :param branch_name: str object indicating the branch we would like to checkout
+    :param session: Optional remote session, fetching origin at most once across this and related operations.
+    :param default_branch_cache: Optional cache used to resolve the default branch without fetching.
+    :param targeted_cleanup: When exiting the context, only restore the paths that differ from the default branch,
+        rather than resetting and cleaning the whole working tree. Ignored files, such as build caches, are kept.
+    :param repo_locker: Optional locker taking the exclusive lock on the repository, instead of the default lockfile.
+    :param timeout: Optional number of seconds the context may take, bounding the operations run within it as well,
+        see `pygitops.deadlines.deadline`. Moving back to the default branch when the context is exited is never cut short.
+    :raises PyGitOpsTimeoutError: The deadline passed, or a transfer stalled, before the operation was done.
     :raises PyGitOpsError: There was an error performing the feature branch operation.
     """
-    default_branch = get_default_branch(repo)
-
-    untracked_files = repo.untracked_files
-    if untracked_files:
-        raise PyGitOpsError(
-            f"We cannot checkout a feature branch when there are unstaged changes in your current branch: {untracked_files}"
+    with _deadline(timeout):
+        default_branch = get_default_branch(
+            repo, session=session, default_branch_cache=default_branch_cache
         )
 
-    active_branch = repo.active_branch
-    if active_branch != repo.heads[default_branch]:
-        raise PyGitOpsError(
-            f"We can only checkout feature branches originating from the default branch: {default_branch}. Current branch is: {active_branch.name}"
-        )
-
-    _logger.debug(
-        f"About to invoke `_lock_repo` for repo: {repo}, branch name: {branch_name}"
-    )
+        if default_branch_cache is not None and default_branch not in repo.heads:
+            # the cached default branch may have been renamed on the remote since it was resolved
+            default_branch_cache.invalidate(repo.remotes.origin.url)
+            default_branch = default_branch_cache.resolve(repo)
+            if session is not None:
+                session.remember_default_branch(repo, default_branch)
 
-    # lock the following operation such that the process of updating default branch,
-    # checking out a feature branch, applying changes, and moving back to default branch never occurs concurrently
-    with _lock_repo(repo):
-        _logger.debug(
-            f"Successfully using repository: {repo}, branch_name: {branch_name}"
-        )
-
-        # before creating a feature branch, checkout and update the default branch of the repository
-        # helpful in the case where a failed process clears the FileLock, but leaves the repo on a feature branch
-        origin = repo.remotes.origin
-        # `origin.refs` might be out of date, this makes local checkout of repo aware of remote branches
-        origin.fetch()
-
-        # Handle the case where the remote is a bare repository with no commit history.
-        # When there is no commit history, there is no default branch
-        if default_branch in origin.refs:
-            _checkout_pull_branch(repo, default_branch)
-            _logger.debug(
-                f"Successfully updated {default_branch} branch of repo: {repo}"
+        untracked_files = repo.untracked_files
+        if untracked_files:
+            raise PyGitOpsError(
+                f"We cannot checkout a feature branch when there are unstaged changes in your current branch: {untracked_files}"
             )
 
-        if branch_name != default_branch:
-            # create and checkout a local feature branch
-            feature_branch = repo.create_head(branch_name)
-            feature_branch.checkout()
-
-            _logger.debug(
-                f"Successfully checked out feature branch: {branch_name} for repository: {repo}"
+        active_branch = repo.active_branch
+        if active_branch != repo.heads[default_branch]:
+            raise PyGitOpsError(
+                f"We can only checkout feature branches originating from the default branch: {default_branch}. Current branch is: {active_branch.name}"
             )
 
-        # give control back to call of this context manager
-        try:
-            yield
-        finally:
-            # clean up the feature branch
-            repo.git.clean("-xdf")
-            repo.git.reset("--hard")
-            # move back to the repo's default branch when the `feature_branch` context is exited
-            repo.heads[default_branch].checkout()
+        _logger.debug(
+            f"About to invoke `_lock_repo` for repo: {repo}, branch name: {branch_name}"
+        )
+
+        # lock the following operation such that the process of updating default branch,
+        # checking out a feature branch, applying changes, and moving back to default branch never occurs concurrently
+        with _lock_repo(repo) if repo_locker is None else repo_locker.lock(repo):
             _logger.debug(
-                f"Successfully moved back to {default_branch} branch for repository: {repo} after using feature branch"
+                f"Successfully using repository: {repo}, branch_name: {branch_name}"
             )
 
-
-def get_updated_repo(repo_url: str, clone_dir: PathOrStr, **kwargs) -> Repo:
+            # before creating a feature branch, checkout and update the default branch of the repository
+            # helpful in the case where a failed process clears the FileLock, but leaves the repo on a feature branch
+            origin = repo.remotes.origin
+            # `origin.refs` might be out of date, this makes local checkout of repo aware of remote branches
+            if session is None:
+                with _network_call(f"fetching repo: {repo}") as network_kwargs:
+                    origin.fetch(**network_kwargs)
+            else:
+                session.fetch(repo, [default_branch])
+
+            # Handle the case where the remote is a bare repository with no commit history.
+            # When there is no commit history, there is no default branch
+            if default_branch in origin.refs:
+                _checkout_pull_branch(repo, default_branch, session=session)
+                _logger.debug(
+                    f"Successfully updated {default_branch} branch of repo: {repo}"
+                )
+
+            if branch_name != default_branch:
+                # create and checkout a local feature branch
+                feature_branch = repo.create_head(branch_name)
+                feature_branch.checkout()
+
+                _logger.debug(
+                    f"Successfully checked out feature branch: {branch_name} for repository: {repo}"
+                )
+
+            # give control back to call of this context manager
+            try:
+                yield
+            finally:
+                if targeted_cleanup:
+                    # restore the changed paths to the default branch, then point HEAD back at it without another checkout
+                    _discard_changes(repo, repo.heads[default_branch].commit.hexsha)
+                    repo.head.reference = repo.heads[default_branch]
+                else:
+                    # clean up the feature branch
+                    repo.git.clean("-xdf")
+                    repo.git.reset("--hard")
+                    # move back to the repo's default branch when the `feature_branch` context is exited
+                    repo.heads[default_branch].checkout()
+                _logger.debug(
+                    f"Successfully moved back to {default_branch} branch for repository: {repo} after using feature branch"
+                )
+
+
+def get_updated_repo(
+    repo_url: str,
+    clone_dir: PathOrStr,
+    *,
+    session: RemoteSession | None = None,
+    default_branch_cache: DefaultBranchCache | None = None,
+    depth: int | None = None,
+    clone_filter: CloneFilter | str | None = None,
+    mirror_cache: MirrorCache | None = None,
+    repo_locker: RepoLocker | None = None,
+    sparse_paths: Iterable[PathOrStr] | None = None,
+    skip_if_current: bool = False,
+    repo_pool: RepoPool | None = None,
+    clone_root: CloneRoot | None = None,
+    auto_gc: bool = True,
+    fast_status: bool = False,
+    timeout: float | None = None,
+    **kwargs,
+) -> Repo:
     """
     Clone the default branch of the target repository, returning a repo object.
 
@@ -172,36 +440,223 @@ def get_updated_repo(repo_url: str, clone_dir: PathOrStr, **kwargs) -> Repo:
 
     :param repo_url: URL of the Github repository to be cloned.
     :param clone_dir: The empty directory to clone repository content to.
+    :param session: Optional remote session, fetching origin at most once across this and related operations.
+    :param default_branch_cache: Optional cache used to resolve the default branch without fetching.
+    :param depth: Optional number of commits of history to clone, creating a shallow clone.
+        Like `git clone --depth`, only the default branch is cloned unless `no_single_branch=True` is passed,
+        and history is deepened on demand when an update needs more of it.
+    :param clone_filter: Optional partial clone filter, see `CloneFilter`.
+        Objects left out of the clone are fetched on demand by git.
+    :param mirror_cache: Optional cache of local mirrors, used to clone and update the repository instead of the remote.
+    :param repo_locker: Optional locker taking the exclusive lock on the clone, instead of the default lockfile.
+        Unlike the default lockfile, which is waited for as long as it takes, the lock is waited for up to the timeout of the locker,
+        10 seconds unless configured otherwise.
+    :param sparse_paths: Optional directories to check out, leaving the rest of the working tree out with a cone mode sparse checkout.
+        Files at the root of the repository are always checked out. An existing clone is restricted to these directories,
+        and keeps its sparse set, if any, when they are not provided.
+    :param skip_if_current: Ask the remote for the tip of the branch with a single `git ls-remote` query before updating an existing clone,
+        and skip the fetch, checkout, and pull when the branch is already checked out at that tip.
+        Other remote-tracking refs and tags are then left as they are. Whether the clone was left untouched is only reported
+        by `get_updated_repos`, see `SyncResult.already_current`.
+    :param repo_pool: Optional pool of open repository handles, reusing the handle of an existing clone rather than opening a new one,
+        and keeping the handle of a new clone, see `RepoPool`.
+    :param clone_root: Optional directory of clones kept within a disk budget, which `clone_dir` must be directly within.
+        The use of the clone is recorded, and the least recently used other clones are evicted if the root is over budget, see `CloneRoot`.
+    :param auto_gc: Whether git may start garbage collection on its own while updating the clone.
+        Turn it off for clones maintained by a `MaintenanceScheduler`, so that no update is held up repacking the repository, see `disable_auto_gc`.
+    :param fast_status: Configure the clone so that `git status` does not walk its whole working tree on every call,
+        with the untracked cache, a split index, and the fsmonitor daemon where git supports it, see `enable_fast_status`.
+    :param timeout: Optional number of seconds the operation may take, see `pygitops.deadlines.deadline`.
+    :raises PyGitOpsValueError: The provided depth, clone filter, or combination of options is invalid,
+        or the clone directory is not within the clone root.
+    :raises PyGitOpsTimeoutError: The deadline passed, or a transfer stalled, before the repository was cloned or updated.
     :raises PyGitOpsError: There was an error cloning the repository.
     """
+    with _deadline(timeout):
+        return _get_updated_repo(
+            repo_url,
+            clone_dir,
+            session=session,
+            default_branch_cache=default_branch_cache,
+            depth=depth,
+            clone_filter=clone_filter,
+            mirror_cache=mirror_cache,
+            repo_locker=repo_locker,
+            sparse_paths=sparse_paths,
+            skip_if_current=skip_if_current,
+            repo_pool=repo_pool,
+            clone_root=clone_root,
+            auto_gc=auto_gc,
+            fast_status=fast_status,
+            **kwargs,
+        )[0]
+
+
+def _get_updated_repo(
+    repo_url: str,
+    clone_dir: PathOrStr,
+    *,
+    clone_root: CloneRoot | None = None,
+    **kwargs,
+) -> tuple[Repo, bool]:
+    # returns the repo, and whether an existing clone was already current
+    if clone_root is not None and not clone_root.contains(clone_dir):
+        raise PyGitOpsValueError(
+            f"The clone directory {clone_dir} is not directly within the clone root: {clone_root.root}"
+        )
+
+    repo, already_current = _clone_or_update_repo(repo_url, clone_dir, **kwargs)
+    if clone_root is not None:
+        # a clone left as it was keeps the size measured last time
+        clone_root.touch(clone_dir, measure=not already_current)
+        clone_root.enforce(keep=[clone_dir])
+    return repo, already_current
+
+
+def _clone_or_update_repo(
+    repo_url: str,
+    clone_dir: PathOrStr,
+    *,
+    session: RemoteSession | None = None,
+    default_branch_cache: DefaultBranchCache | None = None,
+    depth: int | None = None,
+    clone_filter: CloneFilter | str | None = None,
+    mirror_cache: MirrorCache | None = None,
+    repo_locker: RepoLocker | None = None,
+    sparse_paths: Iterable[PathOrStr] | None = None,
+    skip_if_current: bool = False,
+    repo_pool: RepoPool | None = None,
+    auto_gc: bool = True,
+    fast_status: bool = False,
+    **kwargs,
+) -> tuple[Repo, bool]:
+    if depth is not None and depth < 1:
+        raise PyGitOpsValueError(f"The clone depth must be at least 1, got: {depth}")
+
+    if clone_filter is not None:
+        try:
+            clone_filter = CloneFilter(clone_filter)
+        except ValueError as err:
+            raise PyGitOpsValueError(
+                f"Unsupported clone filter: {clone_filter}, expected one of: {[f.value for f in CloneFilter]}"
+            ) from err
+
+    if mirror_cache is not None and (depth is not None or clone_filter is not None):
+        raise PyGitOpsValueError(
+            "A mirror cache cannot be combined with a clone depth or clone filter"
+        )
+
+    if sparse_paths is not None:
+        sparse_paths = list(sparse_paths)
+
     # make sure it's actually a Path if our user passed a str
     clone_dir = Path(clone_dir)
 
     # if clone dir does not exist, create it, and all parent dirs
     clone_dir.mkdir(parents=True, exist_ok=True)
 
-    git_lockfile_path = _get_lockfile_path(str(clone_dir))
-
     # Lock the following operation such that only one process will attempt to clone the repo at a time.
-    with FileLock(str(git_lockfile_path)):
+    with (
+        FileLock(str(_get_clone_lockfile_path(clone_dir)))
+        if repo_locker is None
+        else repo_locker.lock_clone(clone_dir, repo_url)
+    ):
         try:
             # if the repo already exists, don't clone it
-            if _is_git_repo(clone_dir):
-                repo = Repo(clone_dir)
+            if repo_pool is not None:
+                existing_repo = repo_pool.get(clone_dir)
+            else:
+                existing_repo = Repo(clone_dir) if _is_git_repo(clone_dir) else None
+            if existing_repo is not None:
+                repo = existing_repo
                 # Sync the remote URL in case the repo was transferred
                 # (e.g. GitHub org transfer from wayfair-staging to wayfair-shared)
                 if repo.remotes.origin.url != repo_url:
                     repo.remotes.origin.set_url(repo_url)
-                # pull down latest changes from `branch` if provided in kwargs, deferring to repo default branch
-                branch = kwargs.get("branch") or get_default_branch(repo)
+                if not auto_gc:
+                    _disable_auto_gc(repo)
+                if fast_status:
+                    _enable_fast_status(repo)
+                if sparse_paths is not None:
+                    # restrict the working tree before updating it, so that only the sparse set is checked out
+                    _set_sparse_paths(repo, sparse_paths)
+                remote_sha = None
+                if mirror_cache is not None:
+                    # the mirror stands in for the remote, so origin does not need to be fetched
+                    session = session or RemoteSession()
+                    mirror_default_branch = mirror_cache.update(repo, repo_url)
+                    session.mark_fetched(repo)
+                    branch = kwargs.get("branch") or mirror_default_branch
+                elif skip_if_current:
+                    # a single ref query tells whether there is anything to fetch at all
+                    branch, remote_sha = _resolve_remote_tip(
+                        repo, kwargs.get("branch"), session, default_branch_cache
+                    )
+                else:
+                    # pull down latest changes from `branch` if provided in kwargs, deferring to repo default branch
+                    branch = kwargs.get("branch") or get_default_branch(
+                        repo,
+                        session=session,
+                        default_branch_cache=default_branch_cache,
+                    )
                 # destroy any local changes to tracked and untracked files if `force` is provided in kwargs
                 force = kwargs.get("force") or False
-                _checkout_pull_branch(repo, branch, force=force)
-                return repo
+                try:
+                    already_current = _checkout_pull_branch(
+                        repo,
+                        branch,
+                        force=force,
+                        session=session,
+                        remote_sha=remote_sha,
+                    )
+                except PyGitOpsError:
+                    if kwargs.get("branch") or default_branch_cache is None:
+                        raise
+                    # the cached default branch may have been renamed on the remote since it was resolved
+                    default_branch_cache.invalidate(repo_url)
+                    branch = default_branch_cache.resolve(repo)
+                    already_current = _checkout_pull_branch(
+                        repo, branch, force=force, session=session
+                    )
+                return repo, already_current
 
             # remove 'force' from kwargs if present, as it is not supported by clone
             kwargs.pop("force", None)
-            return Repo.clone_from(repo_url, clone_dir, **kwargs)
+            if depth is not None:
+                kwargs.update(depth=depth)
+            if clone_filter is not None:
+                kwargs.update(filter=clone_filter.value)
+            if sparse_paths is not None:
+                # only check out the files at the root, until the sparse set is known
+                kwargs.update(sparse=True)
+            if session is not None and session.fetch_options.no_tags:
+                kwargs.update(no_tags=True)
+            if mirror_cache is not None:
+                repo = mirror_cache.clone(repo_url, clone_dir, **kwargs)
+            else:
+                with _network_call(
+                    f"cloning repo: {_scrub_github_auth(repo_url)}"
+                ) as network_kwargs:
+                    if "kill_after_timeout" in network_kwargs:
+                        repo = _clone_repo_with_timeout(
+                            repo_url, clone_dir, **network_kwargs, **kwargs
+                        )
+                    else:
+                        repo = Repo.clone_from(
+                            repo_url, clone_dir, **network_kwargs, **kwargs
+                        )
+            if not auto_gc:
+                _disable_auto_gc(repo)
+            if fast_status:
+                _enable_fast_status(repo)
+            if sparse_paths is not None:
+                _set_sparse_paths(repo, sparse_paths)
+            if session is not None:
+                # a fresh clone has just fetched everything the remote has to offer
+                session.mark_fetched(repo)
+            if repo_pool is not None:
+                repo = repo_pool.add(repo)
+            return repo, False
         except GitError as e:
             clean_repo_url = _scrub_github_auth(repo_url)
             scrubbed_error_message = _scrub_github_auth(str(e))
@@ -210,7 +665,79 @@ def get_updated_repo(repo_url: str, clone_dir: PathOrStr, **kwargs) -> Repo:
             ) from e
 
 
-def get_default_branch(repo: Repo) -> str:
+def _resolve_remote_tip(
+    repo: Repo,
+    branch: str | None,
+    session: RemoteSession | None,
+    default_branch_cache: DefaultBranchCache | None,
+) -> tuple[str, str | None]:
+    if branch is None and session is not None:
+        branch = session.cached_default_branch(repo)
+    if branch is None and default_branch_cache is not None:
+        branch = default_branch_cache.get(repo.remotes.origin.url)
+    if branch is not None:
+        return branch, _query_remote_tip(repo, branch)
+
+    # the HEAD of the remote names the default branch and its tip at once
+    branch, remote_sha = query_remote_head(repo)
+    if session is not None:
+        session.remember_default_branch(repo, branch)
+    if default_branch_cache is not None:
+        default_branch_cache.set(repo.remotes.origin.url, branch)
+    return branch, remote_sha
+
+
+def get_updated_repos(
+    items: Iterable[tuple[str, PathOrStr, dict]],
+    max_workers: int = DEFAULT_SYNC_MAX_WORKERS,
+    timeout: float | None = None,
+) -> list[SyncResult]:
+    """
+    Clone or update many repositories concurrently, see `get_updated_repo`.
+
+    A failure to sync one repository does not stop the others from being synced.
+    Each clone directory is still locked while it is synced, so listing the same directory twice is safe.
+
+    :param items: Tuples of repo URL, clone directory, and keyword arguments for `get_updated_repo`.
+    :param max_workers: Maximum number of repositories synced at the same time.
+    :param timeout: Optional number of seconds the whole batch may take, see `pygitops.deadlines.deadline`.
+        Repositories still syncing when it passes are reported with a `PyGitOpsTimeoutError`.
+        A `timeout` among the keyword arguments of an item bounds that item alone.
+    :return: One result per item, in the order the items were provided.
+    """
+
+    def _sync(item: tuple[str, PathOrStr, dict]) -> SyncResult:
+        repo_url, clone_dir, kwargs = item
+        kwargs = dict(kwargs)
+        try:
+            with _deadline(kwargs.pop("timeout", None)):
+                repo, already_current = _get_updated_repo(repo_url, clone_dir, **kwargs)
+        except Exception as e:
+            _logger.debug(
+                f"Failed to sync repo: {_scrub_github_auth(repo_url)} into destination path: {clone_dir}: {_scrub_github_auth(str(e))}"
+            )
+            return SyncResult(repo_url=repo_url, clone_dir=Path(clone_dir), error=e)
+        return SyncResult(
+            repo_url=repo_url,
+            clone_dir=Path(clone_dir),
+            repo=repo,
+            already_current=already_current,
+        )
+
+    with (
+        _deadline(timeout),
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        return list(executor.map(_with_current_deadline(_sync), items))
+
+
+def get_default_branch(
+    repo: Repo,
+    session: RemoteSession | None = None,
+    default_branch_cache: DefaultBranchCache | None = None,
+    timeout: float | None = None,
+    repo_locker: RepoLocker | None = None,
+) -> str:
     """
     Get the default branch of the provided repository.
 
@@ -219,19 +746,62 @@ def get_default_branch(repo: Repo) -> str:
     We expect the HEAD ref to match a particular pattern that we regex against.
 
     :param repo: git.Repo instance.
+    :param session: Optional remote session, reusing its fetched state and any default branch it already resolved.
+        When the session narrows fetches, the remote is asked for its HEAD alone, and only the default branch is fetched.
+    :param default_branch_cache: Optional cache of default branches.
+        When provided, a cache miss is resolved with a single `git ls-remote --symref` query instead of a fetch.
+    :param timeout: Optional number of seconds the operation may take, see `pygitops.deadlines.deadline`.
+    :param repo_locker: Optional locker, whose lock on the repository is held while the default branch is resolved:
+        the `read_mode` lock when it is resolved without fetching, and the exclusive lock when the remote is fetched.
+    :raises PyGitOpsTimeoutError: The deadline passed, or a transfer stalled, before the operation was done.
     :return: string representing name of default branch.
     """
+    with _deadline(timeout):
+        if session is not None:
+            cached_default_branch = session.cached_default_branch(repo)
+            if cached_default_branch is not None:
+                return cached_default_branch
+
+        if default_branch_cache is not None:
+            # only the remote of the repository is read
+            with _lock_repo_with(repo_locker, repo, read_only=True):
+                default_branch = default_branch_cache.resolve(repo)
+        else:
+            # fetching updates the remote-tracking refs of the repository
+            with _lock_repo_with(repo_locker, repo, read_only=False):
+                default_branch = _fetch_default_branch(repo, session)
+
+        if session is not None:
+            session.remember_default_branch(repo, default_branch)
+        return default_branch
+
+
+def _fetch_default_branch(repo: Repo, session: RemoteSession | None) -> str:
     git_ref_regex = r"refs\/remotes\/origin\/([\w*\-\.]+)"
     symbolic_ref_head = "refs/remotes/origin/HEAD"
 
+    if session is not None and session.fetch_options.narrow:
+        # ask the remote for its HEAD alone, rather than fetching every branch to find it
+        default_branch = query_default_branch(repo)
+        session.fetch(repo, [default_branch])
+        _set_remote_head(repo, default_branch)
+        return default_branch
+
     # local repo should be aware of branch objects prior to running the `set-head` command, where an unknown branch might be present
-    repo.remotes.origin.fetch()
+    if session is None:
+        with _network_call(f"fetching repo: {repo}") as network_kwargs:
+            repo.remotes.origin.fetch(**network_kwargs)
+    else:
+        session.fetch(repo)
 
-    # update HEAD pointer before querying local state
-    repo.git.remote(["set-head", "-a", "origin"])
+    # update HEAD pointer before querying local state, asking the remote for its HEAD
+    with _network_call(
+        f"querying the default branch of repo: {repo}"
+    ) as network_kwargs:
+        repo.git.remote(["set-head", "-a", "origin"], **network_kwargs)
 
-    # query local state for the HEAD pointer
-    default_ref = repo.git.symbolic_ref(symbolic_ref_head)
+    # query local state for the HEAD pointer, reading the symbolic ref rather than running `git symbolic-ref`
+    default_ref = _remote_head_ref(repo)
 
     match = re.match(git_ref_regex, default_ref)
     if not match:
@@ -246,3 +816,12 @@ def get_default_branch(repo: Repo) -> str:
         raise PyGitOpsError(
             f"The match object did not have a group in position {expected_position}"
         ) from err
+
+
+def _lock_repo_with(
+    repo_locker: RepoLocker | None, repo: Repo, read_only: bool
+) -> AbstractContextManager[None]:
+    if repo_locker is None:
+        return nullcontext()
+    mode = repo_locker.read_mode if read_only else LockMode.EXCLUSIVE
+    return repo_locker.lock(repo, mode=mode)
@@ -0,0 +1,196 @@
+"""Reuse open repository handles across operations, bounding the handles and git processes a process holds on to."""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from git import Repo
+from git.exc import InvalidGitRepositoryError, NoSuchPathError
+
+from pygitops._constants import (
+    DEFAULT_REPO_POOL_MAX_HELPER_PROCESSES,
+    DEFAULT_REPO_POOL_SIZE,
+)
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.git_channel import GitChannel
+from pygitops.types import PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+_shared_pool: "RepoPool | None" = None
+_shared_pool_lock = threading.Lock()
+
+
+class RepoPool:
+    """
+    Least recently used pool of open `git.Repo` handles, keyed by the path of their working tree.
+
+    Every `git.Repo` keeps long-lived `git cat-file` processes, and the file descriptors and memory maps of its object database,
+    until it is closed. Workers building a new handle for each operation collect these until they run out of them.
+    A pool hands out the same handle for a path each time, closes the least recently used handle once more than `max_repos` are open,
+    and stops the helper processes of the least recently used handles once more than `max_helper_processes` are running.
+
+    A handle closed by the pool remains usable, and restarts the processes it needs on demand.
+    Handles are shared, so a handle taken from the pool must not be used by two threads at the same time.
+    Use `RepoPool.shared` to share one pool between every operation of a process.
+
+    :param max_repos: Maximum number of handles kept open.
+    :param max_helper_processes: Maximum number of helper processes kept running by the handles of the pool,
+        enforced each time a handle is taken from the pool.
+    :raises PyGitOpsValueError: A limit is smaller than 1.
+    :attr hits: Number of times a handle was reused.
+    :attr misses: Number of times a handle had to be opened.
+    :attr evictions: Number of handles closed to stay within `max_repos`.
+    """
+
+    def __init__(
+        self,
+        max_repos: int = DEFAULT_REPO_POOL_SIZE,
+        max_helper_processes: int = DEFAULT_REPO_POOL_MAX_HELPER_PROCESSES,
+    ) -> None:
+        if max_repos < 1 or max_helper_processes < 1:
+            raise PyGitOpsValueError(
+                f"The limits of a repo pool must be at least 1, got: {max_repos}, {max_helper_processes}"
+            )
+        self.max_repos = max_repos
+        self.max_helper_processes = max_helper_processes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._repos: OrderedDict[str, Repo] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "RepoPool":
+        """Get the pool shared by every operation of this process, creating it with the default limits if needed."""
+        global _shared_pool
+        with _shared_pool_lock:
+            if _shared_pool is None:
+                _shared_pool = cls()
+            return _shared_pool
+
+    def get(self, path: PathOrStr) -> Repo | None:
+        """
+        Get the handle of the repository at a path, opening it if it is not in the pool.
+
+        :param path: Working tree of the repository.
+        :return: The handle, or None if there is no git repository at the path.
+        """
+        key = _pool_key(path)
+        with self._lock:
+            repo = self._repos.get(key)
+            if repo is not None and os.path.isdir(repo.git_dir):
+                self._repos.move_to_end(key)
+                self.hits += 1
+                self._limit_helper_processes(repo)
+                return repo
+            if repo is not None:
+                # the repository was deleted from disk after it was opened
+                self._close(self._repos.pop(key))
+
+        try:
+            repo = Repo(path)
+        except (InvalidGitRepositoryError, NoSuchPathError):
+            return None
+
+        with self._lock:
+            self.misses += 1
+            return self._add(key, repo)
+
+    def add(self, repo: Repo) -> Repo:
+        """
+        Put a handle opened elsewhere in the pool, e.g. one returned by `git.Repo.clone_from`.
+
+        :param repo: The handle, with a working tree.
+        :return: The handle kept by the pool, which is another handle if the pool already held one for the same path.
+        """
+        key = _pool_key(repo.working_tree_dir or repo.git_dir)
+        with self._lock:
+            return self._add(key, repo)
+
+    def evict(self, path: PathOrStr) -> None:
+        """
+        Close the handle of the repository at a path, and remove it from the pool.
+
+        :param path: Working tree of the repository.
+        """
+        with self._lock:
+            repo = self._repos.pop(_pool_key(path), None)
+            if repo is not None:
+                self._close(repo)
+
+    def close(self) -> None:
+        """Close every handle of the pool, and empty it."""
+        with self._lock:
+            while self._repos:
+                self._close(self._repos.popitem(last=False)[1])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._repos)
+
+    def __enter__(self) -> "RepoPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _add(self, key: str, repo: Repo) -> Repo:
+        # must be called while holding the pool lock
+        existing = self._repos.get(key)
+        if existing is not None and existing is not repo:
+            # another thread opened the same repository first, keep its handle
+            repo.close()
+            repo = existing
+        self._repos[key] = repo
+        self._repos.move_to_end(key)
+
+        while len(self._repos) > self.max_repos:
+            evicted_key, evicted = self._repos.popitem(last=False)
+            self.evictions += 1
+            _logger.debug(f"[Repo Pool] Evicting repo: {evicted_key}")
+            self._close(evicted)
+
+        self._limit_helper_processes(repo)
+        return repo
+
+    def _limit_helper_processes(self, keep: Repo) -> None:
+        # must be called while holding the pool lock
+        running = sum(_helper_processes(repo) for repo in self._repos.values())
+        for repo in list(self._repos.values()):
+            if running <= self.max_helper_processes:
+                return
+            if repo is keep:
+                continue
+            stopped = _helper_processes(repo)
+            if stopped:
+                _logger.debug(f"[Repo Pool] Stopping helper processes of repo: {repo}")
+                _stop_helper_processes(repo)
+                running -= stopped
+
+    @staticmethod
+    def _close(repo: Repo) -> None:
+        GitChannel.release(repo)
+        repo.close()
+
+
+def _pool_key(path: PathOrStr | os.PathLike) -> str:
+    return str(Path(path).expanduser().resolve())
+
+
+def _helper_processes(repo: Repo) -> int:
+    channel = GitChannel.shared(repo)
+    return (
+        (repo.git.cat_file_header is not None)
+        + (repo.git.cat_file_all is not None)
+        + (channel is not None and channel.running)
+    )
+
+
+def _stop_helper_processes(repo: Repo) -> None:
+    channel = GitChannel.shared(repo)
+    if channel is not None:
+        channel.close()
+    repo.git.clear_cache()
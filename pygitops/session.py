@@ -0,0 +1,167 @@
+"""Share remote state between pygitops operations."""
+
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+from git import GitCommandError, Repo
+
+from pygitops.deadlines import _network_call
+from pygitops.types import FetchOptions
+
+_logger = logging.getLogger(__name__)
+
+
+class RemoteSession:
+    """
+    Remote state shared by the pygitops operations that make up one logical operation.
+
+    Every operation that talks to `origin` normally fetches on its own, so a single `feature_branch` entry
+    contacts the remote several times. Passing the same session to `get_updated_repo`, `get_default_branch`,
+    `feature_branch` and `checkout_pull_branch` fetches each repository at most once and reuses the resulting
+    remote-tracking refs for every later step.
+
+    A session does not notice changes made to the remote after it fetched, so create a new one for each
+    logical operation rather than keeping one around for the lifetime of a process.
+
+    Fetches can be narrowed to the branches each operation needs with `fetch_options`,
+    which helps most with remotes holding many branches that the operations do not care about.
+
+    :param fetch_options: Optional options controlling how origin is fetched, see `FetchOptions`.
+    :attr fetches: Number of fetches issued through this session.
+    :attr round_trips_saved: Number of network round trips avoided by reusing state already held by this session.
+    """
+
+    def __init__(self, fetch_options: FetchOptions | None = None) -> None:
+        self.fetch_options = fetch_options or FetchOptions()
+        self.fetches = 0
+        self.round_trips_saved = 0
+        self._fetched: set[str] = set()
+        self._fetched_branches: dict[str, set[str]] = {}
+        self._default_branches: dict[str, str] = {}
+
+    def fetch(self, repo: Repo, branches: Iterable[str] | None = None) -> None:
+        """
+        Fetch from the origin remote of a repository, unless this session already did so.
+
+        :param repo: Repository whose origin remote should be fetched.
+        :param branches: Optional branches the caller needs. When fetches are narrowed, only those not fetched yet are fetched,
+            otherwise every branch is fetched.
+        """
+        key = _session_key(repo)
+        if key in self._fetched:
+            self.round_trips_saved += 1
+            _logger.debug(f"[Session] Reusing fetched state for repo: {repo}")
+            return
+
+        if not self.fetch_options.narrow or branches is None:
+            with _network_call(f"fetching repo: {repo}") as network_kwargs:
+                repo.remotes.origin.fetch(**self._fetch_kwargs(), **network_kwargs)
+            self.mark_fetched(repo)
+            self.fetches += 1
+            return
+
+        fetched_branches = self._fetched_branches.setdefault(key, set())
+        missing = [branch for branch in branches if branch not in fetched_branches]
+        if not missing:
+            self.round_trips_saved += 1
+            _logger.debug(
+                f"[Session] Reusing fetched state of branches: {list(branches)} for repo: {repo}"
+            )
+            return
+
+        self._fetch_branches(repo, missing)
+        fetched_branches.update(missing)
+        self.fetches += 1
+
+    def mark_fetched(self, repo: Repo) -> None:
+        """
+        Record that the remote-tracking refs of a repository are current, e.g. because it was just cloned.
+
+        :param repo: Repository whose remote-tracking refs are up to date.
+        """
+        self._fetched.add(_session_key(repo))
+
+    def pull(self, repo: Repo, branch: str) -> None:
+        """
+        Bring the checked out `branch` up to date with origin, merging the remote-tracking ref held by this session.
+
+        Equivalent to `origin.pull(branch)`, without the extra fetch performed by `git pull`.
+
+        :param repo: Repository whose active branch should be updated.
+        :param branch: Name of the branch on origin to merge.
+        """
+        self.fetch(repo, [branch])
+        repo.git.merge(f"{repo.remotes.origin.name}/{branch}")
+
+    def cached_default_branch(self, repo: Repo) -> str | None:
+        """
+        Get the default branch previously resolved for a repository during this session.
+
+        :param repo: Repository whose default branch is of interest.
+        :return: Name of the default branch, or None if it has not been resolved yet.
+        """
+        default_branch = self._default_branches.get(_session_key(repo))
+        if default_branch is not None:
+            # resolving the default branch costs a fetch plus `remote set-head -a`
+            self.round_trips_saved += 2
+        return default_branch
+
+    def remember_default_branch(self, repo: Repo, default_branch: str) -> None:
+        """
+        Record the resolved default branch of a repository for the rest of this session.
+
+        :param repo: Repository whose default branch was resolved.
+        :param default_branch: Name of the default branch.
+        """
+        self._default_branches[_session_key(repo)] = default_branch
+
+    def _fetch_kwargs(self) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {}
+        if self.fetch_options.no_tags:
+            kwargs["no_tags"] = True
+        if self.fetch_options.prune:
+            kwargs["prune"] = True
+        return kwargs
+
+    def _fetch_branches(self, repo: Repo, branches: list[str]) -> None:
+        origin = repo.remotes.origin
+        git = (
+            repo.git(c="protocol.version=2")
+            if self.fetch_options.protocol_v2
+            else repo.git
+        )
+        # with protocol version 2, the remote only advertises the refs matching these refspecs
+        refspecs = [
+            f"+refs/heads/{branch}:refs/remotes/{origin.name}/{branch}"
+            for branch in branches
+        ]
+        try:
+            with _network_call(f"fetching repo: {repo}") as network_kwargs:
+                git.fetch(
+                    origin.name, *refspecs, **self._fetch_kwargs(), **network_kwargs
+                )
+        except GitCommandError as err:
+            if "couldn't find remote ref" not in str(err):
+                raise
+            if len(branches) == 1:
+                # a missing branch is reported by the caller, once it finds no remote-tracking ref for it
+                self._forget_missing_branch(repo, branches[0])
+                return
+            # one missing branch fails the whole fetch, so the branches are fetched one by one
+            for branch in branches:
+                self._fetch_branches(repo, [branch])
+        _logger.debug(f"[Session] Fetched branches: {branches} for repo: {repo}")
+
+    def _forget_missing_branch(self, repo: Repo, branch: str) -> None:
+        _logger.debug(
+            f"[Session] Branch: {branch} does not exist on the origin remote of repo: {repo}"
+        )
+        if self.fetch_options.prune and branch in repo.remotes.origin.refs:
+            repo.git.update_ref(
+                "-d", f"refs/remotes/{repo.remotes.origin.name}/{branch}"
+            )
+
+
+def _session_key(repo: Repo) -> str:
+    return str(repo.git_dir)
@@ -1,3 +1,303 @@
+import random
+from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
 
+from git import Repo
+
+from pygitops._constants import (
+    DEFAULT_PUSH_RETRY_BACKOFF_FACTOR,
+    DEFAULT_PUSH_RETRY_INITIAL_DELAY_SECONDS,
+    DEFAULT_PUSH_RETRY_MAX_ATTEMPTS,
+    DEFAULT_PUSH_RETRY_MAX_DELAY_SECONDS,
+)
+
 PathOrStr = Path | str
+
+
+class CloneFilter(str, Enum):
+    """Partial clone filters supported by `get_updated_repo`."""
+
+    BLOBLESS = "blob:none"
+    TREELESS = "tree:0"
+
+
+@dataclass(frozen=True)
+class FetchOptions:
+    """
+    How a `RemoteSession` fetches from origin.
+
+    :attr narrow: Fetch only the branches an operation needs, such as the default branch and the feature branch,
+        rather than every branch of the remote.
+    :attr no_tags: Do not fetch tags.
+    :attr prune: Remove remote-tracking refs of branches that no longer exist on the remote.
+    :attr protocol_v2: Fetch with git protocol version 2, so that the remote only advertises the refs that are fetched.
+        Protocol version 2 is the default since git 2.26.
+    """
+
+    narrow: bool = False
+    no_tags: bool = False
+    prune: bool = False
+    protocol_v2: bool = False
+
+
+@dataclass(frozen=True)
+class PushRetry:
+    """
+    How `stage_commit_push_changes` retries a push rejected because the remote branch moved, e.g. by a concurrent writer.
+
+    Before each retry, the branch is fetched from origin, and the local commits are rebased onto its new tip.
+    Retries are delayed by a random time of up to `initial_delay_seconds`, growing by `backoff_factor` with each retry
+    up to `max_delay_seconds`, so that writers contending for a branch spread out.
+
+    :attr max_attempts: Maximum number of pushes, including the first one.
+    :attr initial_delay_seconds: Longest delay before the first retry.
+    :attr max_delay_seconds: Longest delay before any retry.
+    :attr backoff_factor: Factor the longest delay grows by with each retry.
+    """
+
+    max_attempts: int = DEFAULT_PUSH_RETRY_MAX_ATTEMPTS
+    initial_delay_seconds: float = DEFAULT_PUSH_RETRY_INITIAL_DELAY_SECONDS
+    max_delay_seconds: float = DEFAULT_PUSH_RETRY_MAX_DELAY_SECONDS
+    backoff_factor: float = DEFAULT_PUSH_RETRY_BACKOFF_FACTOR
+
+    def delay(self, retry: int) -> float:
+        """
+        Get the time to wait before a retry, with full jitter.
+
+        :param retry: Number of the retry, starting at 1.
+        :return: The delay, in seconds.
+        """
+        ceiling = min(
+            self.initial_delay_seconds * self.backoff_factor ** (retry - 1),
+            self.max_delay_seconds,
+        )
+        return random.uniform(0, ceiling)  # noqa: S311 - jitter, not cryptography
+
+
+class LockMode(str, Enum):
+    """Modes of the locks handed out by `RepoLocker`."""
+
+    # held by operations that only read a clone, any number of them at a time
+    SHARED = "shared"
+    # held by operations that change a clone, excluding every other holder
+    EXCLUSIVE = "exclusive"
+
+
+class LockKey(str, Enum):
+    """What identifies a clone to the locks handed out by `RepoLocker`."""
+
+    # the name of the clone directory, clones with the same name share a lock
+    NAME = "name"
+    # the canonical path of the clone directory
+    PATH = "path"
+    # the URL of the remote, clones of the same remote share a lock
+    REMOTE_URL = "remote_url"
+
+
+@dataclass
+class BranchCommit:
+    """
+    A commit to make on a branch with `commit_push_branches`.
+
+    :attr branch_name: Branch the commit is made on, created or reset to point at the commit.
+    :attr commit_message: Text to be used as the commit message.
+    :attr paths: Files and directories, relative to the working tree, whose working tree state is committed.
+    """
+
+    branch_name: str
+    commit_message: str
+    paths: list[Path]
+
+
+@dataclass
+class SyncResult:
+    """
+    Outcome of syncing one repository with `get_updated_repos`.
+
+    :attr repo_url: URL of the repository that was synced.
+    :attr clone_dir: Directory the repository was cloned or updated in.
+    :attr repo: The updated repository, or None if syncing failed.
+    :attr error: The error raised while syncing, or None if syncing succeeded.
+    :attr already_current: Whether an existing clone was found current with the remote, and left untouched, see `skip_if_current`.
+    """
+
+    repo_url: str
+    clone_dir: Path
+    repo: Repo | None = None
+    error: Exception | None = None
+    already_current: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """Whether the repository was synced successfully."""
+        return self.error is None
+
+
+@dataclass
+class FreshnessResult:
+    """
+    Outcome of comparing one clone with its remote using `scan_freshness`.
+
+    :attr repo_url: URL of the remote repository.
+    :attr clone_dir: Directory the repository is cloned to.
+    :attr default_branch: Default branch of the remote, or None if the remote could not be queried.
+    :attr remote_sha: SHA of the tip of the default branch on the remote, or None if the remote could not be queried.
+    :attr local_sha: SHA of the default branch in the clone, or None if there is no clone or the branch does not exist in it.
+    :attr error: The error raised while querying the remote or locking the clone, or None if both succeeded.
+    """
+
+    repo_url: str
+    clone_dir: Path
+    default_branch: str | None = None
+    remote_sha: str | None = None
+    local_sha: str | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the remote was queried, and the clone locked, successfully."""
+        return self.error is None
+
+    @property
+    def stale(self) -> bool:
+        """Whether the clone is missing or behind its remote, and needs to be updated. Clones that could not be scanned are not stale."""
+        return self.ok and self.local_sha != self.remote_sha
+
+
+@dataclass(frozen=True)
+class RemoteChange:
+    """
+    Move of the default branch of a remote, reported by `RemoteWatcher`.
+
+    :attr repo_url: URL of the remote repository.
+    :attr default_branch: Default branch of the remote.
+    :attr previous_sha: SHA of the tip of the default branch when the remote was last polled.
+    :attr sha: SHA of the new tip of the default branch.
+    """
+
+    repo_url: str
+    default_branch: str
+    previous_sha: str
+    sha: str
+
+
+@dataclass(frozen=True)
+class RepoHandle:
+    """
+    Picklable reference to a clone checked out on a feature branch, handed to the transform of `run_campaign`.
+
+    Unlike a `git.Repo`, a handle can be sent to another process, e.g. by a `ProcessPoolExecutor`.
+
+    :attr repo_url: URL of the remote repository, with credentials removed.
+    :attr clone_dir: Working tree of the clone.
+    :attr branch_name: The feature branch checked out in the clone.
+    """
+
+    repo_url: str
+    clone_dir: Path
+    branch_name: str
+
+    def open(self) -> Repo:
+        """Open the clone, to be closed by the caller."""
+        return Repo(self.clone_dir)
+
+
+class CampaignStatus(str, Enum):
+    """Outcome of running a change campaign over one repository with `run_campaign`."""
+
+    # the transform changed the repository, and the changes were pushed
+    PUSHED = "pushed"
+    # the transform left the repository unchanged, so nothing was pushed
+    UNCHANGED = "unchanged"
+    # a step failed, the error is reported with the result
+    FAILED = "failed"
+    # an earlier run recorded in the checkpoint already completed the repository
+    SKIPPED = "skipped"
+
+
+@dataclass
+class CampaignResult:
+    """
+    Outcome of running a change campaign over one repository with `run_campaign`.
+
+    :attr repo_url: URL of the repository.
+    :attr clone_dir: Directory the repository is cloned to.
+    :attr status: What was done with the repository.
+    :attr error: The error raised by the failed step, or None if no step failed.
+    :attr push_retries: Number of times the push was retried, see `PushRetry`.
+    """
+
+    repo_url: str
+    clone_dir: Path
+    status: CampaignStatus
+    error: Exception | None = None
+    push_retries: int = 0
+
+    @property
+    def ok(self) -> bool:
+        """Whether the repository was completed, now or by an earlier run."""
+        return self.status != CampaignStatus.FAILED
+
+
+@dataclass(frozen=True)
+class CloneRootStats:
+    """
+    Occupancy of a `CloneRoot`.
+
+    :attr clones: Number of clones in the root.
+    :attr used_bytes: Number of bytes the clones take on disk, as last measured.
+    :attr max_bytes: Number of bytes the clones may take altogether.
+    :attr evictions: Number of clones evicted through the `CloneRoot`.
+    :attr evicted_bytes: Number of bytes freed by those evictions.
+    """
+
+    clones: int
+    used_bytes: int
+    max_bytes: int
+    evictions: int
+    evicted_bytes: int
+
+    @property
+    def occupancy(self) -> float:
+        """Fraction of the budget in use, above 1 when the root is over budget."""
+        return self.used_bytes / self.max_bytes
+
+
+class MaintenanceTask(str, Enum):
+    """Maintenance tasks run on clones by `MaintenanceScheduler`, in the order they are run."""
+
+    # fetch from every remote into `refs/prefetch/`, so that later fetches download less, leaving remote-tracking refs as they are
+    PREFETCH = "prefetch"
+    # repack every object into a single pack and prune unreachable objects, as git would otherwise do on its own
+    GC = "gc"
+    # pack loose objects
+    LOOSE_OBJECTS = "loose-objects"
+    # combine small packs, without repacking the whole repository
+    INCREMENTAL_REPACK = "incremental-repack"
+    # write a multi-pack-index, so that objects are looked up in a single index rather than one per pack
+    MULTI_PACK_INDEX = "multi-pack-index"
+    # write the commit-graph, speeding up history walks such as merge bases and reachability checks
+    COMMIT_GRAPH = "commit-graph"
+
+
+@dataclass
+class MaintenanceResult:
+    """
+    Outcome of running a maintenance task on a clone, see `MaintenanceScheduler`.
+
+    :attr clone_dir: Directory of the clone.
+    :attr task: The task that was run.
+    :attr seconds: Time the task took.
+    :attr error: The error raised by the task, or None if it succeeded.
+    """
+
+    clone_dir: Path
+    task: MaintenanceTask
+    seconds: float
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the task succeeded."""
+        return self.error is None
@@ -0,0 +1,196 @@
+"""Work on several feature branches of one clone at the same time, each in its own git worktree."""
+
+import logging
+import threading
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from git import Repo
+
+from pygitops._constants import DEFAULT_WORKTREE_POOL_SIZE
+from pygitops._util import lock_repo as _lock_repo
+from pygitops._util import lock_repo_branch as _lock_repo_branch
+from pygitops.deadlines import _network_call, _without_deadline
+from pygitops.deadlines import deadline as _deadline
+from pygitops.default_branch_cache import DefaultBranchCache
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.fast_status import stop_fsmonitor
+from pygitops.git_channel import GitChannel
+from pygitops.operations import get_default_branch
+from pygitops.session import RemoteSession
+from pygitops.types import PathOrStr
+
+_logger = logging.getLogger(__name__)
+
+_WORKTREE_DIR_NAME = "pygitops-worktrees"
+
+
+class WorktreePool:
+    """
+    Pool of detached worktrees of one repository, reused by `feature_worktree` instead of checking out a new worktree each time.
+
+    Worktrees are returned to the pool clean, so reusing one only has to check out the files that differ between branches.
+    A pool belongs to a single process, and is safe to share between its threads.
+
+    :param repo: The repository owning the worktrees.
+    :param worktree_dir: Directory holding the worktrees, defaults to a directory inside the repository's git directory.
+    :param max_size: Maximum number of idle worktrees kept for reuse.
+    """
+
+    def __init__(
+        self,
+        repo: Repo,
+        worktree_dir: PathOrStr | None = None,
+        max_size: int = DEFAULT_WORKTREE_POOL_SIZE,
+    ) -> None:
+        self.repo = repo
+        self.worktree_dir = (
+            Path(worktree_dir)
+            if worktree_dir is not None
+            else _default_worktree_dir(repo)
+        )
+        self.max_size = max_size
+        self._idle: list[Path] = []
+        self._lock = threading.Lock()
+
+    @property
+    def idle_count(self) -> int:
+        """Number of worktrees waiting in the pool to be reused."""
+        with self._lock:
+            return len(self._idle)
+
+    def warm(self, count: int | None = None) -> None:
+        """
+        Create idle worktrees ahead of time, so that the next `feature_worktree` entries do not have to.
+
+        :param count: Number of idle worktrees the pool should hold, defaults to `max_size`.
+        """
+        count = self.max_size if count is None else min(count, self.max_size)
+        with _lock_repo(self.repo):
+            while self.idle_count < count:
+                path = _add_worktree(self.repo, self.worktree_dir)
+                with self._lock:
+                    self._idle.append(path)
+
+    def close(self) -> None:
+        """Remove every idle worktree."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        with _lock_repo(self.repo):
+            for path in idle:
+                _remove_worktree(self.repo, path)
+
+    def _acquire(self) -> Path:
+        # must be called while holding the repository lock
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _add_worktree(self.repo, self.worktree_dir)
+
+    def _release(self, path: Path) -> None:
+        # must be called while holding the repository lock
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(path)
+                return
+        _remove_worktree(self.repo, path)
+
+
+@contextmanager
+def feature_worktree(
+    repo: Repo,
+    branch_name: str,
+    pool: WorktreePool | None = None,
+    session: RemoteSession | None = None,
+    default_branch_cache: DefaultBranchCache | None = None,
+    timeout: float | None = None,
+) -> Iterator[Repo]:
+    """
+    Check out a feature branch, based on the tip of the default branch on origin, in a worktree of its own.
+
+    Unlike `feature_branch`, the working tree of `repo` is left alone and only `branch_name` is locked for the duration of the context,
+    so feature branches of the same repository can be worked on concurrently.
+    An existing local branch named `branch_name` is reset to the default branch.
+
+    Use the yielded repository, rather than `repo`, to make and commit changes, e.g. with `stage_commit_push_changes`.
+    The worktree is cleaned up, and returned to `pool` if provided, when the context is exited.
+
+    :param repo: Repository object
+    :param branch_name: Name of the feature branch to check out.
+    :param pool: Optional pool of worktrees to reuse.
+    :param session: Optional remote session, fetching origin at most once across this and related operations.
+    :param default_branch_cache: Optional cache used to resolve the default branch without fetching.
+    :param timeout: Optional number of seconds the context may take, bounding the operations run within it as well,
+        see `pygitops.deadlines.deadline`. The worktree is cleaned up when the context is exited regardless.
+    :raises PyGitOpsTimeoutError: The deadline passed, or a transfer stalled, before the operation was done.
+    :raises PyGitOpsValueError: The feature branch is the default branch, which is checked out by `repo` itself.
+    :raises PyGitOpsError: There was an error locking the branch or the repository.
+    """
+    with _deadline(timeout):
+        default_branch = get_default_branch(
+            repo, session=session, default_branch_cache=default_branch_cache
+        )
+        if branch_name == default_branch:
+            raise PyGitOpsValueError(
+                f"Cannot check out the default branch: {default_branch} in a feature worktree"
+            )
+
+        with _lock_repo_branch(repo, branch_name):
+            # the refs and worktree metadata shared by every worktree are only changed under the repository lock
+            with _lock_repo(repo):
+                if session is None:
+                    with _network_call(f"fetching repo: {repo}") as network_kwargs:
+                        repo.remotes.origin.fetch(**network_kwargs)
+                else:
+                    session.fetch(repo, [default_branch])
+                worktree_path = (
+                    pool._acquire()
+                    if pool is not None
+                    else _add_worktree(repo, _default_worktree_dir(repo))
+                )
+
+            worktree_repo = Repo(worktree_path)
+            reusable = False
+            try:
+                worktree_repo.git.checkout(
+                    "-B", branch_name, f"{repo.remotes.origin.name}/{default_branch}"
+                )
+                _logger.debug(
+                    f"Successfully checked out feature branch: {branch_name} in worktree: {worktree_path} of repository: {repo}"
+                )
+                yield worktree_repo
+
+                # clean up the feature branch, and release it so it can be checked out elsewhere
+                worktree_repo.git.clean("-xdf")
+                worktree_repo.git.reset("--hard")
+                worktree_repo.git.checkout("--detach")
+                reusable = True
+            finally:
+                GitChannel.release(worktree_repo)
+                worktree_repo.close()
+                with _without_deadline(), _lock_repo(repo):
+                    if reusable and pool is not None:
+                        pool._release(worktree_path)
+                    else:
+                        # a worktree left in an unknown state is discarded rather than reused
+                        _remove_worktree(repo, worktree_path)
+
+
+def _default_worktree_dir(repo: Repo) -> Path:
+    return Path(repo.common_dir) / _WORKTREE_DIR_NAME
+
+
+def _add_worktree(repo: Repo, worktree_dir: Path) -> Path:
+    path = worktree_dir / uuid.uuid4().hex
+    worktree_dir.mkdir(parents=True, exist_ok=True)
+    repo.git.worktree("add", "--detach", str(path))
+    _logger.debug(f"Created worktree: {path} for repository: {repo}")
+    return path
+
+
+def _remove_worktree(repo: Repo, path: Path) -> None:
+    stop_fsmonitor(path)
+    repo.git.worktree("remove", "--force", str(path))
+    _logger.debug(f"Removed worktree: {path} of repository: {repo}")
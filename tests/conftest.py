@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+SOME_INITIAL_COMMIT_MESSAGE = "some-commit-message"
+SOME_CONTENT_FILENAME = "foo.txt"
+
+
+@pytest.fixture
+def initialize_remote():
+    """
+    Initialize repositories for tests to clone, with a single commit on their initial branch.
+
+    The commit is empty, unless `content` is given, in which case it adds a file with that content, and the content as message.
+    """
+
+    def _initialize_remote(
+        path: Path, initial_branch: str = "main", content: str | None = None
+    ) -> Repo:
+        remote_repo = Repo.init(path, initial_branch=initial_branch)
+        if content is None:
+            remote_repo.index.commit(SOME_INITIAL_COMMIT_MESSAGE)
+        else:
+            (Path(path) / SOME_CONTENT_FILENAME).write_text(content)
+            remote_repo.index.add([SOME_CONTENT_FILENAME])
+            remote_repo.index.commit(content)
+        return remote_repo
+
+    return _initialize_remote
@@ -0,0 +1,50 @@
+from git import Repo
+
+from benchmarks.run_benchmarks import run_benchmarks
+from benchmarks.synthetic_repo import RepoShape, file_path, generate_bare_repo
+
+SOME_SHAPE = RepoShape(
+    file_count=150, history_depth=5, branch_count=3, tag_count=2, blob_size=10
+)
+
+
+def test_generate_bare_repo__shape__repo_matches_shape(tmp_path):
+    repo = generate_bare_repo(tmp_path / "remote.git", SOME_SHAPE)
+
+    tip = repo.heads.main.commit
+    assert len(list(repo.iter_commits("main"))) == SOME_SHAPE.history_depth
+    assert sorted(head.name for head in repo.heads) == [
+        "branch-0",
+        "branch-1",
+        "branch-2",
+        "main",
+    ]
+    assert sorted(tag.name for tag in repo.tags) == ["v0", "v1"]
+    blobs = [item for item in tip.tree.traverse() if item.type == "blob"]
+    assert len(blobs) == SOME_SHAPE.file_count
+    assert {blob.size for blob in blobs} == {SOME_SHAPE.blob_size}
+    assert (tip.tree / file_path(149)).data_stream.read().endswith(b"\n")
+
+
+def test_generate_bare_repo__same_shape__identical_repos(tmp_path):
+    repo = generate_bare_repo(tmp_path / "remote.git", SOME_SHAPE)
+    other_repo = generate_bare_repo(tmp_path / "other-remote.git", SOME_SHAPE)
+
+    assert repo.heads.main.commit.hexsha == other_repo.heads.main.commit.hexsha
+
+
+def test_run_benchmarks__small_repo__every_benchmark_timed(tmp_path):
+    results = run_benchmarks(SOME_SHAPE, tmp_path, repeat=2, many_files=20)
+
+    assert [result["name"] for result in results["results"]] == [
+        "get_updated_repo_cold",
+        "get_updated_repo_warm",
+        "get_default_branch",
+        "feature_branch_round_trip",
+        "stage_commit_push_changes_1_file",
+        "stage_commit_push_changes_20_files",
+    ]
+    assert all(len(result["runs_seconds"]) == 2 for result in results["results"])
+    assert results["shape"]["file_count"] == SOME_SHAPE.file_count
+    pushed = Repo(tmp_path / "remote.git").heads
+    assert "benchmark-stage-commit-push-changes-20-files-1" in pushed
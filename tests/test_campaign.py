@@ -0,0 +1,296 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from git import Actor, Repo
+
+from pygitops import campaign
+from pygitops.campaign import run_campaign
+from pygitops.default_branch_cache import DefaultBranchCache
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.locking import RepoLocker, SQLiteLockBackend
+from pygitops.types import CampaignStatus, RepoHandle
+
+SOME_ACTOR = Actor("some-user", "some-user@company.com")
+SOME_COMMIT_MESSAGE = "some-commit-message"
+SOME_DEFAULT_BRANCH = "main"
+SOME_FEATURE_BRANCH = "some-feature-branch"
+SOME_FILENAME = "some-file.txt"
+SOME_CONTENT = "some-content"
+
+
+def _items(tmp_path, names):
+    return [
+        (str(tmp_path / f"{name}-remote"), tmp_path / f"{name}-local", {})
+        for name in names
+    ]
+
+
+def _write_file_unless_skipped(handle: RepoHandle) -> None:
+    # defined at module level, so that process pools can pickle it
+    if "skip" not in handle.repo_url:
+        (handle.clone_dir / SOME_FILENAME).write_text(SOME_CONTENT)
+
+
+def _fail_on_broken(handle: RepoHandle) -> None:
+    if "broken" in handle.repo_url:
+        raise RuntimeError("some-transform-error")
+    _write_file_unless_skipped(handle)
+
+
+def test_run_campaign__changed_and_unchanged_repos__changed_repos_pushed(
+    tmp_path, initialize_remote
+):
+    remotes = {
+        name: initialize_remote(tmp_path / f"{name}-remote")
+        for name in ("first", "second", "skip")
+    }
+
+    results = run_campaign(
+        _items(tmp_path, remotes),
+        _write_file_unless_skipped,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        network_workers=2,
+        transform_workers=2,
+    )
+
+    assert [result.status for result in results] == [
+        CampaignStatus.PUSHED,
+        CampaignStatus.PUSHED,
+        CampaignStatus.UNCHANGED,
+    ]
+    for name in ("first", "second"):
+        assert SOME_FILENAME in remotes[name].heads[SOME_FEATURE_BRANCH].commit.tree
+    assert SOME_FEATURE_BRANCH not in remotes["skip"].heads
+    # the feature branch was cleaned up after pushing
+    local_repo = Repo(tmp_path / "first-local")
+    assert local_repo.active_branch.name == SOME_DEFAULT_BRANCH
+    assert not (tmp_path / "first-local" / SOME_FILENAME).exists()
+
+
+def test_run_campaign__item_kwargs__used_by_every_step(
+    mocker, tmp_path, initialize_remote
+):
+    initialize_remote(tmp_path / "first-remote")
+    locker = RepoLocker(SQLiteLockBackend(tmp_path / "locks.db"))
+    cache = DefaultBranchCache()
+    kwargs = {"repo_locker": locker, "default_branch_cache": cache, "timeout": 60}
+    feature_branch_spy = mocker.spy(campaign, "feature_branch")
+    push_spy = mocker.spy(campaign, "stage_commit_push_changes")
+
+    results = run_campaign(
+        [(str(tmp_path / "first-remote"), tmp_path / "first-local", kwargs)],
+        _write_file_unless_skipped,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+    )
+
+    assert results[0].status == CampaignStatus.PUSHED
+    assert feature_branch_spy.call_args.kwargs == {
+        "session": mocker.ANY,
+        **kwargs,
+    }
+    assert push_spy.call_args.kwargs["timeout"] == 60
+
+
+def test_run_campaign__process_pool__transform_run_in_other_process(
+    tmp_path, initialize_remote
+):
+    remote_repo = initialize_remote(tmp_path / "first-remote")
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        results = run_campaign(
+            _items(tmp_path, ["first"]),
+            _write_file_unless_skipped,
+            SOME_FEATURE_BRANCH,
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+            transform_workers=1,
+            transform_executor=executor,
+        )
+
+    assert results[0].status == CampaignStatus.PUSHED
+    assert SOME_FILENAME in remote_repo.heads[SOME_FEATURE_BRANCH].commit.tree
+
+
+def test_run_campaign__transform_fails__failure_reported_and_others_pushed(
+    tmp_path, initialize_remote
+):
+    for name in ("broken", "first"):
+        initialize_remote(tmp_path / f"{name}-remote")
+
+    results = run_campaign(
+        _items(tmp_path, ["broken", "first"]),
+        _fail_on_broken,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+    )
+
+    assert [result.ok for result in results] == [False, True]
+    assert results[0].status == CampaignStatus.FAILED
+    assert str(results[0].error) == "some-transform-error"
+    assert results[1].status == CampaignStatus.PUSHED
+
+
+def test_run_campaign__checkpoint__completed_repos_skipped_on_rerun(
+    tmp_path, initialize_remote
+):
+    for name in ("broken", "first", "skip"):
+        initialize_remote(tmp_path / f"{name}-remote")
+    items = _items(tmp_path, ["broken", "first", "skip"])
+    checkpoint_path = tmp_path / "checkpoints" / "campaign.jsonl"
+
+    run_campaign(
+        items,
+        _fail_on_broken,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        checkpoint_path=checkpoint_path,
+    )
+    results = run_campaign(
+        items,
+        _write_file_unless_skipped,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        checkpoint_path=checkpoint_path,
+    )
+
+    assert [result.status for result in results] == [
+        CampaignStatus.PUSHED,
+        CampaignStatus.SKIPPED,
+        CampaignStatus.SKIPPED,
+    ]
+    records = [json.loads(line) for line in checkpoint_path.read_text().splitlines()]
+    assert sorted(record["status"] for record in records) == [
+        "pushed",
+        "pushed",
+        "unchanged",
+    ]
+
+
+@pytest.mark.parametrize("left_checked_out", [True, False])
+def test_run_campaign__crashed_mid_repo__repo_branched_again_on_resume(
+    tmp_path, initialize_remote, left_checked_out
+):
+    for name in ("first", "crashed"):
+        initialize_remote(tmp_path / f"{name}-remote")
+    items = _items(tmp_path, ["first", "crashed"])
+    checkpoint_path = tmp_path / "campaign.jsonl"
+    run_campaign(
+        items[:1],
+        _write_file_unless_skipped,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        checkpoint_path=checkpoint_path,
+    )
+    # the state a process killed while transforming the second repo leaves behind
+    crashed_repo = Repo.clone_from(items[1][0], items[1][1])
+    crashed_repo.create_head(SOME_FEATURE_BRANCH).checkout()
+    (items[1][1] / SOME_FILENAME).write_text("some-partial-content")
+    crashed_repo.index.add([SOME_FILENAME])
+    crashed_repo.index.commit("some-partial-commit")
+    if left_checked_out:
+        (items[1][1] / SOME_FILENAME).write_text("some-other-partial-content")
+        (items[1][1] / "some-untracked-file.txt").touch()
+    else:
+        crashed_repo.heads[SOME_DEFAULT_BRANCH].checkout()
+    crashed_repo.close()
+
+    results = run_campaign(
+        items,
+        _write_file_unless_skipped,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        checkpoint_path=checkpoint_path,
+    )
+
+    assert [result.status for result in results] == [
+        CampaignStatus.SKIPPED,
+        CampaignStatus.PUSHED,
+    ]
+    pushed_commit = Repo(items[1][0]).heads[SOME_FEATURE_BRANCH].commit
+    assert (pushed_commit.tree / SOME_FILENAME).data_stream.read() == (
+        SOME_CONTENT.encode()
+    )
+    local_repo = Repo(items[1][1])
+    assert local_repo.active_branch.name == SOME_DEFAULT_BRANCH
+    assert not local_repo.is_dirty(untracked_files=True)
+
+
+def test_run_campaign__checkpoint_record_cut_short__record_ignored(
+    tmp_path, initialize_remote
+):
+    initialize_remote(tmp_path / "first-remote")
+    items = _items(tmp_path, ["first"])
+    checkpoint_path = tmp_path / "campaign.jsonl"
+    checkpoint_path.write_text('{"repo_url": "some-cut-short')
+
+    results = run_campaign(
+        items,
+        _write_file_unless_skipped,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        checkpoint_path=checkpoint_path,
+    )
+
+    assert results[0].status == CampaignStatus.PUSHED
+    assert (
+        json.loads(checkpoint_path.read_text().splitlines()[-1])["status"] == "pushed"
+    )
+
+
+def test_run_campaign__checkpoint_of_other_branch__repos_not_skipped(
+    tmp_path, initialize_remote
+):
+    initialize_remote(tmp_path / "first-remote")
+    items = _items(tmp_path, ["first"])
+    checkpoint_path = tmp_path / "campaign.jsonl"
+
+    for branch_name in (SOME_FEATURE_BRANCH, "some-other-feature-branch"):
+        results = run_campaign(
+            items,
+            _write_file_unless_skipped,
+            branch_name,
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+            checkpoint_path=checkpoint_path,
+        )
+        assert results[0].status == CampaignStatus.PUSHED
+
+
+@pytest.mark.parametrize("kwargs", [{"network_workers": 0}, {"transform_workers": 0}])
+def test_run_campaign__invalid_workers__raises_pygitops_value_error(tmp_path, kwargs):
+    with pytest.raises(PyGitOpsValueError):
+        run_campaign(
+            [],
+            _write_file_unless_skipped,
+            SOME_FEATURE_BRANCH,
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+            **kwargs,
+        )
+
+
+def test_run_campaign__clone_dir_listed_twice__raises_pygitops_value_error(tmp_path):
+    items = [
+        ("some-remote", tmp_path / "local", {}),
+        ("some-other-remote", tmp_path / "local", {}),
+    ]
+
+    with pytest.raises(PyGitOpsValueError):
+        run_campaign(
+            items,
+            _write_file_unless_skipped,
+            SOME_FEATURE_BRANCH,
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+        )
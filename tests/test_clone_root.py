@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+from pygitops._util import lock_repo
+from pygitops.clone_root import _ACCESS_MARKER, CloneRoot, _disk_usage
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.locking import RepoLocker, SQLiteLockBackend
+from pygitops.operations import get_updated_repo
+
+SOME_BUDGET = 2**40
+
+
+def _set_last_access(clone_root, name, seconds):
+    marker = clone_root.clone_dir(name) / ".git" / _ACCESS_MARKER
+    os.utime(marker, (seconds, seconds))
+
+
+@pytest.fixture
+def clone_root(tmp_path):
+    return CloneRoot(tmp_path / "clones", max_bytes=SOME_BUDGET)
+
+
+@pytest.fixture
+def clone(tmp_path, initialize_remote):
+    def _clone(clone_root, name):
+        initialize_remote(tmp_path / "remotes" / name)
+        return get_updated_repo(
+            str(tmp_path / "remotes" / name),
+            clone_root.clone_dir(name),
+            clone_root=clone_root,
+        )
+
+    return _clone
+
+
+def test_clone_root_stats__clones_touched__occupancy_reported(
+    tmp_path, clone_root, clone
+):
+    for name in ("first", "second"):
+        clone(clone_root, name)
+
+    stats = clone_root.stats()
+
+    assert stats.clones == 2
+    # measured before the marker holding the measurement was written
+    assert (
+        0
+        < stats.used_bytes
+        <= sum(_disk_usage(clone_root.clone_dir(name)) for name in ("first", "second"))
+    )
+    assert stats.occupancy == stats.used_bytes / SOME_BUDGET
+    assert (stats.evictions, stats.evicted_bytes) == (0, 0)
+
+
+def test_get_updated_repo__clone_root_over_budget__least_recently_used_evicted(
+    tmp_path, clone_root, clone
+):
+    for name in ("first", "second"):
+        clone(clone_root, name)
+    _set_last_access(clone_root, "first", 2000)
+    _set_last_access(clone_root, "second", 1000)
+    clone_root.max_bytes = clone_root.stats().used_bytes
+
+    clone(clone_root, "third")
+
+    assert not clone_root.clone_dir("second").exists()
+    assert clone_root.clone_dir("first").exists()
+    assert clone_root.clone_dir("third").exists()
+    assert clone_root.evictions == 1
+    assert clone_root.stats().used_bytes <= clone_root.max_bytes
+
+
+def test_clone_root_enforce__clone_in_use__next_clone_evicted(
+    tmp_path, clone_root, clone
+):
+    repos = {name: clone(clone_root, name) for name in ("first", "second")}
+    _set_last_access(clone_root, "first", 1000)
+    _set_last_access(clone_root, "second", 2000)
+    clone_root.max_bytes = 1
+
+    with lock_repo(repos["first"]):
+        evicted = clone_root.enforce()
+
+    assert evicted == [clone_root.clone_dir("second")]
+    assert clone_root.clone_dir("first").exists()
+
+
+def test_clone_root_enforce__clone_kept__not_evicted(tmp_path, clone_root, clone):
+    for name in ("first", "second"):
+        clone(clone_root, name)
+    clone_root.max_bytes = 1
+
+    evicted = clone_root.enforce(keep=[clone_root.clone_dir("first")])
+
+    assert evicted == [clone_root.clone_dir("second")]
+
+
+def test_clone_root_evict__repo_locker_lock_held__not_evicted(tmp_path, clone):
+    locker = RepoLocker(SQLiteLockBackend(tmp_path / "locks.db"))
+    clone_root = CloneRoot(
+        tmp_path / "clones", max_bytes=SOME_BUDGET, repo_locker=locker
+    )
+    repo = clone(clone_root, "first")
+
+    with locker.lock(repo):
+        assert not clone_root.evict(clone_root.clone_dir("first"))
+    assert clone_root.evict(clone_root.clone_dir("first"))
+    assert not clone_root.clone_dir("first").exists()
+
+
+def test_clone_root_stats__untouched_directory__counted(clone_root):
+    untouched_dir = clone_root.clone_dir("untouched")
+    untouched_dir.mkdir()
+    (untouched_dir / "some-file").write_bytes(b"0" * 10000)
+
+    assert clone_root.stats().used_bytes >= 10000
+
+
+def test_disk_usage__hard_links__counted_once(tmp_path):
+    (tmp_path / "some-file").write_bytes(b"0" * 10000)
+    usage = _disk_usage(tmp_path)
+    os.link(tmp_path / "some-file", tmp_path / "some-link")
+
+    assert _disk_usage(tmp_path) == usage
+
+
+@pytest.mark.parametrize("name", ["", ".hidden", "some/nested", ".."])
+def test_clone_root_clone_dir__invalid_name__raises_pygitops_value_error(
+    clone_root, name
+):
+    with pytest.raises(PyGitOpsValueError):
+        clone_root.clone_dir(name)
+
+
+def test_get_updated_repo__clone_dir_outside_clone_root__raises_pygitops_value_error(
+    tmp_path, clone_root, initialize_remote
+):
+    initialize_remote(tmp_path / "remote")
+
+    with pytest.raises(PyGitOpsValueError):
+        get_updated_repo(
+            str(tmp_path / "remote"), tmp_path / "elsewhere", clone_root=clone_root
+        )
+
+
+def test_clone_root__budget_not_positive__raises_pygitops_value_error(tmp_path):
+    with pytest.raises(PyGitOpsValueError):
+        CloneRoot(tmp_path, max_bytes=0)
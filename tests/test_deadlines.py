@@ -0,0 +1,225 @@
+import time
+from pathlib import Path
+
+import pytest
+from git import Actor, GitCommandError
+
+from pygitops._util import lock_repo
+from pygitops.deadlines import _network_call, current_deadline, deadline
+from pygitops.exceptions import (
+    PyGitOpsError,
+    PyGitOpsTimeoutError,
+    PyGitOpsValueError,
+)
+from pygitops.operations import (
+    feature_branch,
+    get_updated_repo,
+    stage_commit_push_changes,
+)
+from pygitops.worktrees import feature_worktree
+
+SOME_DEFAULT_BRANCH = "some-default-branch"
+SOME_FEATURE_BRANCH = "some-feature-branch"
+SOME_ACTOR = Actor("some-user", "some-user@some-domain.com")
+SOME_COMMIT_MESSAGE = "some-commit-message"
+SOME_DESCRIPTION = "doing something"
+
+
+@pytest.fixture
+def clock(mocker):
+    # deadlines are measured with the monotonic clock, moved forward by the tests
+    now = [1000.0]
+    mocker.patch("pygitops.deadlines.time.monotonic", side_effect=lambda: now[0])
+    return now
+
+
+def test_deadline__nested__earliest_deadline_in_effect(clock):
+    with deadline(10) as outer:
+        with deadline(100) as inner:
+            assert current_deadline() is inner
+            assert inner.expires_at == outer.expires_at == 1010
+        with deadline(5) as inner:
+            assert inner.expires_at == 1005
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_deadline__no_limit__outer_deadline_kept():
+    with deadline(10) as outer, deadline() as inner:
+        assert inner is outer
+
+
+def test_deadline__passed__remaining_raises_pygitops_timeout_error(clock):
+    with deadline(10) as current:
+        assert current.remaining() == 10
+        clock[0] += 10
+
+        assert current.expired
+        with pytest.raises(PyGitOpsTimeoutError):
+            current.remaining()
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"seconds": 0}, {"seconds": -1}, {"stall_seconds": 0}]
+)
+def test_deadline__not_positive__raises_pygitops_value_error(kwargs):
+    with pytest.raises(PyGitOpsValueError), deadline(**kwargs):
+        pass
+
+
+def test_network_call__no_deadline__no_arguments():
+    with _network_call(SOME_DESCRIPTION) as network_kwargs:
+        assert network_kwargs == {}
+
+
+def test_network_call__deadline__timeout_and_stall_detection_passed(clock):
+    with (
+        deadline(10, min_bytes_per_second=1024, stall_seconds=20),
+        _network_call(SOME_DESCRIPTION) as network_kwargs,
+    ):
+        assert network_kwargs == {
+            "kill_after_timeout": 10,
+            "env": {
+                "GIT_HTTP_LOW_SPEED_LIMIT": "1024",
+                "GIT_HTTP_LOW_SPEED_TIME": "20",
+            },
+        }
+
+
+def test_network_call__command_killed_at_deadline__raises_pygitops_timeout_error(
+    clock,
+):
+    with (
+        pytest.raises(PyGitOpsTimeoutError, match=SOME_DESCRIPTION),
+        deadline(10),
+        _network_call(SOME_DESCRIPTION),
+    ):
+        clock[0] += 10
+        raise GitCommandError("git fetch", -9)
+
+
+def test_network_call__transfer_stalled__raises_pygitops_timeout_error():
+    with (
+        pytest.raises(PyGitOpsTimeoutError, match="stalled"),
+        deadline(min_bytes_per_second=1024),
+        _network_call(SOME_DESCRIPTION),
+    ):
+        raise GitCommandError("git fetch", 128, "error: Operation too slow")
+
+
+def test_network_call__command_failed_before_deadline__error_reraised(clock):
+    with pytest.raises(GitCommandError), deadline(10), _network_call(SOME_DESCRIPTION):
+        raise GitCommandError("git fetch", 128)
+
+
+def test_get_updated_repo__deadline_passed__raises_pygitops_timeout_error(
+    tmp_path, clock, initialize_remote
+):
+    initialize_remote(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+
+    with pytest.raises(PyGitOpsTimeoutError), deadline(10):
+        clock[0] += 10
+        get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+
+
+def test_get_updated_repo__timeout__repo_cloned_and_updated(
+    tmp_path, initialize_remote
+):
+    remote_repo = initialize_remote(
+        tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH
+    )
+
+    local_repo = get_updated_repo(
+        str(tmp_path / "remote"), tmp_path / "local", timeout=60
+    )
+    assert local_repo.head.commit == remote_repo.head.commit
+
+    remote_repo.index.commit(SOME_COMMIT_MESSAGE)
+    local_repo = get_updated_repo(
+        str(tmp_path / "remote"), tmp_path / "local", timeout=60
+    )
+    assert local_repo.head.commit == remote_repo.head.commit
+
+
+def test_get_updated_repo__timeout_and_unsafe_options_allowed__options_used(
+    tmp_path, initialize_remote
+):
+    initialize_remote(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+
+    local_repo = get_updated_repo(
+        str(tmp_path / "remote"),
+        tmp_path / "local",
+        timeout=60,
+        multi_options=["--config some.option=some-value"],
+        allow_unsafe_options=True,
+    )
+
+    assert local_repo.config_reader().get_value("some", "option") == "some-value"
+
+
+def test_get_updated_repo__timeout_and_unsafe_options__raises_pygitops_error(
+    tmp_path,
+    initialize_remote,
+):
+    initialize_remote(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+
+    with pytest.raises(PyGitOpsError, match="--config"):
+        get_updated_repo(
+            str(tmp_path / "remote"),
+            tmp_path / "local",
+            timeout=60,
+            multi_options=["--config some.option=some-value"],
+        )
+
+    assert not (tmp_path / "local" / ".git").exists()
+
+
+def test_stage_commit_push_changes__timeout__changes_pushed(
+    tmp_path, initialize_remote
+):
+    remote_repo = initialize_remote(
+        tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH
+    )
+    local_repo = get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+
+    with feature_branch(local_repo, SOME_FEATURE_BRANCH, timeout=60):
+        (tmp_path / "local" / "some-file").write_text("some-content")
+        stage_commit_push_changes(
+            local_repo, SOME_FEATURE_BRANCH, SOME_ACTOR, SOME_COMMIT_MESSAGE, timeout=60
+        )
+
+    assert SOME_FEATURE_BRANCH in remote_repo.heads
+
+
+def test_lock_repo__held_within_deadline__wait_cut_short(mocker, tmp_path):
+    mocker.patch("pygitops._util._lockfile_path", new=tmp_path)
+    repo_mock = mocker.Mock(working_dir="some-repo-namespace/some-repo")
+
+    started = time.monotonic()
+    with (
+        lock_repo(repo_mock),
+        pytest.raises(PyGitOpsTimeoutError),
+        deadline(0.2),
+        lock_repo(repo_mock),
+    ):
+        pass
+
+    assert time.monotonic() - started < 5
+
+
+def test_feature_worktree__deadline_passed_within__worktree_removed(
+    tmp_path, clock, initialize_remote
+):
+    initialize_remote(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+    local_repo = get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+
+    with (
+        pytest.raises(PyGitOpsTimeoutError),
+        feature_worktree(local_repo, SOME_FEATURE_BRANCH, timeout=10) as worktree,
+    ):
+        worktree_dir = Path(worktree.working_tree_dir)
+        clock[0] += 10
+        current_deadline().remaining()
+
+    assert not worktree_dir.exists()
+    assert len(local_repo.git.worktree("list").splitlines()) == 1
@@ -0,0 +1,150 @@
+import pytest
+from git import Git, GitCommandError
+
+from pygitops._util import changed_paths
+from pygitops.clone_root import CloneRoot
+from pygitops.fast_status import (
+    disable_fast_status,
+    enable_fast_status,
+    fsmonitor_supported,
+)
+from pygitops.operations import get_updated_repo
+
+SOME_BUILD_OPTIONS = "cpu: x86_64\nsizeof-long: 8\n"
+
+
+def _daemon(command, running=True, start=True):
+    # `git fsmonitor--daemon`, failing to report a daemon that is not running, or to start one that cannot watch the working tree
+    if (command == "status" and not running) or (command == "start" and not start):
+        raise GitCommandError(["git", "fsmonitor--daemon", command], 1)
+
+
+def _core_config(repo, option):
+    return repo.config_reader(config_level="repository").get_value("core", option, "")
+
+
+@pytest.fixture(autouse=True)
+def clear_fsmonitor_supported():
+    fsmonitor_supported.cache_clear()
+    yield
+    fsmonitor_supported.cache_clear()
+
+
+@pytest.fixture
+def fsmonitor_unsupported(mocker):
+    mocker.patch("pygitops.fast_status.fsmonitor_supported", return_value=False)
+
+
+@pytest.fixture
+def daemon_mock(mocker):
+    # stands in for `git fsmonitor--daemon`, on platforms where git has no builtin fsmonitor
+    mocker.patch("pygitops.fast_status.fsmonitor_supported", return_value=True)
+    return mocker.patch.object(Git, "fsmonitor__daemon", create=True)
+
+
+@pytest.fixture
+def local_repo(tmp_path, initialize_remote):
+    initialize_remote(tmp_path / "remote")
+    return get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+
+
+@pytest.mark.parametrize("existing_clone", [False, True])
+def test_get_updated_repo__fast_status__untracked_cache_and_split_index_enabled(
+    tmp_path, fsmonitor_unsupported, existing_clone, initialize_remote
+):
+    initialize_remote(tmp_path / "remote")
+    if existing_clone:
+        get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+
+    repo = get_updated_repo(
+        str(tmp_path / "remote"), tmp_path / "local", fast_status=True
+    )
+
+    assert _core_config(repo, "untrackedCache") is True
+    assert _core_config(repo, "splitIndex") is True
+    assert list((tmp_path / "local" / ".git").glob("sharedindex.*"))
+    assert _core_config(repo, "fsmonitor") == ""
+
+
+def test_enable_fast_status__files_added_after_status__changes_found(
+    tmp_path, local_repo, fsmonitor_unsupported
+):
+    enable_fast_status(local_repo)
+    (tmp_path / "local" / "some-dir").mkdir()
+    assert changed_paths(local_repo) == []
+
+    (tmp_path / "local" / "some-dir" / "some-file").write_text("some-content")
+
+    assert [str(path) for path in changed_paths(local_repo)] == ["some-dir/some-file"]
+
+
+def test_enable_fast_status__fsmonitor_unsupported__fsmonitor_not_used(
+    local_repo, fsmonitor_unsupported
+):
+    assert not enable_fast_status(local_repo)
+    assert _core_config(local_repo, "fsmonitor") == ""
+
+
+def test_enable_fast_status__fsmonitor_started__fsmonitor_used(local_repo, daemon_mock):
+    # `status` fails until the daemon is started
+    daemon_mock.side_effect = lambda command: _daemon(command, running=False)
+
+    assert enable_fast_status(local_repo)
+
+    assert [call.args for call in daemon_mock.call_args_list] == [
+        ("status",),
+        ("start",),
+    ]
+    assert _core_config(local_repo, "fsmonitor") is True
+
+
+def test_enable_fast_status__daemon_cannot_watch__fsmonitor_not_used(
+    local_repo, daemon_mock
+):
+    daemon_mock.side_effect = lambda command: _daemon(
+        command, running=False, start=False
+    )
+
+    assert not enable_fast_status(local_repo)
+    assert _core_config(local_repo, "fsmonitor") == ""
+    assert _core_config(local_repo, "untrackedCache") is True
+
+
+def test_disable_fast_status__fsmonitor_running__daemon_stopped_and_config_removed(
+    local_repo, daemon_mock
+):
+    enable_fast_status(local_repo)
+
+    disable_fast_status(local_repo)
+
+    assert daemon_mock.call_args_list[-1].args == ("stop",)
+    for option in ("fsmonitor", "untrackedCache", "splitIndex"):
+        assert _core_config(local_repo, option) == ""
+
+
+def test_clone_root_evict__fsmonitor_running__daemon_stopped(
+    tmp_path, daemon_mock, initialize_remote
+):
+    clone_root = CloneRoot(tmp_path / "clones", max_bytes=2**40)
+    initialize_remote(tmp_path / "remote")
+    get_updated_repo(
+        str(tmp_path / "remote"), clone_root.clone_dir("local"), clone_root=clone_root
+    )
+
+    assert clone_root.evict(clone_root.clone_dir("local"))
+    assert daemon_mock.call_args_list[-1].args == ("stop",)
+
+
+@pytest.mark.parametrize(
+    ("build_options", "expected"),
+    [
+        (SOME_BUILD_OPTIONS, False),
+        (f"{SOME_BUILD_OPTIONS}feature: fsmonitor--daemon\n", True),
+    ],
+)
+def test_fsmonitor_supported__build_options__feature_detected(
+    mocker, build_options, expected
+):
+    mocker.patch.object(Git, "version", create=True, return_value=build_options)
+
+    assert fsmonitor_supported() is expected
@@ -0,0 +1,194 @@
+import threading
+
+import pytest
+
+from pygitops.deadlines import deadline
+from pygitops.exceptions import (
+    PyGitOpsError,
+    PyGitOpsTimeoutError,
+    PyGitOpsValueError,
+)
+from pygitops.freshness import RemoteWatcher, query_default_branch_tip, scan_freshness
+from pygitops.locking import RepoLocker, SQLiteLockBackend
+from pygitops.operations import get_updated_repo
+from pygitops.types import LockKey, LockMode
+
+SOME_DEFAULT_BRANCH = "some-default-branch"
+SOME_COMMIT_MESSAGE = "some-commit-message"
+
+
+@pytest.fixture
+def clock(mocker):
+    # polls are scheduled with the monotonic clock, moved forward by the tests
+    now = [1000.0]
+    mocker.patch("pygitops.freshness.time.monotonic", side_effect=lambda: now[0])
+    return now
+
+
+def test_query_default_branch_tip__local_remote__default_branch_and_tip_returned(
+    tmp_path, initialize_remote
+):
+    remote_repo = initialize_remote(
+        tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH
+    )
+
+    assert query_default_branch_tip(str(tmp_path / "remote")) == (
+        SOME_DEFAULT_BRANCH,
+        remote_repo.head.commit.hexsha,
+    )
+
+
+def test_query_default_branch_tip__remote_dne__raises_pygitops_error(tmp_path):
+    with pytest.raises(PyGitOpsError):
+        query_default_branch_tip(str(tmp_path / "remote-dne"))
+
+
+def test_query_default_branch_tip__deadline_passed__raises_pygitops_timeout_error(
+    mocker, tmp_path, initialize_remote
+):
+    initialize_remote(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+    now = [1000.0]
+    mocker.patch("pygitops.deadlines.time.monotonic", side_effect=lambda: now[0])
+
+    with pytest.raises(PyGitOpsTimeoutError), deadline(5):
+        now[0] += 5
+        query_default_branch_tip(str(tmp_path / "remote"))
+
+
+def test_scan_freshness__clones_current_stale_and_missing__stale_clones_reported(
+    tmp_path,
+    initialize_remote,
+):
+    current_remote = initialize_remote(
+        tmp_path / "current-remote", initial_branch=SOME_DEFAULT_BRANCH
+    )
+    stale_remote = initialize_remote(
+        tmp_path / "stale-remote", initial_branch=SOME_DEFAULT_BRANCH
+    )
+    get_updated_repo(str(tmp_path / "current-remote"), tmp_path / "current-local")
+    get_updated_repo(str(tmp_path / "stale-remote"), tmp_path / "stale-local")
+    stale_remote.index.commit(SOME_COMMIT_MESSAGE)
+    initialize_remote(tmp_path / "uncloned-remote", initial_branch=SOME_DEFAULT_BRANCH)
+    items = [
+        (str(tmp_path / "current-remote"), tmp_path / "current-local"),
+        (str(tmp_path / "stale-remote"), tmp_path / "stale-local"),
+        (str(tmp_path / "uncloned-remote"), tmp_path / "uncloned-local"),
+        (str(tmp_path / "remote-dne"), tmp_path / "local-dne"),
+    ]
+
+    results = scan_freshness(items, max_workers=2)
+
+    assert [result.repo_url for result in results] == [item[0] for item in items]
+    assert [result.stale for result in results] == [False, True, True, False]
+    assert [result.ok for result in results] == [True, True, True, False]
+    assert results[0].local_sha == current_remote.head.commit.hexsha
+    assert results[1].remote_sha == stale_remote.head.commit.hexsha
+    assert results[2].local_sha is None
+    assert isinstance(results[3].error, PyGitOpsError)
+
+
+def test_scan_freshness__repo_locker__clone_read_under_shared_lock(
+    tmp_path, initialize_remote
+):
+    remote = initialize_remote(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+    local_repo = get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+    locker = RepoLocker(
+        SQLiteLockBackend(tmp_path / "locks.db"), key=LockKey.PATH, timeout=0.1
+    )
+    items = [(str(tmp_path / "remote"), tmp_path / "local")]
+
+    # other readers do not keep the clone from being scanned
+    with locker.lock(local_repo, mode=LockMode.SHARED):
+        (result,) = scan_freshness(items, repo_locker=locker)
+    assert result.local_sha == remote.head.commit.hexsha
+
+    # a clone being changed is reported with an error, rather than read halfway through the change
+    with locker.lock(local_repo, mode=LockMode.EXCLUSIVE):
+        (result,) = scan_freshness(items, repo_locker=locker)
+    assert isinstance(result.error, PyGitOpsError)
+    assert not result.stale
+
+
+def test_remote_watcher_poll__remote_moves__change_reported(
+    tmp_path, clock, initialize_remote
+):
+    remote_url = str(tmp_path / "remote")
+    remote_repo = initialize_remote(remote_url, initial_branch=SOME_DEFAULT_BRANCH)
+    previous_sha = remote_repo.head.commit.hexsha
+    watcher = RemoteWatcher([remote_url], min_interval_seconds=10)
+
+    # the first poll records the tip
+    assert watcher.poll() == []
+
+    new_sha = remote_repo.index.commit(SOME_COMMIT_MESSAGE).hexsha
+    # the remote is not polled again before its interval elapsed
+    assert watcher.poll() == []
+    clock[0] += 10
+    changes = watcher.poll()
+
+    assert [(c.default_branch, c.previous_sha, c.sha) for c in changes] == [
+        (SOME_DEFAULT_BRANCH, previous_sha, new_sha)
+    ]
+
+
+def test_remote_watcher_poll__known_tip_differs__change_reported_on_first_poll(
+    tmp_path, clock, initialize_remote
+):
+    remote_url = str(tmp_path / "remote")
+    remote_repo = initialize_remote(remote_url, initial_branch=SOME_DEFAULT_BRANCH)
+    watcher = RemoteWatcher([remote_url], known_tips={remote_url: "0" * 40})
+
+    changes = watcher.poll()
+
+    assert [change.sha for change in changes] == [remote_repo.head.commit.hexsha]
+
+
+def test_remote_watcher_poll__unchanged_then_changed__interval_adapted(
+    tmp_path, clock, initialize_remote
+):
+    remote_url = str(tmp_path / "remote")
+    remote_repo = initialize_remote(remote_url, initial_branch=SOME_DEFAULT_BRANCH)
+    watcher = RemoteWatcher(
+        [remote_url], min_interval_seconds=10, max_interval_seconds=30
+    )
+
+    intervals = []
+    for _ in range(4):
+        watcher.poll()
+        intervals.append(watcher.interval(remote_url))
+        clock[0] += watcher.interval(remote_url)
+    remote_repo.index.commit(SOME_COMMIT_MESSAGE)
+    watcher.poll()
+
+    assert intervals == [10, 20, 30, 30]
+    assert watcher.interval(remote_url) == 10
+
+
+def test_remote_watcher_poll__remote_dne__backed_off(tmp_path, clock):
+    remote_url = str(tmp_path / "remote-dne")
+    watcher = RemoteWatcher([remote_url], min_interval_seconds=10)
+
+    assert watcher.poll() == []
+    assert watcher.interval(remote_url) == 20
+
+
+def test_remote_watcher_watch__stop_set__watch_ends(tmp_path, initialize_remote):
+    remote_url = str(tmp_path / "remote")
+    initialize_remote(remote_url, initial_branch=SOME_DEFAULT_BRANCH)
+    stop = threading.Event()
+    stop.set()
+
+    assert list(RemoteWatcher([remote_url]).watch(stop)) == []
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"min_interval_seconds": 0},
+        {"min_interval_seconds": 10, "max_interval_seconds": 5},
+        {"backoff_factor": 0.5},
+    ],
+)
+def test_remote_watcher__invalid_schedule__raises_pygitops_value_error(kwargs):
+    with pytest.raises(PyGitOpsValueError):
+        RemoteWatcher([], **kwargs)
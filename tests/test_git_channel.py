@@ -0,0 +1,112 @@
+import gc
+import shutil
+
+import pytest
+from git import Repo
+
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.git_channel import GitChannel, _channels
+
+SOME_BRANCH = "some-branch"
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = Repo.init(tmp_path / "some-repo", initial_branch="main")
+    repo.index.commit("some-commit")
+    return repo
+
+
+def test_git_channel_resolve__revisions__shas_returned(repo):
+    head = repo.head.commit
+
+    with GitChannel(repo) as channel:
+        assert channel.resolve("refs/heads/main") == head.hexsha
+        assert channel.resolve("HEAD^{tree}") == head.tree.hexsha
+        assert channel.resolve("refs/heads/some-missing-branch") is None
+
+
+def test_git_channel_resolve__ref_created_after_start__ref_resolved(repo):
+    with GitChannel(repo) as channel:
+        assert channel.resolve(f"refs/heads/{SOME_BRANCH}") is None
+
+        commit = repo.index.commit("another-commit")
+        repo.git.update_ref(f"refs/heads/{SOME_BRANCH}", commit.hexsha)
+
+        assert channel.resolve(f"refs/heads/{SOME_BRANCH}") == commit.hexsha
+
+
+def test_git_channel_resolve_many__more_revisions_than_pipeline_depth__resolved_in_order(
+    repo,
+):
+    revs = ["HEAD", "refs/heads/some-missing-branch"] * 300
+
+    with GitChannel(repo) as channel:
+        shas = channel.resolve_many(revs)
+
+    assert shas == [repo.head.commit.hexsha, None] * 300
+
+
+def test_git_channel_resolve__closed__process_restarted(repo):
+    channel = GitChannel(repo)
+    channel.resolve("HEAD")
+
+    channel.close()
+
+    assert channel.resolve("HEAD") == repo.head.commit.hexsha
+    channel.close()
+
+
+def test_git_channel_resolve__line_break__raises_pygitops_value_error(repo):
+    with GitChannel(repo) as channel, pytest.raises(PyGitOpsValueError):
+        channel.resolve("HEAD\nrefs/heads/main")
+
+
+def test_git_channel_for_repo__same_repo__channel_shared(repo):
+    assert GitChannel.for_repo(repo) is GitChannel.for_repo(repo)
+
+
+def test_git_channel_for_repo__repo_objects_of_same_git_dir__channel_shared(repo):
+    assert GitChannel.for_repo(repo) is GitChannel.for_repo(Repo(repo.working_dir))
+
+
+def test_git_channel_for_repo__repos_garbage_collected__channel_stopped_and_forgotten(
+    tmp_path,
+):
+    repo = Repo.init(tmp_path / "some-repo")
+    channel = GitChannel.for_repo(repo)
+    channel.resolve("HEAD")
+    git_dir = channel.git_dir
+
+    del repo
+    gc.collect()
+
+    assert git_dir not in _channels
+    assert not channel.running
+    assert channel.repo is None
+
+
+def test_git_channel_resolve__repo_cloned_again_at_same_path__process_restarted(
+    tmp_path, repo
+):
+    clone_path = tmp_path / "some-clone"
+    clone = Repo.clone_from(repo.working_dir, clone_path)
+    channel = GitChannel.for_repo(clone)
+    assert channel.resolve("refs/heads/main") == repo.head.commit.hexsha
+
+    shutil.rmtree(clone_path)
+    commit = repo.index.commit("another-commit")
+    Repo.clone_from(repo.working_dir, clone_path)
+
+    assert channel.resolve("refs/heads/main") == commit.hexsha
+
+
+def test_git_channel_release__git_dir_path__channel_stopped_and_forgotten(repo):
+    channel = GitChannel.for_repo(repo)
+    channel.resolve("HEAD")
+
+    GitChannel.release(repo.git_dir)
+
+    assert not channel.running
+    assert GitChannel.shared(repo) is None
+    assert GitChannel.for_repo(repo) is not channel
@@ -0,0 +1,199 @@
+import os
+import threading
+
+import pytest
+
+from pygitops._util import lock_repo
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.locking import RepoLocker, SQLiteLockBackend
+from pygitops.maintenance import (
+    _TASK_MARKER_PREFIX,
+    MaintenanceScheduler,
+    disable_auto_gc,
+)
+from pygitops.operations import get_updated_repo
+from pygitops.types import MaintenanceTask
+
+SOME_INTERVAL_SECONDS = 3600
+
+
+@pytest.fixture
+def local_repo(tmp_path, initialize_remote):
+    initialize_remote(tmp_path / "remote")
+    return get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+
+
+def _auto_gc_config(repo):
+    reader = repo.config_reader(config_level="repository")
+    return (
+        reader.get_value("gc", "auto", ""),
+        reader.get_value("maintenance", "auto", ""),
+    )
+
+
+def _set_last_run(repo, task, seconds):
+    marker = os.path.join(repo.git_dir, f"{_TASK_MARKER_PREFIX}{task.value}")
+    os.utime(marker, (seconds, seconds))
+
+
+def test_disable_auto_gc__clone__auto_gc_turned_off(local_repo):
+    disable_auto_gc(local_repo)
+
+    assert _auto_gc_config(local_repo) == (0, False)
+
+
+@pytest.mark.parametrize("existing_clone", [False, True])
+def test_get_updated_repo__auto_gc_off__auto_gc_turned_off(
+    tmp_path, existing_clone, initialize_remote
+):
+    initialize_remote(tmp_path / "remote")
+    if existing_clone:
+        get_updated_repo(str(tmp_path / "remote"), tmp_path / "local")
+
+    repo = get_updated_repo(str(tmp_path / "remote"), tmp_path / "local", auto_gc=False)
+
+    assert _auto_gc_config(repo) == (0, False)
+
+
+def test_get_updated_repo__auto_gc_default__config_untouched(local_repo):
+    assert _auto_gc_config(local_repo) == ("", "")
+
+
+def test_maintenance_scheduler_run__never_maintained__every_task_run(local_repo):
+    results = MaintenanceScheduler().run(local_repo)
+
+    assert [result.task for result in results] == list(MaintenanceTask)
+    assert all(result.ok and result.seconds >= 0 for result in results)
+    objects_dir = os.path.join(local_repo.git_dir, "objects")
+    assert os.path.exists(os.path.join(objects_dir, "info", "commit-graph"))
+    assert os.path.exists(os.path.join(objects_dir, "pack", "multi-pack-index"))
+    assert _auto_gc_config(local_repo) == (0, False)
+
+
+def test_maintenance_scheduler_run__tasks_recently_run__nothing_due(local_repo):
+    scheduler = MaintenanceScheduler()
+    scheduler.run(local_repo)
+
+    assert scheduler.due(local_repo) == []
+    assert scheduler.run(local_repo) == []
+
+
+def test_maintenance_scheduler_due__interval_passed__task_due(local_repo):
+    scheduler = MaintenanceScheduler(
+        {
+            MaintenanceTask.COMMIT_GRAPH: SOME_INTERVAL_SECONDS,
+            MaintenanceTask.LOOSE_OBJECTS: SOME_INTERVAL_SECONDS,
+        }
+    )
+    scheduler.run(local_repo)
+
+    _set_last_run(local_repo, MaintenanceTask.COMMIT_GRAPH, 1000)
+
+    assert scheduler.due(local_repo) == [MaintenanceTask.COMMIT_GRAPH]
+
+
+def test_maintenance_scheduler_run__tasks_given__run_in_task_order(local_repo):
+    scheduler = MaintenanceScheduler({"gc": SOME_INTERVAL_SECONDS})
+
+    results = scheduler.run(local_repo, ["commit-graph", MaintenanceTask.PREFETCH])
+
+    assert [result.task for result in results] == [
+        MaintenanceTask.PREFETCH,
+        MaintenanceTask.COMMIT_GRAPH,
+    ]
+    assert scheduler.due(local_repo) == [MaintenanceTask.GC]
+
+
+def test_maintenance_scheduler_run__task_fails__other_tasks_run(local_repo):
+    local_repo.remotes.origin.set_url("some-missing-remote")
+    scheduler = MaintenanceScheduler(
+        {
+            MaintenanceTask.PREFETCH: SOME_INTERVAL_SECONDS,
+            MaintenanceTask.COMMIT_GRAPH: SOME_INTERVAL_SECONDS,
+        }
+    )
+
+    results = scheduler.run(local_repo)
+
+    assert [result.ok for result in results] == [False, True]
+    assert "prefetch" in str(results[0].error)
+    assert scheduler.due(local_repo) == [MaintenanceTask.PREFETCH]
+
+
+def test_maintenance_scheduler_run__clone_in_use__nothing_run(local_repo):
+    scheduler = MaintenanceScheduler()
+
+    with lock_repo(local_repo):
+        assert scheduler.run(local_repo) == []
+    assert scheduler.due(local_repo) == list(MaintenanceTask)
+
+
+def test_maintenance_scheduler_run__repo_locker_lock_held__nothing_run(
+    tmp_path, local_repo
+):
+    locker = RepoLocker(SQLiteLockBackend(tmp_path / "locks.db"))
+    scheduler = MaintenanceScheduler(repo_locker=locker)
+
+    with locker.lock(local_repo):
+        assert scheduler.run(local_repo) == []
+    assert scheduler.run(local_repo)
+
+
+def test_maintenance_scheduler_run__relative_clone_dir_updated__nothing_run(
+    tmp_path, monkeypatch, mocker, local_repo
+):
+    monkeypatch.chdir(tmp_path)
+    scheduler = MaintenanceScheduler()
+    results = []
+
+    def run_while_updating(clone_dir):
+        # called while `get_updated_repo` holds the lock on the clone
+        results.append(scheduler.run(local_repo))
+        return True
+
+    mocker.patch("pygitops.operations._is_git_repo", side_effect=run_while_updating)
+    get_updated_repo(str(tmp_path / "remote"), "local")
+
+    assert results == [[]]
+
+
+def test_maintenance_scheduler_poll__clones_and_other_directories__clones_maintained(
+    tmp_path, local_repo
+):
+    (tmp_path / "not-a-clone").mkdir()
+    scheduler = MaintenanceScheduler({"commit-graph": SOME_INTERVAL_SECONDS})
+
+    results = scheduler.poll(
+        [tmp_path / "local", tmp_path / "not-a-clone", tmp_path / "missing"]
+    )
+
+    assert [(result.clone_dir, result.task) for result in results] == [
+        (tmp_path / "local", MaintenanceTask.COMMIT_GRAPH)
+    ]
+
+
+def test_maintenance_scheduler_watch__stopped__watch_ends(tmp_path, local_repo):
+    scheduler = MaintenanceScheduler({"commit-graph": SOME_INTERVAL_SECONDS})
+    stop = threading.Event()
+
+    results = []
+    for result in scheduler.watch([tmp_path / "local"], stop):
+        results.append(result)
+        stop.set()
+
+    assert [result.task for result in results] == [MaintenanceTask.COMMIT_GRAPH]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"intervals": {"some-task": SOME_INTERVAL_SECONDS}},
+        {"intervals": {"gc": 0}},
+        {"retry_seconds": 0},
+    ],
+)
+def test_maintenance_scheduler__invalid_arguments__raises_pygitops_value_error(
+    kwargs,
+):
+    with pytest.raises(PyGitOpsValueError):
+        MaintenanceScheduler(**kwargs)
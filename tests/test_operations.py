@@ -1,20 +1,33 @@
 import re
+import shutil
 from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path, PosixPath
 
 import pytest
-from git import Actor, GitCommandError, GitError, Repo
+from git import Actor, GitCommandError, GitError, Remote, Repo
 
 from pygitops._constants import GIT_BRANCH_MAIN, GIT_BRANCH_MASTER
-from pygitops._util import checkout_pull_branch, repo_working_dir
-from pygitops.exceptions import PyGitOpsError, PyGitOpsStagedItemsError
+from pygitops._util import checkout_pull_branch, commit_tree, repo_working_dir
+from pygitops.default_branch_cache import DefaultBranchCache
+from pygitops.exceptions import (
+    PyGitOpsError,
+    PyGitOpsRefUpdateError,
+    PyGitOpsStagedItemsError,
+    PyGitOpsValueError,
+)
+from pygitops.git_channel import GitChannel
 from pygitops.operations import (
+    commit_files,
+    commit_push_branches,
     feature_branch,
     get_default_branch,
     get_updated_repo,
+    get_updated_repos,
     stage_commit_push_changes,
 )
+from pygitops.session import RemoteSession
+from pygitops.types import BranchCommit, CloneFilter, FetchOptions, PushRetry
 
 SOME_ACTOR = Actor("some-user", "some-user@company.com")
 SOME_COMMIT_MESSAGE = "some-commit-message"
@@ -174,6 +187,31 @@ def test_feature_branch_context_manager__add_new_file_in_different_branches__cle
         assert some_other_diff == some_other_result
 
 
+def test_feature_branch__targeted_cleanup__changes_discarded_ignored_files_kept(
+    tmp_path,
+):
+    local_repo = _initialize_multiple_empty_repos(tmp_path).local_repo
+    workdir_path = Path(repo_working_dir(local_repo))
+    (workdir_path / ".git" / "info" / "exclude").write_text("*.cache\n")
+
+    with feature_branch(local_repo, SOME_FEATURE_BRANCH, targeted_cleanup=True):
+        (workdir_path / "some-build.cache").touch()
+        (workdir_path / "some-dir" / "some-nested-dir").mkdir(parents=True)
+        (workdir_path / "some-dir" / "some-nested-dir" / SOME_OTHER_FILENAME).touch()
+        _modify_existing_file(local_repo, SOME_CONTENT_FILENAME, SOME_CONTENT)
+        local_repo.index.add([SOME_CONTENT_FILENAME])
+        local_repo.index.commit(
+            SOME_COMMIT_MESSAGE, author=SOME_ACTOR, committer=SOME_ACTOR
+        )
+        _delete_existing_file(local_repo, SOME_CONTENT_FILENAME)
+
+    assert local_repo.active_branch.name == GIT_BRANCH_MAIN
+    assert not local_repo.is_dirty(untracked_files=True)
+    assert (workdir_path / SOME_CONTENT_FILENAME).read_text() == SOME_CHANGES
+    assert not (workdir_path / "some-dir").exists()
+    assert (workdir_path / "some-build.cache").exists()
+
+
 def test_stage_commit_push_changes__add_new_file__change_persisted(tmp_path):
     """
     Configure 'local' and 'remote' repositories with initial content.
@@ -317,11 +355,325 @@ def test_stage_commit_push_changes__force_push_flag__changes_pushed(tmp_path):
     )
 
 
+def _race_to_push(repos, content=SOME_CONTENT, filename=SOME_OTHER_FILENAME):
+    # another writer pushes to the feature branch after the local clone branched off
+    for repo in (repos.local_repo, repos.cloned_repo):
+        repo.create_head(SOME_FEATURE_BRANCH).checkout()
+    (Path(repo_working_dir(repos.cloned_repo)) / filename).write_text(content)
+    stage_commit_push_changes(
+        repos.cloned_repo, SOME_FEATURE_BRANCH, SOME_ACTOR, SOME_COMMIT_MESSAGE
+    )
+
+
+def test_stage_commit_push_changes__push_retry__rebased_and_pushed(tmp_path):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    _race_to_push(repos)
+    (Path(repo_working_dir(local_repo)) / "some-new-file.txt").write_text(SOME_CONTENT)
+
+    retries = stage_commit_push_changes(
+        local_repo,
+        SOME_FEATURE_BRANCH,
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        push_retry=PushRetry(initial_delay_seconds=0),
+    )
+
+    assert retries == 1
+    remote_tree = repos.remote_repo.heads[SOME_FEATURE_BRANCH].commit.tree
+    assert SOME_OTHER_FILENAME in remote_tree
+    assert "some-new-file.txt" in remote_tree
+    assert local_repo.head.commit == repos.remote_repo.heads[SOME_FEATURE_BRANCH].commit
+
+
+def test_stage_commit_push_changes__rejected_without_push_retry__raises_pygitops_error(
+    tmp_path,
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    _race_to_push(repos)
+    (Path(repo_working_dir(repos.local_repo)) / "some-new-file.txt").write_text(
+        SOME_CONTENT
+    )
+
+    with pytest.raises(PyGitOpsError, match="Unable to push"):
+        stage_commit_push_changes(
+            repos.local_repo, SOME_FEATURE_BRANCH, SOME_ACTOR, SOME_COMMIT_MESSAGE
+        )
+
+
+def test_stage_commit_push_changes__push_retry_conflict__raises_pygitops_error(
+    tmp_path,
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    _race_to_push(repos, content=SOME_CONTENT)
+    (Path(repo_working_dir(local_repo)) / SOME_OTHER_FILENAME).write_text(
+        SOME_NEW_CONTENT
+    )
+
+    with pytest.raises(PyGitOpsError, match="Unable to rebase"):
+        stage_commit_push_changes(
+            local_repo,
+            SOME_FEATURE_BRANCH,
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+            push_retry=PushRetry(initial_delay_seconds=0),
+        )
+
+    # the rebase was aborted, leaving the local commit in place
+    assert not (Path(local_repo.git_dir) / "rebase-merge").exists()
+    assert local_repo.active_branch.name == SOME_FEATURE_BRANCH
+    assert local_repo.head.commit.message == SOME_COMMIT_MESSAGE
+
+
+def test_stage_commit_push_changes__push_retry_attempts_exhausted__raises_pygitops_error(
+    mocker, tmp_path
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    _race_to_push(repos)
+    (Path(repo_working_dir(local_repo)) / "some-new-file.txt").write_text(SOME_CONTENT)
+    # the branch keeps moving before each retry
+    mocker.patch("pygitops.operations._rebase_onto_remote_branch")
+    sleep_mock = mocker.patch("pygitops.deadlines.time.sleep")
+    push_spy = mocker.spy(type(local_repo.remotes.origin), "push")
+
+    with pytest.raises(PyGitOpsError, match="after 2 retries"):
+        stage_commit_push_changes(
+            local_repo,
+            SOME_FEATURE_BRANCH,
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+            push_retry=PushRetry(max_attempts=3),
+        )
+
+    assert push_spy.call_count == 3
+    assert sleep_mock.call_count == 2
+
+
+def test_stage_commit_push_changes__push_retry_branch_not_checked_out__raises_pygitops_value_error(
+    tmp_path,
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+
+    with pytest.raises(PyGitOpsValueError):
+        stage_commit_push_changes(
+            repos.local_repo,
+            SOME_FEATURE_BRANCH,
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+            push_retry=PushRetry(),
+        )
+
+
+@pytest.mark.parametrize(
+    ("retry", "ceiling"), [(1, 0.5), (2, 1.0), (3, 2.0), (10, 8.0)]
+)
+def test_push_retry_delay__retries__capped_exponential_backoff(mocker, retry, ceiling):
+    uniform_mock = mocker.patch("pygitops.types.random.uniform", return_value=0.1)
+
+    assert PushRetry().delay(retry) == 0.1
+    uniform_mock.assert_called_once_with(0, ceiling)
+
+
+def test_commit_push_branches__changes_split_between_branches__pushed_in_one_push(
+    mocker, tmp_path
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    remote_repo = repos.remote_repo
+    local_repo = repos.local_repo
+    workdir_path = Path(repo_working_dir(local_repo))
+    (workdir_path / "some-dir").mkdir()
+    (workdir_path / "some-dir" / SOME_OTHER_FILENAME).write_text(SOME_CONTENT)
+    (workdir_path / SOME_CONTENT_FILENAME).write_text(SOME_NEW_CONTENT)
+    push_spy = mocker.spy(type(local_repo.remotes.origin), "push")
+
+    results = commit_push_branches(
+        local_repo,
+        [
+            BranchCommit(SOME_BRANCH_NAME, SOME_COMMIT_MESSAGE, [Path("some-dir")]),
+            BranchCommit(
+                SOME_OTHER_BRANCH_NAME,
+                SOME_COMMIT_MESSAGE,
+                [Path(SOME_CONTENT_FILENAME)],
+            ),
+        ],
+        SOME_ACTOR,
+        atomic=True,
+    )
+
+    assert push_spy.call_count == 1
+    assert set(results) == {SOME_BRANCH_NAME, SOME_OTHER_BRANCH_NAME}
+    assert not any(info.flags & info.ERROR for info in results.values())
+
+    base_commit = remote_repo.heads.main.commit
+    commit = remote_repo.heads[SOME_BRANCH_NAME].commit
+    assert commit.parents == (base_commit,)
+    assert commit.author.name == SOME_ACTOR.name
+    assert list(commit.stats.files) == [f"some-dir/{SOME_OTHER_FILENAME}"]
+    other_commit = remote_repo.heads[SOME_OTHER_BRANCH_NAME].commit
+    assert other_commit.parents == (base_commit,)
+    assert list(other_commit.stats.files) == [SOME_CONTENT_FILENAME]
+
+    # the checkout is left alone
+    assert local_repo.active_branch.name == "main"
+    assert local_repo.head.commit == base_commit
+    assert local_repo.is_dirty(untracked_files=True)
+    assert not local_repo.index.diff("HEAD")
+
+
+@pytest.mark.parametrize(
+    "branch_names",
+    ([], [SOME_BRANCH_NAME, SOME_BRANCH_NAME], ["main"]),
+)
+def test_commit_push_branches__invalid_branches__raises_pygitops_value_error(
+    tmp_path, branch_names
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+
+    with pytest.raises(PyGitOpsValueError):
+        commit_push_branches(
+            repos.local_repo,
+            [BranchCommit(name, SOME_COMMIT_MESSAGE, []) for name in branch_names],
+            SOME_ACTOR,
+        )
+
+
+def test_commit_files__new_branch__files_committed_without_touching_working_tree(
+    tmp_path,
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    workdir_path = Path(repo_working_dir(local_repo))
+    (workdir_path / SOME_OTHER_FILENAME).write_text(SOME_CONTENT)
+    (workdir_path / SOME_OTHER_FILENAME).chmod(0o755)
+    local_repo.git.add(SOME_OTHER_FILENAME)
+    local_repo.index.commit(SOME_COMMIT_MESSAGE)
+    base_commit = local_repo.head.commit
+
+    commit = commit_files(
+        local_repo,
+        SOME_BRANCH_NAME,
+        {
+            SOME_OTHER_FILENAME: SOME_NEW_CONTENT.encode(),
+            Path("some-dir") / "some-file.txt": SOME_CONTENT.encode(),
+            SOME_CONTENT_FILENAME: None,
+        },
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+        base="HEAD",
+    )
+
+    assert local_repo.heads[SOME_BRANCH_NAME].commit == commit
+    assert commit.parents == (base_commit,)
+    assert commit.author.name == SOME_ACTOR.name
+    assert sorted(commit.stats.files) == sorted(
+        [SOME_CONTENT_FILENAME, SOME_OTHER_FILENAME, "some-dir/some-file.txt"]
+    )
+    assert (commit.tree / SOME_OTHER_FILENAME).data_stream.read() == b"newbar"
+    # the executable bit of the replaced file is kept
+    assert (commit.tree / SOME_OTHER_FILENAME).mode == 0o100755
+    assert SOME_CONTENT_FILENAME not in commit.tree
+
+    # the checkout is left alone
+    assert local_repo.head.commit == base_commit
+    assert not local_repo.is_dirty(untracked_files=True)
+
+    # without a base, the next commit is made on top of the branch
+    next_commit = commit_files(
+        local_repo,
+        SOME_BRANCH_NAME,
+        {SOME_OTHER_FILENAME: None},
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+    )
+    assert next_commit.parents == (commit,)
+
+
+def test_commit_files__branch_changed_concurrently__raises_pygitops_ref_update_error(
+    mocker, tmp_path
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    local_repo.create_head(SOME_BRANCH_NAME)
+
+    def _commit_tree_racing_another_writer(repo, tree_sha, parent_sha, *args):
+        # another writer moves the branch while the commit is being made
+        other_commit = commit_tree(
+            repo, tree_sha, parent_sha, "other-writer", SOME_ACTOR
+        )
+        repo.git.update_ref(f"refs/heads/{SOME_BRANCH_NAME}", other_commit.hexsha)
+        return commit_tree(repo, tree_sha, parent_sha, *args)
+
+    mocker.patch(
+        "pygitops.operations._commit_tree",
+        side_effect=_commit_tree_racing_another_writer,
+    )
+
+    with pytest.raises(PyGitOpsRefUpdateError, match=SOME_BRANCH_NAME):
+        commit_files(
+            local_repo,
+            SOME_BRANCH_NAME,
+            {SOME_CONTENT_FILENAME: SOME_CONTENT.encode()},
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+        )
+
+    assert local_repo.heads[SOME_BRANCH_NAME].commit.message == "other-writer"
+
+
+def test_commit_files__cloned_again_at_same_path__committed_on_top_of_branch(
+    tmp_path,
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    clone_path = tmp_path / "some-clone"
+    first_clone = Repo.clone_from(repo_working_dir(repos.remote_repo), clone_path)
+    first_clone.create_head(SOME_BRANCH_NAME)
+    commit_files(
+        first_clone,
+        SOME_BRANCH_NAME,
+        {SOME_CONTENT_FILENAME: SOME_CONTENT.encode()},
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+    )
+
+    shutil.rmtree(clone_path)
+    clone = Repo.clone_from(repo_working_dir(repos.remote_repo), clone_path)
+    base_commit = clone.create_head(SOME_BRANCH_NAME).commit
+
+    commit = commit_files(
+        clone,
+        SOME_BRANCH_NAME,
+        {SOME_CONTENT_FILENAME: SOME_NEW_CONTENT.encode()},
+        SOME_ACTOR,
+        SOME_COMMIT_MESSAGE,
+    )
+
+    assert commit.parents == (base_commit,)
+    assert clone.heads[SOME_BRANCH_NAME].commit == commit
+
+
+@pytest.mark.parametrize("branch_name", ["main", SOME_BRANCH_NAME])
+def test_commit_files__checked_out_or_missing_branch__raises_pygitops_value_error(
+    tmp_path, branch_name
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+
+    with pytest.raises(PyGitOpsValueError):
+        commit_files(
+            repos.local_repo,
+            branch_name,
+            {SOME_CONTENT_FILENAME: SOME_CONTENT.encode()},
+            SOME_ACTOR,
+            SOME_COMMIT_MESSAGE,
+        )
+
+
 def test_feature_branch__untracked_files_present__raises_pygitops_error(mocker):
     untracked_file = "foo.py"
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo = mocker.Mock(
         untracked_files=[untracked_file],
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
 
     with (
@@ -334,11 +686,11 @@ def test_feature_branch__untracked_files_present__raises_pygitops_error(mocker):
 def test_feature_branch__active_branch_not_master__raises_pygitops_error(mocker):
     active_branch_name = "some_active_feature_branch"
     active_branch = mocker.Mock()
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo = mocker.Mock(
         untracked_files=[],
         active_branch=mocker.Mock(),
         heads={active_branch_name: active_branch, GIT_BRANCH_MASTER: None},
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
 
     with pytest.raises(PyGitOpsError), feature_branch(repo, SOME_FEATURE_BRANCH):
@@ -352,13 +704,13 @@ def test_feature_branch__master_not_present_in_origin_refs__local_master_not_upd
     remotes_mock = mocker.Mock(origin=origin_mock)
     local_master_branch = mocker.Mock()
 
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo = mocker.Mock(
         untracked_files=[],
         active_branch=local_master_branch,
         remotes=remotes_mock,
         working_dir=SOME_REPO_NAME,
         heads={GIT_BRANCH_MASTER: local_master_branch},
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
 
     _checkout_pull_branch_mock = mocker.patch(
@@ -376,13 +728,13 @@ def test_feature_branch__master_present_in_origin_refs__local_master_updated(moc
     remotes_mock = mocker.Mock(origin=origin_mock)
     local_master_branch = mocker.Mock()
 
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo = mocker.Mock(
         untracked_files=[],
         active_branch=local_master_branch,
         remotes=remotes_mock,
         working_dir=SOME_REPO_NAME,
         heads={GIT_BRANCH_MASTER: local_master_branch},
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
     _checkout_pull_branch_mock = mocker.patch(
         "pygitops.operations._checkout_pull_branch"
@@ -391,7 +743,9 @@ def test_feature_branch__master_present_in_origin_refs__local_master_updated(moc
     with feature_branch(repo, SOME_FEATURE_BRANCH):
         pass
 
-    _checkout_pull_branch_mock.assert_called_once_with(repo, GIT_BRANCH_MASTER)
+    _checkout_pull_branch_mock.assert_called_once_with(
+        repo, GIT_BRANCH_MASTER, session=None
+    )
 
 
 @pytest.mark.parametrize(
@@ -407,6 +761,7 @@ def test_feature_branch__conditional_branch_checkout(
     feature_branch_mock = mocker.Mock()
 
     mocker.patch("pygitops.operations._checkout_pull_branch")
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo = mocker.Mock(
         untracked_files=[],
         active_branch=local_master_branch,
@@ -414,7 +769,6 @@ def test_feature_branch__conditional_branch_checkout(
         working_dir=SOME_REPO_NAME,
         heads={GIT_BRANCH_MASTER: local_master_branch},
         create_head=mocker.Mock(return_value=feature_branch_mock),
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
 
     with feature_branch(repo, feature_branch_name):
@@ -431,6 +785,7 @@ def test_feature_branch__exception_within_context__cleanup_occurs(mocker):
 
     mocker.patch("pygitops.operations._checkout_pull_branch")
 
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo_mock = mocker.Mock(
         untracked_files=[],
         active_branch=local_master_branch,
@@ -438,7 +793,6 @@ def test_feature_branch__exception_within_context__cleanup_occurs(mocker):
         working_dir=SOME_REPO_NAME,
         heads={GIT_BRANCH_MASTER: local_master_branch},
         create_head=mocker.Mock(),
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
 
     with pytest.raises(RuntimeError), feature_branch(repo_mock, some_branch_name):
@@ -447,7 +801,7 @@ def test_feature_branch__exception_within_context__cleanup_occurs(mocker):
     local_master_branch.checkout.assert_called_once()
 
 
-def test_feature_branch__nested_calls__raises_pygitops_error(mocker):
+def test_feature_branch__nested_calls__raises_pygitops_error(mocker, tmp_path):
     """Make sure the feature_branch context manager locks the repo correctly."""
 
     some_branch_name = "some-feature-branch"
@@ -458,13 +812,14 @@ def test_feature_branch__nested_calls__raises_pygitops_error(mocker):
     remotes_mock = mocker.Mock(origin=origin_mock)
     local_master_branch = mocker.Mock()
 
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo_mock = mocker.Mock(
         untracked_files=[],
         active_branch=local_master_branch,
         remotes=remotes_mock,
         working_dir=SOME_REPO_NAME,
         heads={GIT_BRANCH_MASTER: local_master_branch},
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
+        common_dir=str(tmp_path),
     )
 
     with (
@@ -518,9 +873,10 @@ def test_get_updated_repo__repo_exists_locally__repo_update_performed_against_de
 ):
     Repo.init(tmp_path)
     master_branch_mock = mocker.Mock()
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo_mock = mocker.Mock(
         heads={"master": master_branch_mock},
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
+        common_dir=str(tmp_path),
     )
     mocker.patch("pygitops.operations.Repo", return_value=repo_mock)
 
@@ -551,7 +907,7 @@ def test_get_updated_repo__repo_exists_locally__repo_update_performed_against_pr
 
     get_default_branch_mock.assert_not_called()
     _checkout_pull_branch_mock.assert_called_once_with(
-        repo_mock, SOME_FEATURE_BRANCH, force=force
+        repo_mock, SOME_FEATURE_BRANCH, force=force, session=None, remote_sha=None
     )
 
 
@@ -643,6 +999,183 @@ def test_get_updated_repo__file_operations__repo_present_locally(tmp_path):
         get_updated_repo(str(remote_path), local_path)
 
 
+@pytest.mark.parametrize(
+    ("clone_kwargs", "expected_kwargs"),
+    (
+        ({"depth": 1}, {"depth": 1}),
+        (
+            {"depth": 1, "no_single_branch": True},
+            {"depth": 1, "no_single_branch": True},
+        ),
+        ({"clone_filter": CloneFilter.BLOBLESS}, {"filter": "blob:none"}),
+        ({"clone_filter": "tree:0"}, {"filter": "tree:0"}),
+    ),
+)
+def test_get_updated_repo__repo_dne__clone_mode_passed_to_clone_from(
+    mocker, tmp_path, clone_kwargs, expected_kwargs
+):
+    clone_from_mock = mocker.patch("pygitops.operations.Repo.clone_from")
+
+    get_updated_repo(SOME_CLONE_REPO_URL, tmp_path, **clone_kwargs)
+
+    clone_from_mock.assert_called_once_with(
+        SOME_CLONE_REPO_URL, tmp_path, **expected_kwargs
+    )
+
+
+@pytest.mark.parametrize(
+    "clone_kwargs", ({"depth": 0}, {"clone_filter": "blob:limit=1k"})
+)
+def test_get_updated_repo__invalid_clone_mode__raises_pygitops_value_error(
+    tmp_path, clone_kwargs
+):
+    with pytest.raises(PyGitOpsValueError):
+        get_updated_repo(SOME_CLONE_REPO_URL, tmp_path, **clone_kwargs)
+
+
+@pytest.mark.parametrize(
+    "clone_kwargs",
+    (
+        {"depth": 1, "no_single_branch": True},
+        {"clone_filter": CloneFilter.BLOBLESS},
+        {"clone_filter": CloneFilter.TREELESS},
+    ),
+)
+def test_get_updated_repo__clone_mode__updates_and_feature_branch_succeed(
+    tmp_path, clone_kwargs
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    remote_repo = _initialize_repo_with_content(remote_path)
+    remote_repo.config_writer().set_value("uploadpack", "allowFilter", "true").release()
+    for _ in range(3):
+        _commit_content(remote_repo, SOME_INITIAL_CONTENT)
+    remote_repo.create_head(SOME_OTHER_BRANCH_NAME)
+    remote_url = f"file://{remote_path}"
+
+    local_repo = get_updated_repo(remote_url, local_path, **clone_kwargs)
+    assert len(list(local_repo.iter_commits())) == (1 if "depth" in clone_kwargs else 4)
+
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+    local_repo = get_updated_repo(remote_url, local_path)
+    assert local_repo.head.commit == remote_repo.head.commit
+
+    # other branches remain reachable after a shallow clone of every branch
+    local_repo = get_updated_repo(remote_url, local_path, branch=SOME_OTHER_BRANCH_NAME)
+    assert local_repo.active_branch.name == SOME_OTHER_BRANCH_NAME
+    local_repo.heads[GIT_BRANCH_MASTER].checkout()
+
+    with feature_branch(local_repo, SOME_FEATURE_BRANCH):
+        _modify_existing_file(local_repo, SOME_CONTENT_FILENAME, SOME_CONTENT)
+        stage_commit_push_changes(
+            local_repo, SOME_FEATURE_BRANCH, SOME_ACTOR, SOME_COMMIT_MESSAGE
+        )
+
+    assert (
+        remote_repo.heads[SOME_FEATURE_BRANCH].commit.parents[0]
+        == remote_repo.head.commit
+    )
+
+
+def test_get_updated_repo__shallow_clone__only_default_branch_cloned(tmp_path):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    remote_repo = _initialize_repo_with_content(remote_path)
+    remote_repo.create_head(SOME_OTHER_BRANCH_NAME)
+    remote_url = f"file://{remote_path}"
+
+    local_repo = get_updated_repo(remote_url, local_path, depth=1)
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+    local_repo = get_updated_repo(remote_url, local_path)
+
+    assert local_repo.head.commit == remote_repo.head.commit
+    assert [ref.remote_head for ref in local_repo.remotes.origin.refs] == [
+        "HEAD",
+        GIT_BRANCH_MASTER,
+    ]
+
+
+def test_get_updated_repo__shallow_clone__history_truncated__history_deepened(
+    tmp_path,
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    remote_repo = _initialize_repo_with_content(remote_path)
+    remote_url = f"file://{remote_path}"
+    local_repo = get_updated_repo(remote_url, local_path, depth=1)
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+    # move the shallow boundary past the local tip, as a `fetch --depth` would
+    local_repo.git.fetch("--depth=1", "origin")
+
+    local_repo = get_updated_repo(remote_url, local_path)
+
+    assert local_repo.head.commit == remote_repo.head.commit
+
+
+def _initialize_remote_with_directories(remote_path):
+    remote_repo = Repo.init(remote_path, initial_branch=GIT_BRANCH_MAIN)
+    for path in ("deploy/app.yaml", "src/app.py", "README.md"):
+        (remote_path / path).parent.mkdir(exist_ok=True)
+        (remote_path / path).write_text(SOME_INITIAL_CONTENT)
+    remote_repo.git.add(all=True)
+    remote_repo.index.commit(SOME_COMMIT_MESSAGE)
+    return remote_repo
+
+
+def test_get_updated_repo__sparse_paths__only_sparse_set_checked_out(tmp_path):
+    remote_repo = _initialize_remote_with_directories(tmp_path / "remote")
+    clone_dir = tmp_path / "local"
+
+    repo = get_updated_repo(
+        repo_working_dir(remote_repo), clone_dir, sparse_paths=["deploy"]
+    )
+
+    assert (clone_dir / "deploy" / "app.yaml").exists()
+    assert (clone_dir / "README.md").exists()
+    assert not (clone_dir / "src").exists()
+    assert not repo.is_dirty(untracked_files=True)
+
+    # an update keeps the sparse set, unless another one is provided
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+    get_updated_repo(repo_working_dir(remote_repo), clone_dir)
+    assert not (clone_dir / "src").exists()
+    assert SOME_NEW_CONTENT in (clone_dir / SOME_CONTENT_FILENAME).read_text()
+
+    get_updated_repo(repo_working_dir(remote_repo), clone_dir, sparse_paths=["src"])
+    assert (clone_dir / "src" / "app.py").exists()
+    assert not (clone_dir / "deploy").exists()
+
+
+@pytest.mark.parametrize("targeted_cleanup", [False, True])
+def test_feature_branch__sparse_checkout__changes_pushed_and_sparse_set_kept(
+    tmp_path, targeted_cleanup
+):
+    remote_repo = _initialize_remote_with_directories(tmp_path / "remote")
+    clone_dir = tmp_path / "local"
+    repo = get_updated_repo(
+        repo_working_dir(remote_repo), clone_dir, sparse_paths=["deploy"]
+    )
+
+    with feature_branch(repo, SOME_FEATURE_BRANCH, targeted_cleanup=targeted_cleanup):
+        (clone_dir / "deploy" / "app.yaml").write_text(SOME_NEW_CONTENT)
+        (clone_dir / "deploy" / "new.yaml").write_text(SOME_CONTENT)
+        stage_commit_push_changes(
+            repo, SOME_FEATURE_BRANCH, SOME_ACTOR, SOME_COMMIT_MESSAGE
+        )
+
+    pushed = remote_repo.heads[SOME_FEATURE_BRANCH].commit
+    assert sorted(pushed.stats.files) == ["deploy/app.yaml", "deploy/new.yaml"]
+    # files outside of the sparse set are kept in the commit
+    assert (pushed.tree / "src" / "app.py").data_stream.read() == b"foobar"
+
+    assert repo.active_branch.name == GIT_BRANCH_MAIN
+    assert not (clone_dir / "src").exists()
+    assert not (clone_dir / "deploy" / "new.yaml").exists()
+    assert (clone_dir / "deploy" / "app.yaml").read_text() == SOME_INITIAL_CONTENT
+    assert not repo.is_dirty(untracked_files=True)
+
+
 def test_get_updated_repo__error__login_not_in_error(mocker):
     mocker.patch(
         "pygitops.operations.Repo.clone_from",
@@ -691,10 +1224,10 @@ def test_get_updated_repo__repo_exists_locally__stale_remote_url__url_updated(
 
     Repo.init(tmp_path)
     origin_mock = mocker.Mock(url=old_url)
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo_mock = mocker.Mock(
         remotes=mocker.Mock(origin=origin_mock),
         heads={"master": mocker.Mock()},
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
     mocker.patch("pygitops.operations.Repo", return_value=repo_mock)
     mocker.patch("pygitops.operations._checkout_pull_branch")
@@ -711,10 +1244,10 @@ def test_get_updated_repo__repo_exists_locally__matching_remote_url__url_not_upd
     set_url should not be called."""
     Repo.init(tmp_path)
     origin_mock = mocker.Mock(url=SOME_CLONE_REPO_URL)
+    mocker.patch("pygitops.operations._remote_head_ref", return_value=SOME_HEAD_REF)
     repo_mock = mocker.Mock(
         remotes=mocker.Mock(origin=origin_mock),
         heads={"master": mocker.Mock()},
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value=SOME_HEAD_REF)),
     )
     mocker.patch("pygitops.operations.Repo", return_value=repo_mock)
     mocker.patch("pygitops.operations._checkout_pull_branch")
@@ -758,11 +1291,120 @@ def test_get_updated_repo__file_operations__remote_url_changes__update_succeeds(
         assert SOME_NEW_CONTENT in content
 
 
+def test_get_updated_repos__some_repos_fail__every_repo_reported_in_order(tmp_path):
+    remote_repos = [
+        _initialize_repo_with_content(tmp_path / f"remote-{i}") for i in range(3)
+    ]
+    items = [
+        (str(tmp_path / "remote-0"), tmp_path / "local-0", {}),
+        (str(tmp_path / "remote-dne"), tmp_path / "local-dne", {}),
+        (str(tmp_path / "remote-1"), tmp_path / "local-1", {}),
+        (str(tmp_path / "remote-2"), tmp_path / "local-2", {"force": True}),
+    ]
+
+    results = get_updated_repos(items, max_workers=2)
+
+    assert [result.repo_url for result in results] == [item[0] for item in items]
+    assert [result.ok for result in results] == [True, False, True, True]
+    assert isinstance(results[1].error, PyGitOpsError)
+    assert results[1].repo is None
+    for result, remote_repo in zip(
+        (results[0], results[2], results[3]), remote_repos, strict=True
+    ):
+        assert result.repo.head.commit == remote_repo.head.commit
+
+
+def test_get_updated_repos__same_clone_dir_listed_twice__both_succeed(tmp_path):
+    remote_repo = _initialize_repo_with_content(tmp_path / "remote")
+    item = (str(tmp_path / "remote"), tmp_path / "local", {})
+
+    results = get_updated_repos([item, item], max_workers=2)
+
+    assert all(result.ok for result in results)
+    assert Repo(tmp_path / "local").head.commit == remote_repo.head.commit
+
+
+def test_get_updated_repo__skip_if_current__already_current__remote_not_fetched(
+    mocker, tmp_path
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    remote_repo = _initialize_repo_with_content(remote_path)
+    get_updated_repo(str(remote_path), local_path)
+    fetch_spy = mocker.spy(Remote, "fetch")
+    pull_spy = mocker.spy(Remote, "pull")
+
+    results = get_updated_repos(
+        [(str(remote_path), local_path, {"skip_if_current": True, "force": True})]
+    )
+
+    assert results[0].ok
+    assert results[0].already_current
+    assert results[0].repo.head.commit == remote_repo.head.commit
+    fetch_spy.assert_not_called()
+    pull_spy.assert_not_called()
+    # no git process is kept for a clone left as it was
+    assert GitChannel.shared(results[0].repo) is None
+
+
+def test_get_updated_repo__skip_if_current__remote_changed__remote_changes_pulled(
+    tmp_path,
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    remote_repo = _initialize_repo_with_content(remote_path)
+    get_updated_repo(str(remote_path), local_path)
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+
+    results = get_updated_repos(
+        [(str(remote_path), local_path, {"skip_if_current": True})]
+    )
+
+    assert results[0].ok
+    assert not results[0].already_current
+    assert results[0].repo.head.commit == remote_repo.head.commit
+
+
+def test_get_updated_repo__skip_if_current__other_branch_checked_out__branch_checked_out(
+    tmp_path,
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    _initialize_repo_with_content(remote_path)
+    local_repo = get_updated_repo(str(remote_path), local_path)
+    local_repo.create_head(SOME_FEATURE_BRANCH).checkout()
+
+    local_repo = get_updated_repo(
+        str(remote_path),
+        local_path,
+        skip_if_current=True,
+        branch=GIT_BRANCH_MASTER,
+    )
+
+    assert local_repo.active_branch.name == GIT_BRANCH_MASTER
+
+
+def test_get_updated_repo__skip_if_current__force_with_local_changes__changes_discarded(
+    tmp_path,
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    _initialize_repo_with_content(remote_path)
+    local_repo = get_updated_repo(str(remote_path), local_path)
+    (local_path / SOME_OTHER_FILENAME).touch()
+
+    local_repo = get_updated_repo(
+        str(remote_path), local_path, skip_if_current=True, force=True
+    )
+
+    assert not local_repo.is_dirty(untracked_files=True)
+
+
 def test_get_default_branch__match_not_present__raises_pygitops_error(mocker):
-    repo_mock = mocker.Mock(
-        git=mocker.Mock(
-            symbolic_ref=mocker.Mock(return_value="some-unmatched-symbolic-ref")
-        )
+    repo_mock = mocker.Mock()
+    mocker.patch(
+        "pygitops.operations._remote_head_ref",
+        return_value="some-unmatched-symbolic-ref",
     )
 
     with pytest.raises(PyGitOpsError):
@@ -770,8 +1412,9 @@ def test_get_default_branch__match_not_present__raises_pygitops_error(mocker):
 
 
 def test_get_default_branch__match_index_error__raises_pygitops_error(mocker):
-    repo_mock = mocker.Mock(
-        git=mocker.Mock(symbolic_ref=mocker.Mock(return_value="refs/remotes/origin/"))
+    repo_mock = mocker.Mock()
+    mocker.patch(
+        "pygitops.operations._remote_head_ref", return_value="refs/remotes/origin/"
     )
 
     mocker.patch(
@@ -815,6 +1458,136 @@ def test_get_default_branch__remote_head_changes__new_default_branch_returned(tm
     assert get_default_branch(local_repo) == GIT_BRANCH_MAIN
 
 
+def test_get_default_branch__session__default_branch_resolved_once(mocker, tmp_path):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    session = RemoteSession()
+    fetch_spy = mocker.spy(session, "fetch")
+
+    assert get_default_branch(local_repo, session=session) == GIT_BRANCH_MAIN
+    assert get_default_branch(local_repo, session=session) == GIT_BRANCH_MAIN
+
+    fetch_spy.assert_called_once()
+    assert session.round_trips_saved == 2
+
+
+def test_feature_branch__session__origin_fetched_once(tmp_path):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    remote_repo = repos.remote_repo
+    local_repo = repos.local_repo
+    session = RemoteSession()
+
+    with feature_branch(local_repo, SOME_FEATURE_BRANCH, session=session):
+        test_file_path = Path(repo_working_dir(local_repo)) / SOME_CONTENT_FILENAME
+        test_file_path.write_text(SOME_INITIAL_CONTENT)
+        stage_commit_push_changes(
+            local_repo, SOME_FEATURE_BRANCH, SOME_ACTOR, SOME_COMMIT_MESSAGE
+        )
+
+    assert session.fetches == 1
+    # the feature branch fetch, the checkout fetch, and the fetch implied by `git pull`
+    assert session.round_trips_saved == 3
+    assert SOME_FEATURE_BRANCH in remote_repo.heads
+    assert local_repo.active_branch.name == GIT_BRANCH_MAIN
+
+
+def test_feature_branch__narrow_session__only_default_branch_fetched(tmp_path):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    remote_repo = repos.remote_repo
+    local_repo = repos.local_repo
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+    remote_repo.create_head(SOME_OTHER_BRANCH_NAME)
+    session = RemoteSession(FetchOptions(narrow=True, protocol_v2=True))
+
+    with feature_branch(local_repo, SOME_FEATURE_BRANCH, session=session):
+        assert local_repo.head.commit == remote_repo.heads.main.commit
+
+    assert session.fetches == 1
+    assert SOME_OTHER_BRANCH_NAME not in [
+        ref.remote_head for ref in local_repo.remotes.origin.refs
+    ]
+    assert local_repo.git.symbolic_ref("refs/remotes/origin/HEAD") == (
+        "refs/remotes/origin/main"
+    )
+
+
+def test_get_updated_repo__session__clone_reused_by_feature_branch(tmp_path):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    _initialize_repo_with_content(remote_path)
+    session = RemoteSession()
+
+    local_repo = get_updated_repo(str(remote_path), local_path, session=session)
+    with feature_branch(local_repo, SOME_FEATURE_BRANCH, session=session):
+        pass
+
+    # only `remote set-head -a` contacts the remote after the clone
+    assert session.fetches == 0
+
+
+def test_get_updated_repo__session__repo_present_locally__remote_changes_pulled(
+    tmp_path,
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    remote_repo = _initialize_repo_with_content(remote_path)
+    local_repo = get_updated_repo(str(remote_path), local_path)
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+    session = RemoteSession()
+
+    local_repo = get_updated_repo(str(remote_path), local_path, session=session)
+
+    assert session.fetches == 1
+    assert local_repo.head.commit == remote_repo.head.commit
+    content = (Path(repo_working_dir(local_repo)) / SOME_CONTENT_FILENAME).read_text()
+    assert SOME_NEW_CONTENT in content
+
+
+def test_get_default_branch__default_branch_cache__remote_not_fetched(mocker, tmp_path):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    cache = DefaultBranchCache()
+    fetch_spy = mocker.spy(type(local_repo.remotes.origin), "fetch")
+
+    assert get_default_branch(local_repo, default_branch_cache=cache) == GIT_BRANCH_MAIN
+
+    fetch_spy.assert_not_called()
+    assert cache.get(local_repo.remotes.origin.url) == GIT_BRANCH_MAIN
+
+
+def test_feature_branch__default_branch_cache__stale_entry__default_branch_refreshed(
+    tmp_path,
+):
+    repos = _initialize_multiple_empty_repos(tmp_path)
+    local_repo = repos.local_repo
+    cache = DefaultBranchCache()
+    cache.set(local_repo.remotes.origin.url, "some-renamed-branch")
+
+    with feature_branch(local_repo, SOME_FEATURE_BRANCH, default_branch_cache=cache):
+        assert local_repo.active_branch.name == SOME_FEATURE_BRANCH
+
+    assert cache.get(local_repo.remotes.origin.url) == GIT_BRANCH_MAIN
+
+
+def test_get_updated_repo__default_branch_cache__stale_entry__default_branch_refreshed(
+    tmp_path,
+):
+    remote_path = tmp_path / "remote"
+    local_path = tmp_path / "local"
+    remote_repo = _initialize_repo_with_content(remote_path)
+    get_updated_repo(str(remote_path), local_path)
+    cache = DefaultBranchCache()
+    cache.set(str(remote_path), SOME_DEFAULT_BRANCH_NAME)
+    _commit_content(remote_repo, SOME_NEW_CONTENT)
+
+    local_repo = get_updated_repo(
+        str(remote_path), local_path, default_branch_cache=cache
+    )
+
+    assert local_repo.head.commit == remote_repo.head.commit
+    assert cache.get(str(remote_path)) == GIT_BRANCH_MASTER
+
+
 def _initialize_repo_with_content(repo_path):
     """
     Helper function used to initialize repo objects, write content, and make initial commit
@@ -0,0 +1,106 @@
+import pytest
+
+from pygitops.exceptions import PyGitOpsValueError
+from pygitops.git_channel import GitChannel
+from pygitops.operations import get_updated_repo
+from pygitops.repo_pool import RepoPool
+
+SOME_COMMIT_MESSAGE = "some-commit-message"
+
+
+def test_repo_pool_get__same_path__handle_reused(tmp_path, initialize_remote):
+    initialize_remote(tmp_path / "some-repo")
+
+    with RepoPool() as pool:
+        repo = pool.get(tmp_path / "some-repo")
+
+        assert pool.get(str(tmp_path / "some-repo")) is repo
+        assert (pool.hits, pool.misses) == (1, 1)
+
+
+def test_repo_pool_get__not_a_repo__returns_none(tmp_path):
+    with RepoPool() as pool:
+        assert pool.get(tmp_path) is None
+        assert pool.get(tmp_path / "some-missing-dir") is None
+        assert len(pool) == 0
+
+
+def test_repo_pool_get__more_repos_than_limit__least_recently_used_closed(
+    mocker, tmp_path, initialize_remote
+):
+    for name in ("a", "b", "c"):
+        initialize_remote(tmp_path / name)
+
+    with RepoPool(max_repos=2) as pool:
+        repo_a = pool.get(tmp_path / "a")
+        repo_b = pool.get(tmp_path / "b")
+        # spied on the handles themselves, as handles of other tests may be closed when garbage collected
+        close_a_spy = mocker.spy(repo_a, "close")
+        close_b_spy = mocker.spy(repo_b, "close")
+        pool.get(tmp_path / "a")
+        pool.get(tmp_path / "c")
+
+        assert pool.evictions == 1
+        # `a` was used more recently than `b`
+        assert pool.get(tmp_path / "a") is repo_a
+        assert len(pool) == 2
+        close_b_spy.assert_called_once()
+        close_a_spy.assert_not_called()
+
+
+def test_repo_pool_get__too_many_helper_processes__least_recently_used_stopped(
+    tmp_path, initialize_remote
+):
+    repos = []
+    with RepoPool(max_helper_processes=2) as pool:
+        for name in ("a", "b", "c"):
+            initialize_remote(tmp_path / name)
+            repo = pool.get(tmp_path / name)
+            # starts the GitPython `cat-file --batch-check` process, and the shared channel
+            repo.odb.info(repo.head.commit.binsha)
+            GitChannel.for_repo(repo).resolve("HEAD")
+            repos.append(repo)
+
+        pool.get(tmp_path / "c")
+
+        assert repos[0].git.cat_file_header is None
+        assert not GitChannel.for_repo(repos[0]).running
+        assert repos[2].git.cat_file_header is not None
+        # a stopped handle remains usable
+        assert repos[0].head.commit.message == SOME_COMMIT_MESSAGE
+
+
+def test_repo_pool_get__evicted__reopened(tmp_path, initialize_remote):
+    initialize_remote(tmp_path / "some-repo")
+
+    with RepoPool() as pool:
+        pool.get(tmp_path / "some-repo")
+        pool.evict(tmp_path / "some-repo")
+        repo = pool.get(tmp_path / "some-repo")
+
+        assert repo is not None
+        assert pool.misses == 2
+
+
+def test_repo_pool__invalid_limits__raises_pygitops_value_error():
+    with pytest.raises(PyGitOpsValueError):
+        RepoPool(max_repos=0)
+
+
+def test_repo_pool_shared__shared_pool_returned():
+    assert RepoPool.shared() is RepoPool.shared()
+
+
+def test_get_updated_repo__repo_pool__handle_reused(tmp_path, initialize_remote):
+    initialize_remote(tmp_path / "remote")
+
+    with RepoPool() as pool:
+        cloned_repo = get_updated_repo(
+            str(tmp_path / "remote"), tmp_path / "local", repo_pool=pool
+        )
+        updated_repo = get_updated_repo(
+            str(tmp_path / "remote"), tmp_path / "local", repo_pool=pool
+        )
+
+        assert updated_repo is cloned_repo
+        assert pool.hits == 1
@@ -0,0 +1,145 @@
+from git import Repo
+
+from pygitops.session import RemoteSession
+from pygitops.types import FetchOptions
+
+SOME_BRANCH = "some-branch"
+SOME_DEFAULT_BRANCH = "main"
+
+
+def test_remote_session_fetch__first_fetch__origin_fetched(mocker):
+    repo = mocker.Mock(git_dir="some-git-dir")
+    session = RemoteSession()
+
+    session.fetch(repo)
+
+    repo.remotes.origin.fetch.assert_called_once()
+    assert session.fetches == 1
+    assert session.round_trips_saved == 0
+
+
+def test_remote_session_fetch__repeated_fetch__origin_fetched_once(mocker):
+    repo = mocker.Mock(git_dir="some-git-dir")
+    session = RemoteSession()
+
+    session.fetch(repo)
+    session.fetch(repo)
+    session.fetch(repo)
+
+    repo.remotes.origin.fetch.assert_called_once()
+    assert session.fetches == 1
+    assert session.round_trips_saved == 2
+
+
+def test_remote_session_fetch__distinct_repos__each_repo_fetched(mocker):
+    repo = mocker.Mock(git_dir="some-git-dir")
+    other_repo = mocker.Mock(git_dir="some-other-git-dir")
+    session = RemoteSession()
+
+    session.fetch(repo)
+    session.fetch(other_repo)
+
+    repo.remotes.origin.fetch.assert_called_once()
+    other_repo.remotes.origin.fetch.assert_called_once()
+    assert session.round_trips_saved == 0
+
+
+def test_remote_session_fetch__marked_fetched__origin_not_fetched(mocker):
+    repo = mocker.Mock(git_dir="some-git-dir")
+    session = RemoteSession()
+
+    session.mark_fetched(repo)
+    session.fetch(repo)
+
+    repo.remotes.origin.fetch.assert_not_called()
+    assert session.round_trips_saved == 1
+
+
+def test_remote_session_pull__merges_remote_tracking_ref_without_pulling(mocker):
+    repo = mocker.Mock(git_dir="some-git-dir")
+    repo.remotes.origin.name = "origin"
+    session = RemoteSession()
+    session.mark_fetched(repo)
+
+    session.pull(repo, SOME_BRANCH)
+
+    repo.git.merge.assert_called_once_with(f"origin/{SOME_BRANCH}")
+    repo.remotes.origin.pull.assert_not_called()
+    repo.remotes.origin.fetch.assert_not_called()
+
+
+def test_remote_session_default_branch__remembered__cached_value_returned(mocker):
+    repo = mocker.Mock(git_dir="some-git-dir")
+    session = RemoteSession()
+
+    assert session.cached_default_branch(repo) is None
+    session.remember_default_branch(repo, SOME_DEFAULT_BRANCH)
+
+    assert session.cached_default_branch(repo) == SOME_DEFAULT_BRANCH
+    assert session.round_trips_saved == 2
+
+
+def test_remote_session__real_repo__keyed_by_git_dir(tmp_path):
+    repo = Repo.init(tmp_path)
+    session = RemoteSession()
+
+    session.remember_default_branch(repo, SOME_DEFAULT_BRANCH)
+
+    assert session.cached_default_branch(Repo(tmp_path)) == SOME_DEFAULT_BRANCH
+
+
+def _initialize_remote_and_clone(tmp_path):
+    remote_repo = Repo.init(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+    remote_repo.index.commit("some-commit")
+    remote_repo.create_head(SOME_BRANCH)
+    remote_repo.create_head("some-stale-branch")
+    remote_repo.create_tag("some-tag")
+    local_repo = Repo.clone_from(remote_repo.working_dir, tmp_path / "local")
+    return remote_repo, local_repo
+
+
+def test_remote_session_fetch__narrow__only_missing_branches_fetched(tmp_path):
+    remote_repo, local_repo = _initialize_remote_and_clone(tmp_path)
+    remote_repo.create_head("some-new-branch")
+    remote_repo.create_head("some-other-new-branch")
+    remote_repo.create_tag("some-new-tag")
+    session = RemoteSession(FetchOptions(narrow=True, no_tags=True))
+
+    session.fetch(local_repo, ["some-new-branch"])
+    session.fetch(local_repo, ["some-new-branch"])
+
+    origin_refs = [ref.remote_head for ref in local_repo.remotes.origin.refs]
+    assert "some-new-branch" in origin_refs
+    assert "some-other-new-branch" not in origin_refs
+    assert "some-new-tag" not in local_repo.tags
+    assert session.fetches == 1
+    assert session.round_trips_saved == 1
+
+
+def test_remote_session_fetch__narrow_missing_branch__tracking_ref_pruned(tmp_path):
+    remote_repo, local_repo = _initialize_remote_and_clone(tmp_path)
+    remote_repo.delete_head("some-stale-branch")
+    session = RemoteSession(FetchOptions(narrow=True, prune=True))
+
+    session.fetch(local_repo, [SOME_BRANCH, "some-stale-branch"])
+
+    origin_refs = [ref.remote_head for ref in local_repo.remotes.origin.refs]
+    assert SOME_BRANCH in origin_refs
+    assert "some-stale-branch" not in origin_refs
+
+
+def test_remote_session_fetch__narrow_without_branches__every_branch_fetched(
+    tmp_path,
+):
+    remote_repo, local_repo = _initialize_remote_and_clone(tmp_path)
+    remote_repo.create_head("some-new-branch")
+    session = RemoteSession(FetchOptions(narrow=True, protocol_v2=True))
+
+    session.fetch(local_repo)
+    session.fetch(local_repo, ["some-new-branch"])
+
+    assert "some-new-branch" in [
+        ref.remote_head for ref in local_repo.remotes.origin.refs
+    ]
+    assert session.fetches == 1
+    assert session.round_trips_saved == 1
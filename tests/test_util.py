@@ -1,23 +1,37 @@
+import os
 import shutil
 import unittest.mock as mock
 from pathlib import Path
 
 import pytest
 from filelock import Timeout
-from git import PushInfo, Repo
+from git import Actor, Git, PushInfo, Repo
 
 from pygitops._util import (
     _lockfile_path,
+    changed_paths,
     checkout_pull_branch,
+    commit_index,
+    deepen_until_merge_base,
+    get_clone_lockfile_path,
     get_lockfile_path,
     is_git_repo,
+    is_shallow_repo,
+    is_sparse_checkout,
     lock_repo,
+    lock_repo_branch,
+    parse_porcelain_v2_changes,
     push_error_present,
+    remote_head_ref,
     repo_working_dir,
+    set_remote_head,
+    set_sparse_paths,
+    stage_paths,
 )
 from pygitops.exceptions import PyGitOpsError, PyGitOpsWorkingDirError
 
 SOME_REPO_NAME = "some-repo-name"
+SOME_COMMIT_MESSAGE = "some-commit-message"
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -55,6 +69,18 @@ def test_lock_repo__filelock_acquire_timeout__raises_pygitops_error(mocker):
         pass
 
 
+def test_lock_repo_branch__branches_differ__locked_independently(mocker, tmp_path):
+    mocker.patch("pygitops._util._lockfile_path", new=tmp_path)
+    mocker.patch("pygitops._util.FILELOCK_ACQUIRE_TIMEOUT_SECONDS", new=0.1)
+    repo_mock = mocker.Mock(working_dir=f"some-repo-namespace/{SOME_REPO_NAME}")
+
+    with lock_repo_branch(repo_mock, "some/branch"):
+        with lock_repo_branch(repo_mock, "some-other-branch"), lock_repo(repo_mock):
+            pass
+        with pytest.raises(PyGitOpsError), lock_repo_branch(repo_mock, "some/branch"):
+            pass
+
+
 @pytest.mark.parametrize("path_exists", (True, False))
 def test_get_lockfile_path__expected_path_returned(mocker, tmp_path, path_exists):
     mocker.patch("pygitops._util._lockfile_path", new=tmp_path)
@@ -76,7 +102,7 @@ def test_get_lockfile_path__lockfile_dir_dne__lockfile_dir_created(mocker, tmp_p
     )
 
 
-def test_pull_branch__head_present__head_not_created(mocker):
+def test_pull_branch__head_present__head_not_created(mocker, tmp_path):
     """
     In the case where checkout_pull_branch() is invoked, and a head for the specified branch is present,
     the operation should not create head nor set the tracking branch
@@ -93,6 +119,7 @@ def test_pull_branch__head_present__head_not_created(mocker):
         heads={branch: test_branch_head_mock},
         remotes=mocker.Mock(origin=origin_mock),
         create_head=create_head_mock,
+        common_dir=str(tmp_path),
     )
 
     checkout_pull_branch(repo, branch)
@@ -101,7 +128,7 @@ def test_pull_branch__head_present__head_not_created(mocker):
     test_branch_head_mock.assert_not_called()
 
 
-def test_pull_branch__head_not_present__head_created(mocker):
+def test_pull_branch__head_not_present__head_created(mocker, tmp_path):
     """
     In the case where checkout_pull_branch() is invoked, and a head is not present,
     the operation should create the head and set the tracking branch
@@ -127,6 +154,7 @@ def test_pull_branch__head_not_present__head_created(mocker):
         heads=heads,
         remotes=mocker.Mock(origin=origin_mock),
         create_head=create_head_mock,
+        common_dir=str(tmp_path),
     )
 
     checkout_pull_branch(repo, branch)
@@ -136,7 +164,7 @@ def test_pull_branch__head_not_present__head_created(mocker):
 
 
 def test_pull_branch__head_present_and_force_requested__tracked_and_untracked_changes_removed(
-    mocker,
+    mocker, tmp_path
 ):
     """
     In the case where checkout_pull_branch() is invoked, and a head for the specified branch is present,
@@ -160,6 +188,7 @@ def test_pull_branch__head_present_and_force_requested__tracked_and_untracked_ch
         heads={branch: test_branch_head_mock},
         remotes=mocker.Mock(origin=origin_mock),
         create_head=create_head_mock,
+        common_dir=str(tmp_path),
         git=git_mock,
     )
 
@@ -205,3 +234,207 @@ def test_repo_working_dir__working_dir_present__expected_working_dir_returned(tm
     repo = Repo.init(repo_path)
 
     assert repo_working_dir(repo) == str(repo_path)
+
+
+def _commit_to_new_repo(repo_path: Path, commit_count: int) -> Repo:
+    repo = Repo.init(repo_path, initial_branch="main")
+    for i in range(commit_count):
+        (repo_path / "some-file.txt").write_text(str(i))
+        repo.index.add(["some-file.txt"])
+        repo.index.commit(f"commit {i}")
+    return repo
+
+
+def test_is_shallow_repo__shallow_clone__returns_true(tmp_path):
+    remote_repo = _commit_to_new_repo(tmp_path / "remote", 3)
+
+    shallow_repo = Repo.clone_from(
+        f"file://{remote_repo.working_dir}", tmp_path / "shallow", depth=1
+    )
+    full_repo = Repo.clone_from(remote_repo.working_dir, tmp_path / "full")
+
+    assert is_shallow_repo(shallow_repo)
+    assert not is_shallow_repo(full_repo)
+
+
+def test_is_shallow_repo__git_not_run(mocker, tmp_path):
+    remote_repo = _commit_to_new_repo(tmp_path / "remote", 3)
+    shallow_repo = Repo.clone_from(
+        f"file://{remote_repo.working_dir}", tmp_path / "shallow", depth=1
+    )
+    execute_spy = mocker.spy(Git, "execute")
+
+    assert is_shallow_repo(shallow_repo)
+
+    execute_spy.assert_not_called()
+
+
+def test_set_remote_head__remote_head_ref_returns_branch__git_not_run(mocker, tmp_path):
+    remote_repo = _commit_to_new_repo(tmp_path / "remote", 1)
+    remote_repo.create_head("some-other-branch")
+    local_repo = Repo.clone_from(remote_repo.working_dir, tmp_path / "local")
+    execute_spy = mocker.spy(Git, "execute")
+
+    assert remote_head_ref(local_repo) == "refs/remotes/origin/main"
+    set_remote_head(local_repo, "some-other-branch")
+    assert remote_head_ref(local_repo) == "refs/remotes/origin/some-other-branch"
+
+    execute_spy.assert_not_called()
+    # git itself sees a symbolic ref, as written by `git remote set-head`
+    assert (
+        local_repo.git.symbolic_ref("refs/remotes/origin/HEAD")
+        == "refs/remotes/origin/some-other-branch"
+    )
+
+
+def test_remote_head_ref__remote_head_missing__raises_pygitops_error(tmp_path):
+    remote_repo = _commit_to_new_repo(tmp_path / "remote", 1)
+    local_repo = Repo.clone_from(remote_repo.working_dir, tmp_path / "local")
+    local_repo.git.remote("set-head", "-d", "origin")
+
+    with pytest.raises(PyGitOpsError):
+        remote_head_ref(local_repo)
+
+
+@pytest.mark.parametrize(("new_commit_count", "max_deepen_attempts"), ((2, 5), (80, 1)))
+def test_deepen_until_merge_base__history_truncated__merge_base_found(
+    mocker, tmp_path, new_commit_count, max_deepen_attempts
+):
+    mocker.patch("pygitops._util.SHALLOW_DEEPEN_MAX_ATTEMPTS", new=max_deepen_attempts)
+    remote_repo = _commit_to_new_repo(tmp_path / "remote", 3)
+    local_repo = Repo.clone_from(
+        f"file://{remote_repo.working_dir}", tmp_path / "local", depth=1
+    )
+    for i in range(new_commit_count):
+        remote_repo.index.commit(f"new commit {i}")
+    # move the shallow boundary past the local tip
+    local_repo.git.fetch("--depth=1", "origin")
+
+    deepen_until_merge_base(local_repo, "origin/main")
+
+    assert local_repo.git.merge_base("HEAD", "origin/main")
+
+
+def test_parse_porcelain_v2_changes__expected_paths_returned():
+    status = "\0".join(
+        (
+            "1 .M N... 100644 100644 100644 abc abc some-modified file.txt",
+            "1 M. N... 100644 100644 100644 abc def some-staged-file.txt",
+            "2 RM N... 100644 100644 100644 abc abc R100 some-renamed-file.txt",
+            "some-rename-source.txt",
+            "u UU N... 100644 100644 100644 100644 abc def 123 some-conflicted-file.txt",
+            "? some-dir/some-untracked-file.txt",
+            "! some-ignored-file.txt",
+            "",
+        )
+    )
+
+    assert parse_porcelain_v2_changes(status) == [
+        "some-modified file.txt",
+        "some-renamed-file.txt",
+        "some-conflicted-file.txt",
+        "some-dir/some-untracked-file.txt",
+    ]
+
+
+def test_stage_paths__many_paths__additions_and_deletions_staged(tmp_path):
+    repo = _commit_to_new_repo(tmp_path / "repo", 1)
+    (tmp_path / "repo" / ".gitignore").write_text("*.ignored\n")
+    (tmp_path / "repo" / "some-file.txt").unlink()
+    # more paths than fit in the arguments of a single command
+    some_dir = "some-dir/" + "some-nested-dir/" * 16
+    new_paths = [f"{some_dir}some [file] {i:05}.ignored" for i in range(8000)]
+    (tmp_path / "repo" / some_dir).mkdir(parents=True)
+    for path in new_paths:
+        (tmp_path / "repo" / path).touch()
+
+    stage_paths(repo, [Path("some-file.txt"), *new_paths])
+
+    assert sum(len(path) for path in new_paths) > os.sysconf("SC_ARG_MAX")
+    assert set(repo.index.entries) == {(path, 0) for path in new_paths}
+    assert changed_paths(repo) == [Path(".gitignore")]
+
+
+def test_stage_paths__sparse_checkout__path_outside_sparse_set_staged(tmp_path):
+    repo = _commit_to_new_repo(tmp_path / "repo", 1)
+    assert not is_sparse_checkout(repo)
+    set_sparse_paths(repo, ["some-dir"])
+    (tmp_path / "repo" / "some-other-dir").mkdir()
+    (tmp_path / "repo" / "some-other-dir" / "some-file.txt").touch()
+
+    stage_paths(repo, [Path("some-other-dir") / "some-file.txt"])
+
+    assert is_sparse_checkout(repo)
+    assert ("some-other-dir/some-file.txt", 0) in repo.index.entries
+
+
+def test_get_clone_lockfile_path__relative_and_absolute_paths__same_path_returned(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "some-link").symlink_to(tmp_path / "some-clone")
+
+    assert (
+        get_clone_lockfile_path("some-clone")
+        == get_clone_lockfile_path(tmp_path / "some-clone")
+        == get_clone_lockfile_path(tmp_path / "some-link")
+    )
+
+
+def test_commit_index__message_and_actor_used_verbatim(tmp_path):
+    repo = _commit_to_new_repo(tmp_path / "repo", 1)
+    actor = Actor("some-user", "some-user@company.com")
+    commit_message = "some-summary\n\n# some-line-starting-with-a-hash\n"
+
+    commit = commit_index(repo, commit_message, actor)
+
+    assert commit == repo.head.commit
+    assert commit.message == commit_message
+    assert commit.author == commit.committer == actor
+
+
+def _install_hook(repo, name, script):
+    hook = Path(repo.git_dir) / "hooks" / name
+    hook.parent.mkdir(exist_ok=True)
+    hook.write_text(f"#!/bin/sh\n{script}\n")
+    hook.chmod(0o755)
+
+
+def test_commit_index__hooks_and_signing_configured__hooks_run_and_commit_unsigned(
+    tmp_path,
+):
+    repo = _commit_to_new_repo(tmp_path / "repo", 1)
+    for name in ("pre-commit", "commit-msg"):
+        _install_hook(repo, name, f"touch '{tmp_path / name}'")
+    with repo.config_writer() as config:
+        config.set_value("commit", "gpgSign", "true")
+        config.set_value("gpg", "program", "false")
+
+    commit = commit_index(
+        repo, SOME_COMMIT_MESSAGE, Actor("some-user", "some-user@company.com")
+    )
+
+    assert commit == repo.head.commit
+    assert not commit.gpgsig
+    assert (tmp_path / "pre-commit").exists()
+    assert (tmp_path / "commit-msg").exists()
+
+
+def test_commit_index__pre_commit_hook_fails__raises_pygitops_error(tmp_path):
+    repo = _commit_to_new_repo(tmp_path / "repo", 1)
+    _install_hook(repo, "pre-commit", "exit 1")
+
+    with pytest.raises(PyGitOpsError):
+        commit_index(
+            repo, SOME_COMMIT_MESSAGE, Actor("some-user", "some-user@company.com")
+        )
+
+
+def test_commit_index__commit_fails__raises_pygitops_error(tmp_path):
+    repo = _commit_to_new_repo(tmp_path / "repo", 1)
+    (Path(repo.git_dir) / "index.lock").touch()
+
+    with pytest.raises(PyGitOpsError):
+        commit_index(
+            repo, SOME_COMMIT_MESSAGE, Actor("some-user", "some-user@company.com")
+        )
@@ -0,0 +1,143 @@
+import threading
+from pathlib import Path
+
+import pytest
+from git import Actor, Repo
+
+from pygitops._util import repo_working_dir
+from pygitops.exceptions import PyGitOpsError, PyGitOpsValueError
+from pygitops.operations import stage_commit_push_changes
+from pygitops.worktrees import WorktreePool, feature_worktree
+
+SOME_ACTOR = Actor("some-user", "some-user@company.com")
+SOME_COMMIT_MESSAGE = "some-commit-message"
+SOME_CONTENT_FILENAME = "foo.txt"
+SOME_INITIAL_CONTENT = "some-initial-content"
+SOME_NEW_CONTENT = "some-new-content"
+SOME_DEFAULT_BRANCH = "main"
+SOME_FEATURE_BRANCH = "some-feature-branch"
+SOME_OTHER_FEATURE_BRANCH = "some/other-feature-branch"
+
+
+@pytest.fixture
+def repos(tmp_path):
+    remote_repo = Repo.init(tmp_path / "remote", initial_branch=SOME_DEFAULT_BRANCH)
+    (tmp_path / "remote" / SOME_CONTENT_FILENAME).write_text(SOME_INITIAL_CONTENT)
+    remote_repo.index.add([SOME_CONTENT_FILENAME])
+    remote_repo.index.commit(SOME_COMMIT_MESSAGE)
+    local_repo = Repo.clone_from(str(tmp_path / "remote"), tmp_path / "local")
+    return remote_repo, local_repo
+
+
+def _write_and_push(worktree_repo: Repo, branch_name: str) -> None:
+    (Path(repo_working_dir(worktree_repo)) / SOME_CONTENT_FILENAME).write_text(
+        SOME_NEW_CONTENT
+    )
+    stage_commit_push_changes(
+        worktree_repo, branch_name, SOME_ACTOR, SOME_COMMIT_MESSAGE
+    )
+
+
+def test_feature_worktree__changes_pushed__main_working_tree_untouched(repos):
+    remote_repo, local_repo = repos
+
+    with feature_worktree(local_repo, SOME_FEATURE_BRANCH) as worktree_repo:
+        assert worktree_repo.working_dir != local_repo.working_dir
+        assert worktree_repo.active_branch.name == SOME_FEATURE_BRANCH
+        _write_and_push(worktree_repo, SOME_FEATURE_BRANCH)
+
+    pushed_commit = remote_repo.heads[SOME_FEATURE_BRANCH].commit
+    assert pushed_commit.parents[0] == remote_repo.heads[SOME_DEFAULT_BRANCH].commit
+    assert local_repo.active_branch.name == SOME_DEFAULT_BRANCH
+    assert not local_repo.is_dirty(untracked_files=True)
+    # the worktree is removed when no pool is provided
+    assert not Path(worktree_repo.working_dir).exists()
+
+
+def test_feature_worktree__different_branches__used_concurrently(repos):
+    remote_repo, local_repo = repos
+    both_entered = threading.Barrier(2, timeout=10)
+    errors = []
+
+    def _work(branch_name):
+        try:
+            with feature_worktree(local_repo, branch_name) as worktree_repo:
+                both_entered.wait()
+                _write_and_push(worktree_repo, branch_name)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=_work, args=(branch_name,))
+        for branch_name in (SOME_FEATURE_BRANCH, SOME_OTHER_FEATURE_BRANCH)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert SOME_FEATURE_BRANCH in remote_repo.heads
+    assert SOME_OTHER_FEATURE_BRANCH in remote_repo.heads
+
+
+def test_feature_worktree__same_branch_in_use__raises_pygitops_error(mocker, repos):
+    _, local_repo = repos
+    mocker.patch("pygitops._util.FILELOCK_ACQUIRE_TIMEOUT_SECONDS", new=0.1)
+
+    with (
+        feature_worktree(local_repo, SOME_FEATURE_BRANCH),
+        pytest.raises(PyGitOpsError, match="timeout"),
+        feature_worktree(local_repo, SOME_FEATURE_BRANCH),
+    ):
+        pass
+
+
+def test_feature_worktree__default_branch__raises_pygitops_value_error(repos):
+    _, local_repo = repos
+
+    with (
+        pytest.raises(PyGitOpsValueError),
+        feature_worktree(local_repo, SOME_DEFAULT_BRANCH),
+    ):
+        pass
+
+
+def test_feature_worktree__pool__worktree_reused(repos):
+    _, local_repo = repos
+    pool = WorktreePool(local_repo, max_size=1)
+    pool.warm()
+    assert pool.idle_count == 1
+
+    with feature_worktree(local_repo, SOME_FEATURE_BRANCH, pool=pool) as worktree_repo:
+        assert pool.idle_count == 0
+        (Path(repo_working_dir(worktree_repo)) / "some-untracked-file").touch()
+        first_path = worktree_repo.working_dir
+
+    assert pool.idle_count == 1
+    with feature_worktree(
+        local_repo, SOME_OTHER_FEATURE_BRANCH, pool=pool
+    ) as worktree_repo:
+        assert worktree_repo.working_dir == first_path
+        assert not worktree_repo.is_dirty(untracked_files=True)
+
+    pool.close()
+    assert pool.idle_count == 0
+    assert not Path(first_path).exists()
+
+
+def test_feature_worktree__exception_within_context__worktree_discarded(repos):
+    _, local_repo = repos
+    pool = WorktreePool(local_repo)
+
+    with (
+        pytest.raises(RuntimeError),
+        feature_worktree(local_repo, SOME_FEATURE_BRANCH, pool=pool) as worktree_repo,
+    ):
+        raise RuntimeError("some exception")
+
+    assert pool.idle_count == 0
+    assert not Path(worktree_repo.working_dir).exists()
+    # the branch is no longer checked out anywhere, so it can be used again
+    with feature_worktree(local_repo, SOME_FEATURE_BRANCH, pool=pool):
+        pass